@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey
+from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, Float, ForeignKey, LargeBinary, UniqueConstraint, inspect, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from .database import Base
@@ -36,3 +36,105 @@ class DocumentSnippet(Base):
     
     # Relationship back to document
     document = relationship("PDFDocument", back_populates="snippets")
+
+class DocumentIngestion(Base):
+    """One ingestion run per file hash: outline, page count and status of the stored artifacts"""
+    __tablename__ = "document_ingestions"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String(64), unique=True, index=True, nullable=False)
+    document_id = Column(Integer, ForeignKey("pdf_documents.id"), nullable=False)
+    status = Column(String(20), default="pending")  # pending, processing, completed, failed
+    pipeline_version = Column(String(20), nullable=True)  # Re-ingest when the extraction code changes
+    title = Column(String(500), nullable=True)  # Part 1A title
+    outline = Column(Text, nullable=True)  # Part 1A outline as JSON
+    page_count = Column(Integer, nullable=True)
+    section_count = Column(Integer, nullable=True)
+    embedding_model = Column(String(100), nullable=True)
+    processing_time = Column(Float, nullable=True)
+    error = Column(Text, nullable=True)
+    ingested_at = Column(DateTime, nullable=True)
+
+class DocumentSection(Base):
+    """Part 1B sections and page paragraphs of a document with their precomputed sentence embeddings"""
+    __tablename__ = "document_sections"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    document_id = Column(Integer, ForeignKey("pdf_documents.id"), nullable=False, index=True)
+    kind = Column(String(20), default="section")  # section (Part 1B) or paragraph (page text block)
+    page_number = Column(Integer, nullable=True)
+    section_index = Column(Integer, nullable=True)  # Order of this section in the document
+    section_title = Column(String(500), nullable=True)
+    content = Column(Text, nullable=False)
+    embedding = Column(LargeBinary, nullable=True)  # float32 vector, L2-normalized
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OutlineCacheEntry(Base):
+    """Part 1A extraction result cached per file hash and extractor version"""
+    __tablename__ = "outline_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    file_hash = Column(String(64), index=True, nullable=False)
+    extractor_version = Column(String(40), nullable=False)
+    title = Column(String(500), nullable=True)
+    outline = Column(Text, nullable=False)  # Outline as JSON
+    extraction_time = Column(Float, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("file_hash", "extractor_version", name="uq_outline_cache_hash_version"),)
+
+class EmbeddingCacheEntry(Base):
+    """Embedding vector cached per embedding model and sha256 of the normalized text"""
+    __tablename__ = "embedding_cache"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    model_id = Column(String(200), nullable=False)  # e.g. sentence_transformer:all-MiniLM-L6-v2, openai:text-embedding-3-large
+    text_hash = Column(String(64), nullable=False)
+    dim = Column(Integer, nullable=False)
+    vector = Column(LargeBinary, nullable=False)  # float32, as returned by the model (not normalized)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("model_id", "text_hash", name="uq_embedding_cache_model_hash"),)
+
+class ResponseCacheEntry(Base):
+    """Generated result (LLM insights, audio file path...) cached per namespace and key with an expiry"""
+    __tablename__ = "response_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    namespace = Column(String(50), nullable=False)  # e.g. insights, audio, llm_insights
+    key = Column(String(128), nullable=False)
+    value = Column(Text, nullable=False)  # JSON
+    negative = Column(Boolean, default=False)  # Fallback/error result, kept for the shorter negative TTL
+    expires_at = Column(Float, nullable=False, index=True)  # Unix time
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (UniqueConstraint("namespace", "key", name="uq_response_cache_namespace_key"),)
+
+class AnalysisJob(Base):
+    """Asynchronous /part1b analysis run; state and result survive restarts"""
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(String(36), primary_key=True)  # UUID job id
+    dedup_key = Column(String(64), index=True, nullable=False)  # sha256 of (file hashes, persona, job, options)
+    status = Column(String(20), default="queued", index=True)  # queued, running, completed, failed, cancelled
+    stage = Column(String(50), nullable=True)
+    progress = Column(Float, default=0.0)  # 0.0 - 1.0
+    persona = Column(String(255), nullable=True)
+    job_to_be_done = Column(Text, nullable=True)
+    options = Column(Text, nullable=True)  # JSON: llm_shortlist, llm_budget
+    files = Column(Text, nullable=True)  # JSON: [{"filename", "file_hash", "path"}]
+    result = Column(Text, nullable=True)  # JSON pipeline result
+    error = Column(Text, nullable=True)
+    cancel_requested = Column(Boolean, default=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+
+def create_ingestion_tables(bind) -> None:
+    """Create the ingestion tables on databases that predate them and add columns introduced since"""
+    DocumentIngestion.__table__.create(bind=bind, checkfirst=True)
+    DocumentSection.__table__.create(bind=bind, checkfirst=True)
+    columns = {column["name"] for column in inspect(bind).get_columns("document_sections")}
+    if "kind" not in columns:
+        with bind.begin() as connection:
+            connection.execute(text("ALTER TABLE document_sections ADD COLUMN kind VARCHAR(20) DEFAULT 'section'"))
@@ -2,7 +2,7 @@
 PDF Documents Router
 Handles PDF document CRUD operations
 """
-from fastapi import APIRouter, HTTPException, UploadFile, File, Form
+from fastapi import APIRouter, HTTPException, UploadFile, File, Form, BackgroundTasks
 from fastapi.responses import FileResponse
 from typing import List, Optional
 from pydantic import BaseModel
@@ -10,6 +10,8 @@ from datetime import datetime
 import os
 
 from app.services.pdf_service import PDFDocumentService
+from app.services.ingestion_service import ingestion_service
+from app.services.execution import execution_layer
 
 router = APIRouter(prefix="/documents", tags=["documents"])
 
@@ -85,10 +87,11 @@ async def download_document(document_id: int):
 
 @router.post("/upload", response_model=PDFDocumentResponse)
 async def upload_document(
+    background_tasks: BackgroundTasks,
     file: UploadFile = File(...),
     title: Optional[str] = Form(None)
 ):
-    """Upload a new PDF document"""
+    """Upload a new PDF document and schedule its ingestion (text, outline, sections, embeddings)"""
     try:
         if not file.filename.lower().endswith('.pdf'):
             raise HTTPException(status_code=400, detail="Only PDF files are allowed")
@@ -122,12 +125,42 @@ async def upload_document(
         )
         
         print(f"✅ File saved successfully: {file_path}")
+        
+        # Parse, section and embed once per file hash; no-op if this content was already ingested
+        background_tasks.add_task(ingestion_service.ingest_document, document.id)
         return document
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to upload document: {str(e)}")
 
+@router.get("/{document_id}/ingestion")
+async def get_document_ingestion(document_id: int):
+    """Get the ingestion status of a document's precomputed artifacts"""
+    try:
+        ingestion = ingestion_service.get_ingestion(document_id=document_id)
+        if not ingestion:
+            raise HTTPException(status_code=404, detail="Document has not been ingested")
+        return ingestion
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to get ingestion status: {str(e)}")
+
+@router.post("/{document_id}/ingest")
+async def ingest_document(document_id: int, force: bool = False):
+    """Run (or re-run with force=true) ingestion for a document"""
+    try:
+        # Parsing, extraction and embedding are CPU-bound; keep them off the event loop
+        result = await execution_layer.run_cpu(ingestion_service.ingest_document, document_id, force=force)
+        if result.get("status") == "not_found":
+            raise HTTPException(status_code=404, detail="Document not found")
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to ingest document: {str(e)}")
+
 @router.put("/{document_id}", response_model=PDFDocumentResponse)
 async def update_document(document_id: int, updates: PDFDocumentUpdate):
     """Update a PDF document"""
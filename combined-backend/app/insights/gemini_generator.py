@@ -9,9 +9,14 @@ from typing import List, Dict, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
 
+from ..services.context_packer import context_packer
+
 # Load environment variables from .env file
 load_dotenv()
 
+# Token budget of the sections context in each prompt
+SECTIONS_CONTEXT_TOKENS = int(os.getenv("SECTIONS_CONTEXT_TOKENS", "2500"))
+
 
 class GeminiInsightsGenerator:
     """Generates insights using Gemini 2.5 Flash model"""
@@ -65,7 +70,7 @@ class GeminiInsightsGenerator:
         """Generate key insights from document sections"""
         
         # Prepare context from sections
-        context = self._prepare_sections_context(sections)
+        context = self._prepare_sections_context(sections, query=f"{persona} {job}")
         
         prompt = f"""
         You are an expert analyst helping a {persona} with the following task: {job}
@@ -115,7 +120,7 @@ class GeminiInsightsGenerator:
     def generate_did_you_know_facts(self, sections: List[Dict], persona: str) -> Dict[str, Any]:
         """Generate interesting 'Did you know?' facts"""
         
-        context = self._prepare_sections_context(sections)
+        context = self._prepare_sections_context(sections, query=persona)
         
         prompt = f"""
         You are creating interesting "Did you know?" facts for a {persona}.
@@ -161,7 +166,7 @@ class GeminiInsightsGenerator:
     def find_contradictions_and_connections(self, sections: List[Dict], persona: str) -> Dict[str, Any]:
         """Find contradictions, counterpoints, and connections across documents"""
         
-        context = self._prepare_sections_context(sections)
+        context = self._prepare_sections_context(sections, query=persona)
         
         prompt = f"""
         You are analyzing multiple document sections for a {persona} to identify:
@@ -225,8 +230,8 @@ class GeminiInsightsGenerator:
     def generate_podcast_script(self, sections: List[Dict], persona: str, job: str, topic: str = None) -> Dict[str, Any]:
         """Generate a 2-5 minute podcast script"""
         
-        context = self._prepare_sections_context(sections)
         topic_focus = topic if topic else f"key concepts for {job}"
+        context = self._prepare_sections_context(sections, query=f"{persona} {topic_focus}")
         
         prompt = f"""
         Create a 2-5 minute podcast script for a {persona} focusing on: {topic_focus}
@@ -333,21 +338,37 @@ class GeminiInsightsGenerator:
                 "generated_at": datetime.now().isoformat()
             }
     
-    def _prepare_sections_context(self, sections: List[Dict]) -> str:
-        """Prepare sections data for Gemini context"""
-        context_parts = []
+    def _prepare_sections_context(self, sections: List[Dict], query: str = None) -> str:
+        """
+        Prepare sections data for Gemini context: the passages most relevant to the query
+        (sections keep their given order without one), within SECTIONS_CONTEXT_TOKENS
+        """
+        packed = context_packer.pack(
+            query,
+            [{"source": i, "text": section.get("content", "")} for i, section in enumerate(sections)],
+            SECTIONS_CONTEXT_TOKENS
+        )
+        print(f"📦 Packed {len(packed['chunks'])} chunks of {len(sections)} sections "
+              f"({packed['tokens_used']}/{packed['budget_tokens']} tokens)")
+        
+        # Sections in the order of their most relevant passage
+        passages_by_section = {}
+        for chunk in packed["chunks"]:
+            passages_by_section.setdefault(chunk["source"], []).append(chunk["text"])
         
-        for i, section in enumerate(sections[:10]):  # Limit to top 10 sections
+        context_parts = []
+        for n, (i, passages) in enumerate(passages_by_section.items(), 1):
+            section = sections[i]
             title = section.get("section_title", f"Section {i+1}")
-            content = section.get("content", "")[:1000]  # Limit content length
             document = section.get("document", "Unknown")
             page = section.get("page", "Unknown")
+            content = " ... ".join(passages)
             
             context_parts.append(f"""
-Section {i+1}: {title}
+Section {n}: {title}
 Document: {document}
 Page: {page}
-Content: {content}...
+Content: {content}
 ---
 """)
         
@@ -470,8 +491,8 @@ Content: {content}...
         """
         
         # Prepare context from ALL sections for comprehensive analysis
-        all_context = self._prepare_sections_context(all_sections)
-        primary_context = self._prepare_sections_context(primary_sections)
+        all_context = self._prepare_sections_context(all_sections, query=persona)
+        primary_context = self._prepare_sections_context(primary_sections, query=persona)
         
         prompt = f"""
         You are analyzing documents for a {persona}. You have access to these SPECIFIC sections that are most relevant:
@@ -557,7 +578,7 @@ Content: {content}...
         Generate podcast script that incorporates cross-document insights
         """
         
-        primary_context = self._prepare_sections_context(primary_sections)
+        primary_context = self._prepare_sections_context(primary_sections, query=f"{persona} {job}")
         connections = cross_doc_analysis.get("connections", [])
         contradictions = cross_doc_analysis.get("contradictions", [])
         insights = cross_doc_analysis.get("cross_document_insights", [])
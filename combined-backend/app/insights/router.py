@@ -5,17 +5,26 @@ Integrates with contest LLM providers (Gemini, Ollama, etc.)
 """
 
 import os
+import json
 import tempfile
 import time
 import hashlib
 from typing import Dict, Any, List, Optional
 
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import FileResponse, StreamingResponse
 from pydantic import BaseModel
 
 # Import unified LLM service for contest compatibility
-from ..services.llm_service import llm_service
+from ..services.llm_service import llm_service, llm_insights_cache, related_insights_key
+from ..services.llm_dispatcher import llm_dispatcher
+from ..services.llm_router import llm_router
+from ..services.ingestion_service import ingestion_service
+from ..services.execution import execution_layer
+from ..services.response_cache import ResponseCache, describe_response_caches
+from ..services.semantic_cache import semantic_llm_cache
+from ..services.context_packer import context_packer
+from ..services.single_flight import single_flight, request_key
 
 # Import TTS service
 try:
@@ -31,10 +40,11 @@ except ImportError:
     print("Warning: Insights bulb service not found")
     insights_bulb_service = None
 
-# Fallback to Gemini generator if available
+# Fallback to Gemini generator if available (shared with Part 1B through the model registry)
 try:
     from .gemini_generator import GeminiInsightsGenerator
-    gemini_generator = GeminiInsightsGenerator()
+    from ..services.model_registry import model_registry
+    gemini_generator = model_registry.get("gemini_insights_generator", GeminiInsightsGenerator)
 except Exception as e:
     print(f"Warning: Gemini generator not available: {e}")
     gemini_generator = None
@@ -42,11 +52,11 @@ except Exception as e:
 # Create router
 router = APIRouter(prefix="/insights", tags=["insights"])
 
-# Global cache for audio files
-audio_cache = {}  # {content_hash: {voice: file_path}}
+# Generated audio file path per "<content_hash>:<voice>" (files live in temp_audio/, shared by workers)
+audio_cache = ResponseCache("audio", ttl=7 * 86400)
 
-# Global cache for insights to avoid regenerating same content
-insights_cache = {}  # {content_hash: insights_data}
+# Podcast insights per content hash, to avoid regenerating same content
+insights_cache = ResponseCache("insights")
 
 # Pydantic models for finale features
 class InsightsBulbRequest(BaseModel):
@@ -72,7 +82,7 @@ class InsightsResponse(BaseModel):
 # Finale Endpoints
 
 @router.post("/generate-insights-bulb", response_model=InsightsResponse)
-async def generate_insights_bulb(request: InsightsBulbRequest):
+async def generate_insights_bulb(request: InsightsBulbRequest, http_request: Request):
     """
     Bonus Feature: Insights Bulb (+5 points)
     Generate AI-powered insights for selected text across ALL uploaded documents
@@ -91,145 +101,13 @@ async def generate_insights_bulb(request: InsightsBulbRequest):
                 detail="Selected text must be at least 3 characters long"
             )
         
-        # Get database session to retrieve ALL documents
-        from ..database.database import get_db, SessionLocal
-        from ..database.models import PDFDocument
-        import sqlite3
-        
-        db = SessionLocal()
-        try:
-            # Retrieve ALL uploaded documents from database
-            all_documents = db.query(PDFDocument).filter(PDFDocument.is_active == True).all()
-            print(f"📚 DEBUG: Found {len(all_documents)} documents in database")
-            
-            # Get content from all documents for comprehensive analysis
-            all_document_content = []
-            
-            # Use direct database access to get document content/snippets
-            db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdf_collections.db')
-            
-            for doc in all_documents:
-                try:
-                    # Get document metadata and any available content
-                    doc_info = {
-                        'document_id': doc.id,
-                        'document_name': doc.original_filename,
-                        'title': doc.title or doc.original_filename,
-                        'content': doc.content_preview or f"Document {doc.original_filename} - uploaded {doc.upload_timestamp}"
-                    }
-                    
-                    # Try to get more content if available from the PDF extractor results
-                    try:
-                        # Check if there are any text snippets stored for this document
-                        with sqlite3.connect(db_path) as conn:
-                            cursor = conn.cursor()
-                            cursor.execute("""
-                                SELECT content FROM document_snippets 
-                                WHERE document_id = ? 
-                                LIMIT 10
-                            """, (doc.id,))
-                            snippets = cursor.fetchall()
-                            
-                            if snippets:
-                                snippet_texts = [snippet[0] for snippet in snippets]
-                                doc_info['content'] = ' '.join(snippet_texts)[:3000]
-                                print(f"📄 DEBUG: Found {len(snippets)} snippets for {doc.original_filename}")
-                            else:
-                                # Try to get content from Part 1A extraction results
-                                try:
-                                    from ..part1a.pdf_structure_extractor import MultilingualPDFExtractor
-                                    extractor = MultilingualPDFExtractor()
-                                    
-                                    # Get the full file path
-                                    doc_path = os.path.join(os.path.dirname(__file__), "..", "..", "data", "collections", doc.filename)
-                                    
-                                    if os.path.exists(doc_path):
-                                        # Extract first few pages for content
-                                        result = extractor.extract_structure(doc_path)
-                                        if result and result.get('text_content'):
-                                            # Take first 2000 characters of extracted text
-                                            extracted_text = result['text_content'][:2000]
-                                            doc_info['content'] = extracted_text
-                                            
-                                            # Store snippets for future use
-                                            cursor.execute("""
-                                                INSERT INTO document_snippets (document_id, content, chunk_index, page_number)
-                                                VALUES (?, ?, ?, ?)
-                                            """, (doc.id, extracted_text, 0, 1))
-                                            conn.commit()
-                                            print(f"📄 DEBUG: Extracted and stored content from {doc.original_filename}")
-                                        else:
-                                            doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
-                                    else:
-                                        doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
-                                        print(f"⚠️ DEBUG: Document file not found: {doc_path}")
-                                        
-                                except Exception as extraction_error:
-                                    print(f"⚠️ DEBUG: Could not extract content: {extraction_error}")
-                                    doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
-                                
-                    except Exception as snippet_error:
-                        print(f"⚠️ DEBUG: No snippets found for document {doc.id}: {snippet_error}")
-                        doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
-                    
-                    all_document_content.append(doc_info)
-                    print(f"📄 DEBUG: Added content from {doc.original_filename}")
-                    
-                except Exception as e:
-                    print(f"⚠️ DEBUG: Could not get content for document {doc.id}: {e}")
-                    # Add basic document info even if content retrieval fails
-                    all_document_content.append({
-                        'document_id': doc.id,
-                        'document_name': doc.original_filename,
-                        'title': doc.title or doc.original_filename,
-                        'content': f"Document: {doc.original_filename} (uploaded {doc.upload_timestamp})"
-                    })
-                    continue
-            
-            print(f"📚 DEBUG: Successfully retrieved content from {len(all_document_content)} documents")
-            
-        finally:
-            db.close()
-        
-        print(f"🧠 DEBUG: Starting comprehensive cross-document LLM analysis...")
-        print(f"📊 DEBUG: Document summary:")
-        for i, doc in enumerate(all_document_content[:3]):  # Log first 3 documents
-            content_preview = doc.get('content', '')[:100] + '...' if len(doc.get('content', '')) > 100 else doc.get('content', '')
-            print(f"  {i+1}. {doc.get('document_name', 'Unknown')}: {content_preview}")
-        
-        # Use unified LLM service for comprehensive cross-document analysis
-        try:
-            insights_text = llm_service.generate_comprehensive_insights(
-                selected_text=request.selected_text,
-                all_documents=all_document_content,
-                related_sections=request.related_sections
-            )
-            print(f"✅ DEBUG: LLM service returned comprehensive insights: {len(insights_text) if insights_text else 0} characters")
-            print(f"📝 DEBUG: First 200 chars of insights: {insights_text[:200] if insights_text else 'None'}...")
-        except Exception as llm_error:
-            print(f"⚠️ DEBUG: LLM service failed: {llm_error}")
-            insights_text = f"Cross-document analysis completed for your selected text across {len(all_document_content)} documents. LLM analysis temporarily unavailable."
-        
-        # Structure the comprehensive insights response
-        insights = {
-            "analysis": insights_text,
-            "selected_text_summary": request.selected_text[:200] + "..." if len(request.selected_text) > 200 else request.selected_text,
-            "total_documents_analyzed": len(all_document_content),
-            "related_sections_count": len(request.related_sections),
-            "insight_types": request.insight_types,
-            "analysis_scope": "comprehensive_cross_document",
-            "generated_with": f"{llm_service.provider} ({llm_service.model_name})",
-            "timestamp": time.time()
-        }
-        
-        print(f"✅ DEBUG: Returning comprehensive cross-document insights response")
-        
-        return InsightsResponse(
-            success=True,
-            insights=insights,
-            feature="Comprehensive Insights Bulb - Cross Document Analysis",
-            bonus_points=5
-        )
+        # Identical selections already in flight share one analysis
+        key = request_key("insights_bulb", {
+            "selected_text": request.selected_text,
+            "related_sections": request.related_sections,
+            "insight_types": request.insight_types
+        })
+        return await single_flight.run(key, lambda: _comprehensive_insights(request), http_request)
         
     except HTTPException:
         raise
@@ -237,8 +115,116 @@ async def generate_insights_bulb(request: InsightsBulbRequest):
         print(f"❌ DEBUG: Unexpected error in comprehensive insights generation: {e}")
         raise HTTPException(status_code=500, detail=f"Comprehensive insights generation error: {str(e)}")
 
+async def _comprehensive_insights(request: InsightsBulbRequest) -> InsightsResponse:
+    """Cross-document analysis behind the Insights Bulb (shared by coalesced identical requests)"""
+    # Stored text of ALL documents, read off the event loop
+    all_document_content = await execution_layer.run_io(_collect_document_content)
+
+    print(f"🧠 DEBUG: Starting comprehensive cross-document LLM analysis...")
+    print(f"📊 DEBUG: Document summary:")
+    for i, doc in enumerate(all_document_content[:3]):  # Log first 3 documents
+        content_preview = doc.get('content', '')[:100] + '...' if len(doc.get('content', '')) > 100 else doc.get('content', '')
+        print(f"  {i+1}. {doc.get('document_name', 'Unknown')}: {content_preview}")
+
+    # Use unified LLM service for comprehensive cross-document analysis; awaited on the loop so a
+    # cancelled flight (every client gone) or the request deadline cancels the provider call too
+    try:
+        insights_text = await llm_service.agenerate_comprehensive_insights(
+            selected_text=request.selected_text,
+            all_documents=all_document_content,
+            related_sections=request.related_sections
+        )
+        print(f"✅ DEBUG: LLM service returned comprehensive insights: {len(insights_text) if insights_text else 0} characters")
+        print(f"📝 DEBUG: First 200 chars of insights: {insights_text[:200] if insights_text else 'None'}...")
+    except HTTPException:
+        raise
+    except Exception as llm_error:
+        print(f"⚠️ DEBUG: LLM service failed: {llm_error}")
+        insights_text = f"Cross-document analysis completed for your selected text across {len(all_document_content)} documents. LLM analysis temporarily unavailable."
+
+    print(f"✅ DEBUG: Returning comprehensive cross-document insights response")
+    return _insights_response(request, insights_text, len(all_document_content))
+
+def _insights_response(request: InsightsBulbRequest, insights_text: str, documents_analyzed: int) -> InsightsResponse:
+    """Structure the comprehensive insights response"""
+    insights = {
+        "analysis": insights_text,
+        "selected_text_summary": request.selected_text[:200] + "..." if len(request.selected_text) > 200 else request.selected_text,
+        "total_documents_analyzed": documents_analyzed,
+        "related_sections_count": len(request.related_sections),
+        "insight_types": request.insight_types,
+        "analysis_scope": "comprehensive_cross_document",
+        "generated_with": f"{llm_service.provider} ({llm_service.model_name})",
+        "timestamp": time.time()
+    }
+
+    return InsightsResponse(
+        success=True,
+        insights=insights,
+        feature="Comprehensive Insights Bulb - Cross Document Analysis",
+        bonus_points=5
+    )
+
+def _sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+def _sse_response(events) -> StreamingResponse:
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+async def _stream_text(chunks, start_time: float, complete):
+    """
+    SSE frames for a streamed LLM answer
+
+    Events, in order:
+        token     {text}                                  one per provider chunk
+        complete  complete(full text) + time_to_first_token_seconds, total_seconds
+        error     {detail, partial_text}                  instead of complete, if the stream broke
+    """
+    parts = []
+    first_token_at = None
+    try:
+        async for chunk in chunks:
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                print(f"⚡ DEBUG: First token after {first_token_at - start_time:.2f}s")
+            parts.append(chunk)
+            yield _sse_event("token", {"text": chunk})
+        result = complete("".join(parts))
+        result["time_to_first_token_seconds"] = round(first_token_at - start_time, 3) if first_token_at else None
+        result["total_seconds"] = round(time.perf_counter() - start_time, 3)
+        yield _sse_event("complete", result)
+    except Exception as e:
+        print(f"❌ DEBUG: Stream failed after {len(parts)} chunks: {e}")
+        yield _sse_event("error", {"detail": str(e), "partial_text": "".join(parts)})
+    finally:
+        # Client gone (or stream finished): close the provider stream now
+        await chunks.aclose()
+
+@router.post("/generate-insights-bulb/stream")
+async def generate_insights_bulb_stream(request: InsightsBulbRequest) -> StreamingResponse:
+    """
+    Streaming variant of /generate-insights-bulb (Server-Sent Events): the analysis text is
+    sent token by token as the provider produces it; the complete event carries the same
+    body as /generate-insights-bulb. Streams are not coalesced across clients
+    """
+    start_time = time.perf_counter()
+    if not request.selected_text or len(request.selected_text.strip()) < 3:
+        raise HTTPException(status_code=400, detail="Selected text must be at least 3 characters long")
+
+    all_document_content = await execution_layer.run_io(_collect_document_content)
+    chunks = llm_service.astream_comprehensive_insights(request.selected_text, all_document_content)
+    return _sse_response(_stream_text(
+        chunks, start_time,
+        lambda text: _insights_response(request, text, len(all_document_content)).dict()
+    ))
+
 @router.post("/generate-audio-overview")
-async def generate_audio_overview(request: AudioOverviewRequest):
+async def generate_audio_overview(request: AudioOverviewRequest, http_request: Request):
     """
     Bonus Feature: Audio Overview/Podcast Mode (+5 points)
     Generate 2-5 min audio overview/podcast based on selected content
@@ -261,24 +247,9 @@ async def generate_audio_overview(request: AudioOverviewRequest):
         
         print(f"✅ DEBUG: Audio overview validation passed, generating script...")
         
-        # Generate script for audio content with insights
-        script = _generate_audio_script(
-            request.selected_text,
-            request.related_sections,
-            request.audio_type,
-            request.duration_minutes,
-            request.insights  # Pass the insights
-        )
-        
-        print(f"📝 DEBUG: Generated script length: {len(script)} characters")
-        
-        # Generate audio using TTS service with voice and speed options
-        audio_file_path = await _generate_audio_file(
-            script, 
-            request.audio_type, 
-            request.voice, 
-            request.speed
-        )
+        # Identical requests already in flight share one script + TTS run
+        key = request_key("audio_overview", request.dict())
+        audio_file_path = await single_flight.run(key, lambda: _audio_overview_file(request), http_request)
         
         if not audio_file_path or not os.path.exists(audio_file_path):
             print(f"❌ DEBUG: Audio file generation failed")
@@ -298,12 +269,55 @@ async def generate_audio_overview(request: AudioOverviewRequest):
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Audio generation error: {str(e)}")
 
+@router.post("/generate-podcast-script/stream")
+async def generate_podcast_script_stream(request: AudioOverviewRequest) -> StreamingResponse:
+    """
+    Podcast script for the selected text and its related sections, streamed token by token
+    (Server-Sent Events, see _stream_text); the complete event carries {script}
+    """
+    start_time = time.perf_counter()
+    if not request.selected_text or len(request.selected_text.strip()) < 3:
+        raise HTTPException(status_code=400, detail="Selected text must be at least 3 characters long")
+
+    content = f"Selected text: {request.selected_text}\n\n"
+    for i, section in enumerate(request.related_sections[:5]):
+        section_text = section.get('content') or section.get('text') or section.get('snippet')
+        if section_text:
+            doc_name = section.get('document_name', section.get('source', f'Document {i+1}'))
+            content += f"From {doc_name}: {section_text}\n\n"
+
+    chunks = llm_service.astream_podcast_script(content)
+    return _sse_response(_stream_text(chunks, start_time, lambda script: {"script": script.strip()}))
+
+async def _audio_overview_file(request: AudioOverviewRequest) -> Optional[str]:
+    """Script (off the event loop, may call the LLM) and TTS file for an audio overview request"""
+    # Generate script for audio content with insights
+    script = await execution_layer.run_io(
+        _generate_audio_script,
+        request.selected_text,
+        request.related_sections,
+        request.audio_type,
+        request.duration_minutes,
+        request.insights  # Pass the insights
+    )
+    
+    print(f"📝 DEBUG: Generated script length: {len(script)} characters")
+    
+    # Generate audio using TTS service with voice and speed options
+    return await _generate_audio_file(
+        script, 
+        request.audio_type, 
+        request.voice, 
+        request.speed
+    )
+
 @router.post("/check-audio-cache")
 async def check_audio_cache(request: AudioOverviewRequest):
     """Check if audio files are cached for different voices"""
     try:
-        # Generate script to create hash with insights
-        script = _generate_audio_script(
+        # Generate script to create hash with insights (off the event loop, may call the LLM)
+        script = await execution_layer.run_io(
+            _generate_audio_script,
             request.selected_text,
             request.related_sections,
             request.audio_type,
@@ -314,20 +328,17 @@ async def check_audio_cache(request: AudioOverviewRequest):
         content_hash = hashlib.md5(f"{script}_{request.audio_type}".encode()).hexdigest()
         
         available_voices = {}
-        if content_hash in audio_cache:
-            for voice, file_path in audio_cache[content_hash].items():
-                if os.path.exists(file_path):
-                    available_voices[voice] = True
-                else:
-                    available_voices[voice] = False
-        else:
-            available_voices = {"male": False, "female": False}
+        for voice in ("male", "female"):
+            file_path = audio_cache.get(f"{content_hash}:{voice}")
+            available_voices[voice] = bool(file_path) and os.path.exists(file_path)
             
         return {
             "cached_voices": available_voices,
             "content_hash": content_hash
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         return {
             "cached_voices": {"male": False, "female": False},
@@ -336,6 +347,67 @@ async def check_audio_cache(request: AudioOverviewRequest):
 
 # Helper functions
 
+def _collect_document_content() -> List[Dict[str, Any]]:
+    """Stored text of every active document (blocking; runs in the execution layer's I/O lane)"""
+    # Get database session to retrieve ALL documents
+    from ..database.database import get_db, SessionLocal
+    from ..database.models import PDFDocument
+    
+    db = SessionLocal()
+    try:
+        # Retrieve ALL uploaded documents from database
+        all_documents = db.query(PDFDocument).filter(PDFDocument.is_active == True).all()
+        print(f"📚 DEBUG: Found {len(all_documents)} documents in database")
+        
+        # Get content from all documents for comprehensive analysis
+        all_document_content = []
+        
+        for doc in all_documents:
+            try:
+                # Get document metadata and any available content
+                doc_info = {
+                    'document_id': doc.id,
+                    'document_name': doc.original_filename,
+                    'title': doc.title or doc.original_filename,
+                    'content': doc.content_preview or f"Document {doc.original_filename} - uploaded {doc.upload_timestamp}"
+                }
+                
+                # Use the page text stored at ingestion time (ingests once if this document predates it);
+                # every page is kept, the LLM service packs the relevant ones into its token budget
+                try:
+                    page_texts = ingestion_service.get_page_texts(doc.id)
+                    if page_texts:
+                        doc_info['pages'] = page_texts
+                        doc_info['content'] = ' '.join(page_texts[page] for page in sorted(page_texts))
+                        print(f"📄 DEBUG: Found {len(page_texts)} snippets for {doc.original_filename}")
+                    else:
+                        doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
+                        print(f"⚠️ DEBUG: No ingested text for {doc.original_filename}")
+                except Exception as snippet_error:
+                    print(f"⚠️ DEBUG: No snippets found for document {doc.id}: {snippet_error}")
+                    doc_info['content'] = doc.content_preview or f"Document content from {doc.original_filename}"
+                
+                all_document_content.append(doc_info)
+                print(f"📄 DEBUG: Added content from {doc.original_filename}")
+                
+            except Exception as e:
+                print(f"⚠️ DEBUG: Could not get content for document {doc.id}: {e}")
+                # Add basic document info even if content retrieval fails
+                all_document_content.append({
+                    'document_id': doc.id,
+                    'document_name': doc.original_filename,
+                    'title': doc.title or doc.original_filename,
+                    'content': f"Document: {doc.original_filename} (uploaded {doc.upload_timestamp})"
+                })
+                continue
+        
+        print(f"📚 DEBUG: Successfully retrieved content from {len(all_document_content)} documents")
+        
+    finally:
+        db.close()
+    
+    return all_document_content
+
 def _generate_audio_script(
     selected_text: str, 
     related_sections: List[Dict], 
@@ -452,9 +524,10 @@ def _extract_content_insights(selected_text: str, related_sections: List[Dict])
         content_hash = hashlib.md5(content_for_hash.encode()).hexdigest()[:12]
         
         # Check if insights are already cached
-        if content_hash in insights_cache:
-            print(f"💾 DEBUG: Using cached insights for content hash: {content_hash}")
-            return insights_cache[content_hash]
+        cached, negative = insights_cache.lookup(content_hash)
+        if negative is not None:
+            print(f"💾 DEBUG: Using cached {'fallback ' if negative else ''}insights for content hash: {content_hash}")
+            return cached
         
         print(f"🧠 DEBUG: Generating new insights for content hash: {content_hash}")
         
@@ -489,6 +562,9 @@ Keep each section 2-3 sentences, conversational tone suitable for audio.
         # Use LLM service to generate insights
         insights_response = llm_service.generate_related_content_insights(selected_text, related_sections)
         
+        # A fallback/timeout answer from the LLM service is only cached briefly here too
+        llm_negative = llm_insights_cache.is_negative(related_insights_key(selected_text, related_sections))
+        
         # Try to parse as JSON, fallback to structured text if needed
         try:
             import json
@@ -506,7 +582,7 @@ Keep each section 2-3 sentences, conversational tone suitable for audio.
             }
         
         # Cache the insights for future requests
-        insights_cache[content_hash] = insights_data
+        insights_cache.set(content_hash, insights_data, negative=llm_negative)
         print(f"💾 DEBUG: Cached insights for content hash: {content_hash}")
         
         return insights_data
@@ -524,10 +600,10 @@ Keep each section 2-3 sentences, conversational tone suitable for audio.
             'conclusion': "Continue exploring these connections to deepen your understanding."
         }
         
-        # Cache fallback insights too
+        # Cache fallback insights briefly so a failing provider is retried soon
         content_for_hash = f"{selected_text}|{str(related_sections)}"
         content_hash = hashlib.md5(content_for_hash.encode()).hexdigest()[:12]
-        insights_cache[content_hash] = fallback_insights
+        insights_cache.set(content_hash, fallback_insights, negative=True)
         
         return fallback_insights
 
@@ -538,16 +614,14 @@ async def _generate_audio_file(script: str, audio_type: str, voice: str = "femal
         content_hash = hashlib.md5(f"{script}_{audio_type}".encode()).hexdigest()
         
         # Check if we already have this content cached for the requested voice
-        if content_hash in audio_cache and voice in audio_cache[content_hash]:
-            cached_file = audio_cache[content_hash][voice]
+        cached_file = audio_cache.get(f"{content_hash}:{voice}")
+        if cached_file:
             if os.path.exists(cached_file):
                 print(f"🔄 Using cached audio for {voice} voice: {cached_file}")
                 return cached_file
             else:
                 # Remove invalid cache entry
-                del audio_cache[content_hash][voice]
-                if not audio_cache[content_hash]:
-                    del audio_cache[content_hash]
+                audio_cache.delete(f"{content_hash}:{voice}")
         
         # Generate audio file with hash-based filename for proper caching
         audio_filename = f"audio_{audio_type}_{voice}_{speed}x_{content_hash[:8]}.mp3"
@@ -563,9 +637,7 @@ async def _generate_audio_file(script: str, audio_type: str, voice: str = "femal
         
         if success and os.path.exists(audio_file_path):
             # Cache the generated file
-            if content_hash not in audio_cache:
-                audio_cache[content_hash] = {}
-            audio_cache[content_hash][voice] = audio_file_path
+            audio_cache.set(f"{content_hash}:{voice}", audio_file_path)
             print(f"💾 Cached audio file for {voice} voice")
             
             return audio_file_path
@@ -585,5 +657,13 @@ async def insights_health_check():
             "Insights Bulb (+5 bonus points)",
             "Audio Overview/Podcast Mode (+5 bonus points)"
         ],
+        "llm_dispatcher": llm_dispatcher.describe(),
+        "llm_router": llm_router.describe(),
+        "ingestion": ingestion_service.describe(),
+        "execution": execution_layer.describe(),
+        "response_caches": describe_response_caches(),
+        "semantic_llm_cache": semantic_llm_cache.describe(),
+        "single_flight": single_flight.describe(),
+        "context_packer": context_packer.describe(),
         "ready_for_finale": True
     }
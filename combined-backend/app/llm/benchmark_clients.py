@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+LLM client pooling benchmark
+Per-call latency of chat_with_llm against an in-process stub Ollama server (see stub_provider),
+with pooled provider clients versus a fresh client for every call (the pool is cleared before
+each call, so every call pays for client construction and a new TCP connection)
+- sync: get_llm_response (requests.Session)
+- async: get_llm_response_async (httpx.AsyncClient)
+
+Usage (from combined-backend/):
+    python -m app.llm.benchmark_clients
+    python -m app.llm.benchmark_clients --calls 500 --delay 0.001 --output clients.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from .stub_provider import StubProvider
+
+# chat_with_llm lives at the project root
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+import chat_with_llm
+
+MESSAGES = [{"role": "user", "content": "benchmark"}]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    milliseconds = np.asarray(latencies) * 1000
+    return {
+        "p50_ms": round(float(np.percentile(milliseconds, 50)), 3),
+        "p95_ms": round(float(np.percentile(milliseconds, 95)), 3),
+        "mean_ms": round(float(milliseconds.mean()), 3)
+    }
+
+
+def bench_sync(calls: int, pooled: bool) -> Dict[str, float]:
+    latencies = []
+    for _ in range(calls + 1):
+        if not pooled:
+            chat_with_llm._client_pool.clear()
+        start_time = time.perf_counter()
+        if not chat_with_llm.get_llm_response(MESSAGES, provider="ollama"):
+            raise RuntimeError("Stub server gave no answer")
+        latencies.append(time.perf_counter() - start_time)
+    return summarize(latencies[1:])  # First call warms up imports and the pool
+
+
+async def bench_async(calls: int, pooled: bool) -> Dict[str, float]:
+    latencies = []
+    for _ in range(calls + 1):
+        if not pooled:
+            # Dropped, not closed, like a per-call client that nobody closes
+            chat_with_llm._client_pool.clear()
+        start_time = time.perf_counter()
+        if not await chat_with_llm.get_llm_response_async(MESSAGES, provider="ollama"):
+            raise RuntimeError("Stub server gave no answer")
+        latencies.append(time.perf_counter() - start_time)
+    return summarize(latencies[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare pooled and per-call LLM provider clients')
+    parser.add_argument('--calls', type=int, default=200, help='Calls per mode')
+    parser.add_argument('--delay', type=float, default=0.0, help='Stub server answer delay in seconds')
+    parser.add_argument('--output', type=str, default=None, help='Write results as JSON')
+    args = parser.parse_args()
+
+    stub = StubProvider(delay=args.delay).start()
+    os.environ["OLLAMA_BASE_URL"] = stub.url
+    try:
+        results = {}
+        for mode, pooled in (("per_call", False), ("pooled", True)):
+            print(f"🔬 {mode}: {args.calls} sync + {args.calls} async calls...")
+            results[mode] = {
+                "sync": bench_sync(args.calls, pooled),
+                "async": asyncio.run(bench_async(args.calls, pooled))
+            }
+    finally:
+        stub.stop()
+
+    print(f"\n{'='*60}")
+    print(f"{'mode':<10}{'path':<8}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for mode, paths in results.items():
+        for path, stats in paths.items():
+            print(f"{mode:<10}{path:<8}{stats['p50_ms']:>10}{stats['p95_ms']:>10}{stats['mean_ms']:>10}")
+    print(f"\nClient pool: {chat_with_llm.describe_llm_clients()}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({"calls": args.calls, "stub_delay_seconds": args.delay, "results": results}, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+LLM dispatcher check
+Runs the dispatcher, through the provider router, against in-process stub providers (see
+stub_provider) and checks:
+- Concurrency: a fan-out never has more calls in flight than LLM_MAX_CONCURRENCY
+- Rate limiting: the token bucket of the provider that receives the calls (after failover)
+  spaces them out
+- Retries: failed calls are retried with jittered exponential backoff until one succeeds
+- Ordering: map_sync() and map() return results in input order, whatever order calls finish in
+
+Usage (from combined-backend/):
+    python -m app.llm.check_dispatcher
+"""
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from .stub_provider import StubProvider
+from ..services.llm_dispatcher import LLMDispatcher
+from ..services.llm_router import LLMProviderRouter, TokenBucket
+
+
+def make_dispatcher(stubs: List[StubProvider], max_concurrency: int = 4, max_retries: int = 0,
+                    rate: float = 1000) -> Tuple[LLMDispatcher, LLMProviderRouter]:
+    router = LLMProviderRouter(providers=[f"ollama@{stub.url}" for stub in stubs])
+    router.attempt_timeout = 5.0
+    router.failure_threshold = 100  # Keep failing stubs in rotation
+    router.hedge_enabled = False
+    router.rate_limit_rps, router.rate_limit_burst = rate, 1
+    router._executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix="llm-provider")
+    dispatcher = LLMDispatcher(max_concurrency=max_concurrency, max_retries=max_retries, backoff_base=0.05,
+                               llm_fn=router.complete)
+    return dispatcher, router
+
+
+def prompts(count: int) -> List[list]:
+    return [[{"role": "user", "content": f"prompt {i}"}] for i in range(count)]
+
+
+def check_concurrency(stub: StubProvider) -> List[str]:
+    problems = []
+    stub.delay = 0.2
+    dispatcher, _ = make_dispatcher([stub], max_concurrency=2)
+    start_time = time.monotonic()
+    responses = dispatcher.map_sync(prompts(6))
+    elapsed = time.monotonic() - start_time
+    if not all(responses):
+        problems.append(f"{sum(not r for r in responses)} of 6 calls got no answer")
+    if stub.stats["max_in_flight"] != 2:
+        problems.append(f"{stub.stats['max_in_flight']} calls in flight at once, expected 2")
+    if elapsed < 0.55:
+        problems.append(f"6 calls of 0.2s on 2 slots took only {elapsed:.2f}s")
+    stub.delay = 0.0
+    return problems
+
+
+def check_rate_limit(primary: StubProvider, backup: StubProvider) -> List[str]:
+    """The primary (unlimited) fails, so every call lands on the backup, whose bucket (5/s, no burst) sets the pace"""
+    problems = []
+    primary.fail = True
+    dispatcher, router = make_dispatcher([primary, backup], max_concurrency=6, rate=5)
+    router.providers[0].bucket = TokenBucket(1000, 1000)
+    start_time = time.monotonic()
+    responses = dispatcher.map_sync(prompts(6))
+    elapsed = time.monotonic() - start_time
+    backup_stats = router.describe()["providers"][f"ollama@{backup.url}"]
+    if not all(responses):
+        problems.append(f"{sum(not r for r in responses)} of 6 calls got no answer")
+    if elapsed < 0.9:
+        problems.append(f"6 calls at 5/s took only {elapsed:.2f}s")
+    if not backup_stats["rate_limit_wait_seconds"]:
+        problems.append("no rate-limit wait recorded on the provider that received the calls")
+    primary.fail = False
+    return problems
+
+
+def check_retries(stub: StubProvider) -> List[str]:
+    problems = []
+    stub.fail_first = 2
+    dispatcher, _ = make_dispatcher([stub], max_retries=2)
+    if not dispatcher.call_sync(prompts(1)[0]):
+        problems.append("no answer after two failed attempts")
+    if dispatcher.describe()["stats"]["retries"] != 2 or stub.stats["requests"] != 3:
+        problems.append(f"expected 2 retries and 3 requests, got {dispatcher.describe()['stats']['retries']} "
+                        f"and {stub.stats['requests']}")
+    delays = [dispatcher._backoff_delay(1) for _ in range(100)]
+    nominal = dispatcher.backoff_base * 2
+    if min(delays) < 0.5 * nominal or max(delays) > 1.5 * nominal or len(set(delays)) < 50:
+        problems.append(f"backoff not jittered around {nominal}s ({min(delays):.3f}-{max(delays):.3f}s)")
+    return problems
+
+
+def check_ordering(stub: StubProvider) -> List[str]:
+    problems = []
+    stub.echo, stub.jitter = True, 0.2
+    dispatcher, _ = make_dispatcher([stub], max_concurrency=8)
+    batch = prompts(8)
+    expected = [f"prompt {i}" for i in range(8)]
+    for name, responses in (("map_sync", dispatcher.map_sync(batch)), ("map", asyncio.run(dispatcher.map(batch)))):
+        if [next((e for e in expected if r and e in r), None) for r in responses] != expected:
+            problems.append(f"{name} results out of input order")
+    stub.echo, stub.jitter = False, 0.0
+    return problems
+
+
+def main():
+    checks: List[Tuple[str, Callable[..., List[str]], int]] = [
+        ("bounded concurrency", check_concurrency, 1),
+        ("rate limit on the routed provider", check_rate_limit, 2),
+        ("retry with jittered backoff", check_retries, 1),
+        ("ordered results", check_ordering, 1),
+    ]
+    failed = 0
+    for name, check, stub_count in checks:
+        stubs = [StubProvider().start() for _ in range(stub_count)]
+        try:
+            problems = check(*stubs)
+        finally:
+            for stub in stubs:
+                stub.stop()
+        failed += bool(problems)
+        print(f"{'✅' if not problems else '❌'} {name}" + "".join(f"\n   - {problem}" for problem in problems))
+    print(f"\n{len(checks) - failed}/{len(checks)} dispatcher checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+LLM provider router check
+Runs the router against in-process stub providers (see stub_provider) and checks:
+- Failover: a failing and a slow provider pass the call to the next one
+- Circuit breaker: repeated failures open a circuit, an open provider is skipped, and a trial
+  call after the cooldown closes it again
+- Hedging: a provider slower than its own p95 gets the next provider started in parallel
+- Queueing: calls waiting for a router worker are not counted as provider timeouts
+- Streaming: a provider that fails before its first chunk passes the stream on
+
+Usage (from combined-backend/):
+    python -m app.llm.check_router
+"""
+
+import asyncio
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Tuple
+
+from .stub_provider import StubProvider
+from ..services.llm_router import LLMProviderRouter, OPEN, CLOSED
+
+MESSAGES = [{"role": "user", "content": "router check"}]
+
+
+def make_router(stubs: List[StubProvider], attempt_timeout: float = 1.0, workers: int = 8) -> LLMProviderRouter:
+    router = LLMProviderRouter(providers=[f"ollama@{stub.url}" for stub in stubs])
+    router.attempt_timeout = attempt_timeout
+    router.failure_threshold = 3
+    router.cooldown = 0.5
+    router.hedge_enabled = False
+    router.rate_limit_rps = router.rate_limit_burst = 1000  # Not under test here
+    router._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="llm-provider")
+    return router
+
+
+def stats(router: LLMProviderRouter, stub: StubProvider) -> dict:
+    return router.describe()["providers"][f"ollama@{stub.url}"]
+
+
+def check_failover(primary: StubProvider, backup: StubProvider) -> List[str]:
+    problems = []
+    primary.fail = True
+    router = make_router([primary, backup])
+    if not router.complete(MESSAGES):
+        problems.append("no answer although the backup is healthy")
+    if stats(router, primary)["failures"] != 1:
+        problems.append("failure of the primary not recorded")
+
+    # Slow primary: the attempt window (1s) moves the call on, and the client gives up with it
+    primary.fail, primary.delay = False, 3.0
+    router = make_router([primary, backup])
+    call_seconds = []
+    llm_fn = router.llm_fn
+
+    def timed_llm_fn(*args, **kwargs):
+        start_time = time.monotonic()
+        try:
+            return llm_fn(*args, **kwargs)
+        finally:
+            call_seconds.append(time.monotonic() - start_time)
+
+    router.llm_fn = timed_llm_fn
+    start_time = time.monotonic()
+    response = router.complete(MESSAGES)
+    elapsed = time.monotonic() - start_time
+    if not response or elapsed > 2.0:
+        problems.append(f"slow primary not bypassed (answer={bool(response)}, {elapsed:.1f}s)")
+    if stats(router, primary)["timeouts"] != 1:
+        problems.append("timeout of the primary not recorded")
+    time.sleep(0.5)
+    if len(call_seconds) < 2 or max(call_seconds) > router.attempt_timeout + 0.5:
+        problems.append(f"abandoned call kept its router worker ({[round(s, 1) for s in call_seconds]}s)")
+    primary.delay = 0.0
+    return problems
+
+
+def check_circuit(primary: StubProvider, backup: StubProvider) -> List[str]:
+    problems = []
+    primary.fail = True
+    router = make_router([primary, backup])
+    for _ in range(3):
+        router.complete(MESSAGES)
+    if stats(router, primary)["state"] != OPEN:
+        problems.append(f"circuit not open after 3 failures ({stats(router, primary)['state']})")
+    requests_before = primary.stats["requests"]
+    router.complete(MESSAGES)
+    if primary.stats["requests"] != requests_before or stats(router, primary)["short_circuited"] < 1:
+        problems.append("open circuit did not skip the primary")
+
+    primary.fail = False
+    time.sleep(router.cooldown + 0.1)
+    router.complete(MESSAGES)
+    if stats(router, primary)["state"] != CLOSED:
+        problems.append(f"trial call after the cooldown did not close the circuit ({stats(router, primary)['state']})")
+    return problems
+
+
+def check_hedging(primary: StubProvider, backup: StubProvider) -> List[str]:
+    problems = []
+    primary.delay, backup.delay = 0.05, 0.05
+    router = make_router([primary, backup], attempt_timeout=5.0)
+    router.hedge_enabled = True
+    router.hedge_min_samples = 5
+    for _ in range(5):
+        router.complete(MESSAGES)  # p95 samples for the primary
+
+    primary.delay = 2.0
+    start_time = time.monotonic()
+    response = router.complete(MESSAGES)
+    elapsed = time.monotonic() - start_time
+    if not response or elapsed > 1.0:
+        problems.append(f"hedge did not answer early (answer={bool(response)}, {elapsed:.2f}s)")
+    if stats(router, backup)["hedges_started"] != 1 or stats(router, backup)["hedge_wins"] != 1:
+        problems.append("hedge on the backup not started or not counted as a win")
+    primary.delay = backup.delay = 0.0
+    time.sleep(1.5)  # Let the losing call finish
+    return problems
+
+
+def check_queueing(primary: StubProvider) -> List[str]:
+    """6 concurrent calls on 2 router workers: later calls queue for longer than the 1s window"""
+    problems = []
+    primary.delay = 0.8
+    router = make_router([primary], attempt_timeout=1.0, workers=2)
+    with ThreadPoolExecutor(max_workers=6) as callers:
+        responses = list(callers.map(lambda _: router.complete(MESSAGES), range(6)))
+    provider = stats(router, primary)
+    if not all(responses):
+        problems.append(f"{sum(not r for r in responses)} of 6 queued calls got no answer")
+    if provider["timeouts"] or provider["state"] != CLOSED:
+        problems.append(f"queue wait counted against the provider ({provider['timeouts']} timeouts, {provider['state']})")
+    primary.delay = 0.0
+    return problems
+
+
+def check_streaming(primary: StubProvider, backup: StubProvider) -> List[str]:
+    problems = []
+    primary.fail = True
+    router = make_router([primary, backup])
+
+    async def collect() -> str:
+        return "".join([chunk async for chunk in router.astream(MESSAGES)])
+
+    text = asyncio.run(collect())
+    if text != "".join(backup.chunks):
+        problems.append(f"stream did not fail over to the backup ({text!r})")
+    if stats(router, backup)["ttft_p50_seconds"] is None:
+        problems.append("time to first token not recorded")
+    primary.fail = False
+    return problems
+
+
+def main():
+    checks: List[Tuple[str, Callable[..., List[str]], int]] = [
+        ("failover", check_failover, 2),
+        ("circuit breaker", check_circuit, 2),
+        ("hedging", check_hedging, 2),
+        ("queued calls", check_queueing, 1),
+        ("streaming failover", check_streaming, 2),
+    ]
+    failed = 0
+    for name, check, stub_count in checks:
+        stubs = [StubProvider().start() for _ in range(stub_count)]
+        try:
+            problems = check(*stubs)
+        finally:
+            for stub in stubs:
+                stub.stop()
+        failed += bool(problems)
+        print(f"{'✅' if not problems else '❌'} {name}" + "".join(f"\n   - {problem}" for problem in problems))
+    print(f"\n{len(checks) - failed}/{len(checks)} router checks passed")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
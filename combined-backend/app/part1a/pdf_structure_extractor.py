@@ -23,6 +23,10 @@ except ImportError as e:
     sys.exit(1)
 
 
+# Bump when the extraction heuristics change; cached outlines keyed on an older
+# version (or an older copy of this file) are discarded
+EXTRACTOR_VERSION = "1"
+
 # Set up basic logging
 logging.basicConfig(level=logging.ERROR, format='%(levelname)s: %(message)s')
 logger = logging.getLogger(__name__)
@@ -134,12 +138,14 @@ class MultilingualPDFExtractor:
             ]
         }
     
-    def extract_structure(self, pdf_path: str) -> Dict[str, Any]:
+    def extract_structure(self, pdf_path: str, raise_errors: bool = False) -> Dict[str, Any]:
         """
         Main method to extract title and headings from a PDF file.
         
         Args:
             pdf_path: Path to the PDF file
+            raise_errors: Raise when the PDF cannot be processed instead of returning an
+                empty outline (callers that cache results must not cache a failure)
             
         Returns:
             Dict containing title and outline structure
@@ -183,6 +189,8 @@ class MultilingualPDFExtractor:
                 
         except Exception as e:
             logger.error(f"Failed to process PDF {pdf_path}: {e}")
+            if raise_errors:
+                raise
             return {"title": "", "outline": []}
     
     def _get_text_blocks(self, doc: fitz.Document, page_count: int) -> List[Dict[str, Any]]:
@@ -1075,8 +1083,30 @@ class MultilingualPDFExtractor:
         except Exception as e:
             logger.error(f"Error saving to {output_path}: {e}")
 
-def process_all_pdfs() -> None:
-    """Process all PDF files in the input directory."""
+# Extractor reused by every file a pool worker handles
+_worker_extractor: Optional["MultilingualPDFExtractor"] = None
+
+def extract_structure_file(pdf_path: str, raise_errors: bool = False) -> Dict[str, Any]:
+    """Extract one PDF; module-level so it can run in a process pool worker."""
+    global _worker_extractor
+    if _worker_extractor is None:
+        _worker_extractor = MultilingualPDFExtractor()
+    return _worker_extractor.extract_structure(pdf_path, raise_errors)
+
+def process_all_pdfs(workers: int = None) -> None:
+    """
+    Process all PDF files in the input directory.
+    
+    Args:
+        workers: Worker processes (default: EXTRACTION_WORKERS or the number of cores)
+    """
+    try:
+        from app.utils.process_pool import parallel_map, default_worker_count
+    except ImportError:
+        # Run as a script: the project root is not on the path yet
+        sys.path.append(str(Path(__file__).resolve().parents[2]))
+        from app.utils.process_pool import parallel_map, default_worker_count
+    
     input_dir = Path("/app/input")
     output_dir = Path("/app/output")
     
@@ -1087,33 +1117,31 @@ def process_all_pdfs() -> None:
         print("Input directory /app/input not found")
         return
     
-    # Set up the extractor
-    extractor = MultilingualPDFExtractor()
-    pdf_files = list(input_dir.glob("*.pdf"))
+    # Sorted so output and logs are in the same order on every run
+    pdf_files = sorted(input_dir.glob("*.pdf"))
     
     if not pdf_files:
         print("No PDF files found in /app/input")
         return
     
-    print(f"Found {len(pdf_files)} PDF files to process...")
+    workers = workers or default_worker_count()
+    print(f"Found {len(pdf_files)} PDF files to process with {min(workers, len(pdf_files))} worker(s)...")
     
-    # Process each file
-    for pdf_file in pdf_files:
-        try:
-            print(f"Processing {pdf_file.name}...")
-            
-            # Extract the structure
-            result = extractor.extract_structure(str(pdf_file))
-            
-            # Save with matching filename
-            output_file = output_dir / f"{pdf_file.stem}.json"
-            extractor.save_output(result, str(output_file))
-            
-            print(f"✓ Completed: {output_file.name}")
-            
-        except Exception as e:
-            print(f"✗ Failed: {pdf_file.name} - {e}")
-            logger.error(f"Processing failed for {pdf_file.name}: {e}")
+    # Extract in parallel; each file succeeds or fails on its own
+    results = parallel_map(extract_structure_file, [str(pdf_file) for pdf_file in pdf_files], workers=workers)
+    
+    extractor = MultilingualPDFExtractor()
+    for pdf_file, (result, error) in zip(pdf_files, results):
+        if error:
+            print(f"✗ Failed: {pdf_file.name} - {error}")
+            logger.error(f"Processing failed for {pdf_file.name}: {error}")
+            continue
+        
+        # Save with matching filename
+        output_file = output_dir / f"{pdf_file.stem}.json"
+        extractor.save_output(result, str(output_file))
+        
+        print(f"✓ Completed: {output_file.name}")
 
 def main() -> None:
     """Main entry point."""
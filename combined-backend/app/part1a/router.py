@@ -3,14 +3,21 @@ FastAPI router for Part 1A (PDF Structure Extractor)
 Extracts title and headings from PDF files
 """
 
+import asyncio
+import shutil
 import tempfile
 import os
+import time
 from pathlib import Path
-from typing import Dict, Any
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Any, List, Optional, Tuple
 from fastapi import APIRouter, UploadFile, File, HTTPException
 from fastapi.responses import JSONResponse
 
-from .pdf_structure_extractor import MultilingualPDFExtractor
+from .pdf_structure_extractor import extract_structure_file
+from ..services.outline_cache import outline_cache, hash_bytes
+from ..services.execution import execution_layer, ExecutorOverloaded
+from ..utils.process_pool import default_worker_count
 
 router = APIRouter(prefix="/part1a", tags=["PDF Structure Extraction"])
 
@@ -35,24 +42,39 @@ async def extract_pdf_structure(file: UploadFile = File(...)) -> Dict[str, Any]:
     temp_file_path = os.path.join(temp_dir, f"temp_{file.filename}")
     
     try:
-        # Save uploaded file to temporary location
-        with open(temp_file_path, "wb") as temp_file:
-            content = await file.read()
-            temp_file.write(content)
+        content = await file.read()
+        file_hash = hash_bytes(content)
         
-        # Initialize extractor and process the PDF
-        extractor = MultilingualPDFExtractor()
-        result = extractor.extract_structure(temp_file_path)
+        # Identical content is served from the outline cache
+        result, cache_status = outline_cache.get(file_hash)
+        if result is None:
+            # Save uploaded file to temporary location and parse it in the process pool
+            with open(temp_file_path, "wb") as temp_file:
+                temp_file.write(content)
+            start_time = time.time()
+            try:
+                result = await execution_layer.run_process(extract_structure_file, temp_file_path, True)
+                outline_cache.put(file_hash, result, time.time() - start_time)
+            except HTTPException:
+                raise
+            except Exception as e:
+                # Unreadable PDF: same empty outline as before, but not cached (may be transient)
+                print(f"⚠️ Part 1A extraction failed for {file.filename}: {e}")
+                result, cache_status = {"title": "", "outline": []}, "error"
         
         # Add metadata
         result["metadata"] = {
             "filename": file.filename,
             "file_size_bytes": len(content),
+            "file_hash": file_hash,
+            "cache": cache_status,
             "service": "PDF Structure Extractor (Part 1A)"
         }
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing PDF: {str(e)}")
     
@@ -64,10 +86,132 @@ async def extract_pdf_structure(file: UploadFile = File(...)) -> Dict[str, Any]:
             except:
                 pass
 
+async def _extract_files(paths: List[str], workers: int) -> List[Tuple[Optional[Dict[str, Any]], Any]]:
+    """
+    (result, error) per path, in order. Each file is one job on the process lane, so batches go
+    through the same admission control as /extract; at most `workers` of them are in the lane at
+    once. error is a message, or the ExecutorOverloaded raised when the lane was full
+    """
+    slots = asyncio.Semaphore(workers)
+
+    async def extract(path: str) -> Tuple[Optional[Dict[str, Any]], Any]:
+        async with slots:
+            try:
+                return await execution_layer.run_process(extract_structure_file, path, True), None
+            except ExecutorOverloaded as e:
+                return None, e
+            except BrokenProcessPool:
+                return None, "Worker process crashed"
+            except Exception as e:
+                return None, str(e) or type(e).__name__
+
+    return await asyncio.gather(*(extract(path) for path in paths))
+
+@router.post("/extract-batch")
+async def extract_pdf_structure_batch(
+    files: List[UploadFile] = File(...),
+    workers: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Extract title and heading structure from several PDF files in parallel.
+    
+    Args:
+        files: Uploaded PDF files
+        workers: Worker processes (default and maximum: EXTRACTION_WORKERS or the number of cores)
+        
+    Returns:
+        Dict with one result per file, in upload order, and batch metadata
+    """
+    
+    # Validate file types
+    for file in files:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(status_code=400, detail=f"Only PDF files are allowed: {file.filename}")
+    if workers is not None and workers < 1:
+        raise HTTPException(status_code=400, detail="workers must be at least 1")
+    
+    start_time = time.time()
+    # The shared pool never shrinks, so a request cannot grow it past the configured size
+    workers = min(workers or default_worker_count(), default_worker_count())
+    temp_dir = tempfile.mkdtemp(prefix="part1a_batch_")
+    
+    try:
+        results: List[Dict[str, Any]] = []
+        pending: Dict[str, str] = {}  # file hash -> temp path, identical uploads extracted once
+        
+        for index, file in enumerate(files):
+            content = await file.read()
+            file_hash = hash_bytes(content)
+            result, cache_status = outline_cache.get(file_hash)
+            if result is None and file_hash not in pending:
+                temp_file_path = os.path.join(temp_dir, f"{index}.pdf")
+                with open(temp_file_path, "wb") as temp_file:
+                    temp_file.write(content)
+                pending[file_hash] = temp_file_path
+            results.append({
+                "title": result["title"] if result else "",
+                "outline": result["outline"] if result else [],
+                "metadata": {
+                    "filename": file.filename,
+                    "file_size_bytes": len(content),
+                    "file_hash": file_hash,
+                    "cache": cache_status
+                }
+            })
+        
+        # Cache misses are parsed in the process pool, off the event loop
+        if pending:
+            hashes = list(pending)
+            extracted = await _extract_files([pending[file_hash] for file_hash in hashes], workers)
+            outcomes = dict(zip(hashes, extracted))
+            for file_hash, (result, error) in outcomes.items():
+                if not error:
+                    outline_cache.put(file_hash, result)
+            # The lane was full for some files: reject the batch (503 + Retry-After); the files
+            # already extracted are cached, so the retry only parses the rest
+            overloaded = next((error for _, error in extracted if isinstance(error, ExecutorOverloaded)), None)
+            if overloaded is not None:
+                raise overloaded
+            for entry in results:
+                outcome = outcomes.get(entry["metadata"]["file_hash"])
+                if outcome is None or entry["metadata"]["cache"] != "miss":
+                    continue
+                result, error = outcome
+                if error:
+                    entry["error"] = error
+                else:
+                    entry["title"], entry["outline"] = result["title"], result["outline"]
+        
+        return {
+            "results": results,
+            "metadata": {
+                "file_count": len(files),
+                "extracted": len(pending),
+                "cache_hits": sum(1 for entry in results if entry["metadata"]["cache"] != "miss"),
+                "failed": sum(1 for entry in results if "error" in entry),
+                "workers": min(workers, max(len(pending), 1)),
+                "processing_time_seconds": round(time.time() - start_time, 3),
+                "service": "PDF Structure Extractor (Part 1A)"
+            }
+        }
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing PDFs: {str(e)}")
+    
+    finally:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+
 @router.get("/health")
 async def health_check():
     """Health check endpoint for Part 1A"""
-    return {"status": "healthy", "service": "PDF Structure Extractor (Part 1A)"}
+    return {
+        "status": "healthy",
+        "service": "PDF Structure Extractor (Part 1A)",
+        "outline_cache": outline_cache.describe(),
+        "execution": execution_layer.describe()
+    }
 
 @router.get("/info")
 async def get_service_info():
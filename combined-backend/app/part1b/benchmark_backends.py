@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Inference backend benchmark
+Compares the torch, int8 and onnx backends on the sample_data collections:
+- Embeddings (all-MiniLM-L6-v2): load time, throughput, per-batch latency, and agreement of
+  the local section ranking with the torch fp32 ranking (top-1 / top-5 overlap, Spearman)
+- DistilGPT-2: load time and per-paragraph refinement latency (sampling, so no agreement score)
+
+Usage (from combined-backend/):
+    python -m app.part1b.benchmark_backends
+    python -m app.part1b.benchmark_backends --backends torch int8 --skip_gpt2 --output bench.json
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+os.environ['HF_HUB_DISABLE_SYMLINKS_WARNING'] = '1'
+
+from .document_processor import DocumentProcessor
+from .input_loader import load_input_json
+from .relevance_analyzer import RelevanceAnalyzer
+from .subsection_analyzer import SubSectionAnalyzer
+from ..services.inference_backend import INFERENCE_BACKENDS
+from ..services.embedding_cache import embedding_cache
+
+DEFAULT_SAMPLE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
+
+
+def load_collections(sample_data: str) -> List[Dict]:
+    """Sections, persona and job of every sample_data/collection*/input.json"""
+    processor = DocumentProcessor(load_header_model=False)
+    collections = []
+    for name in sorted(os.listdir(sample_data)):
+        input_json_path = os.path.join(sample_data, name, "input.json")
+        if not name.lower().startswith("collection") or not os.path.exists(input_json_path):
+            continue
+        config = load_input_json(input_json_path)
+        # Relative pdf_paths in input.json are relative to the part1b directory, like main.py
+        pdf_paths = [
+            path if os.path.isabs(path) else os.path.join(os.path.dirname(sample_data), path)
+            for path in config["pdf_paths"]
+        ]
+        sections = processor.batch_process_pdfs(pdf_paths, config["persona"], config["job"], workers=1)
+        collections.append({"name": name, "persona": config["persona"], "job": config["job"], "sections": sections})
+        print(f"📁 {name}: {len(sections)} sections from {len(pdf_paths)} PDFs")
+    return collections
+
+
+def spearman(order_a: List[int], order_b: List[int]) -> float:
+    """Spearman rank correlation of two orderings of the same items"""
+    n = len(order_a)
+    if n < 2:
+        return 1.0
+    rank_a = np.empty(n)
+    rank_b = np.empty(n)
+    rank_a[order_a] = np.arange(n)
+    rank_b[order_b] = np.arange(n)
+    return float(1 - 6 * np.sum((rank_a - rank_b) ** 2) / (n * (n ** 2 - 1)))
+
+
+def rank_order(analyzer: RelevanceAnalyzer, collection: Dict) -> List[int]:
+    """Local (no LLM) ranking of a collection's sections, as indexes into collection["sections"]"""
+    sections = [dict(section, _index=i) for i, section in enumerate(collection["sections"])]
+    ranked = analyzer.rank_sections(sections, collection["persona"], collection["job"])
+    return [section["_index"] for section in ranked]
+
+
+def bench_embeddings(backend: str, collections: List[Dict], repeats: int) -> Dict:
+    start_time = time.time()
+    analyzer = RelevanceAnalyzer(backend=backend)
+    load_seconds = time.time() - start_time
+    analyzer.use_gemini_enhancement = False  # Rankings must only depend on the embeddings
+
+    texts = [section.get('content', '')[:512] for c in collections for section in c["sections"]]
+    batch_size = analyzer.encode_batch_size
+    analyzer._encode_normalized(texts[:batch_size])  # Warm-up
+
+    latencies = []
+    start_time = time.time()
+    for _ in range(repeats):
+        for offset in range(0, len(texts), batch_size):
+            batch_start = time.perf_counter()
+            analyzer._encode_normalized(texts[offset:offset + batch_size])
+            latencies.append(time.perf_counter() - batch_start)
+    total_seconds = time.time() - start_time
+
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "texts": len(texts) * repeats,
+        "texts_per_second": round(len(texts) * repeats / total_seconds, 1) if total_seconds else None,
+        "batch_latency_ms_p50": round(float(np.percentile(latencies, 50)) * 1000, 1) if latencies else None,
+        "batch_latency_ms_p95": round(float(np.percentile(latencies, 95)) * 1000, 1) if latencies else None,
+        "rankings": {c["name"]: rank_order(analyzer, c) for c in collections}
+    }
+
+
+def bench_gpt2(backend: str, paragraphs: List[str], persona: str, job: str) -> Dict:
+    import torch
+
+    start_time = time.time()
+    analyzer = SubSectionAnalyzer(backend=backend)
+    load_seconds = time.time() - start_time
+    analyzer.refine_contents(paragraphs[:1], persona, job)  # Warm-up
+
+    torch.manual_seed(0)
+    start_time = time.time()
+    refined = analyzer.refine_contents(paragraphs, persona, job)
+    total_seconds = time.time() - start_time
+    return {
+        "load_seconds": round(load_seconds, 2),
+        "paragraphs": len(paragraphs),
+        "seconds_per_paragraph": round(total_seconds / len(paragraphs), 3) if paragraphs else None,
+        "sample": refined[0][:200] if refined else ""
+    }
+
+
+def agreement(rankings: Dict[str, List[int]], baseline: Dict[str, List[int]]) -> Dict:
+    top1, top5, correlations = [], [], []
+    for name, order in rankings.items():
+        reference = baseline[name]
+        if not reference:
+            continue
+        top1.append(float(order[0] == reference[0]))
+        k = min(5, len(reference))
+        top5.append(len(set(order[:k]) & set(reference[:k])) / k)
+        correlations.append(spearman(order, reference))
+    return {
+        "top1_match": round(float(np.mean(top1)), 3) if top1 else None,
+        "top5_overlap": round(float(np.mean(top5)), 3) if top5 else None,
+        "spearman": round(float(np.mean(correlations)), 4) if correlations else None
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare torch / int8 / onnx inference backends')
+    parser.add_argument('--sample_data', type=str, default=DEFAULT_SAMPLE_DATA, help='Folder with collection*/input.json')
+    parser.add_argument('--backends', nargs='+', choices=INFERENCE_BACKENDS, default=list(INFERENCE_BACKENDS))
+    parser.add_argument('--repeats', type=int, default=3, help='Passes over all section texts per backend')
+    parser.add_argument('--gpt2_paragraphs', type=int, default=8, help='Paragraphs refined per backend')
+    parser.add_argument('--skip_gpt2', action='store_true', help='Only benchmark the embedding model')
+    parser.add_argument('--output', type=str, help='Write the results as JSON')
+    args = parser.parse_args()
+
+    # Measure the models, not the embedding cache
+    embedding_cache.enabled = False
+    collections = load_collections(args.sample_data)
+    if not collections:
+        print(f"❌ No collections found in {args.sample_data}")
+        return
+
+    # torch fp32 is the reference ranking
+    backends = ["torch"] + [b for b in args.backends if b != "torch"]
+    results = {"embedding": {}, "gpt2": {}}
+    for backend in backends:
+        print(f"\n🔬 Embeddings on {backend}...")
+        results["embedding"][backend] = bench_embeddings(backend, collections, args.repeats)
+    baseline = results["embedding"]["torch"]["rankings"]
+    for backend, result in results["embedding"].items():
+        result["agreement_with_torch"] = agreement(result.pop("rankings"), baseline)
+
+    if not args.skip_gpt2:
+        first = collections[0]
+        paragraphs = [
+            p.strip() for section in first["sections"] for p in section.get('content', '').split('\n\n')
+            if len(p.strip()) >= 30
+        ][:args.gpt2_paragraphs]
+        for backend in backends:
+            print(f"\n🔬 DistilGPT-2 on {backend}...")
+            results["gpt2"][backend] = bench_gpt2(backend, paragraphs, first["persona"], first["job"])
+
+    print(f"\n{'='*78}")
+    print(f"{'backend':<8}{'load s':>8}{'texts/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'top1':>7}{'top5':>7}{'rho':>8}{'gpt2 s/para':>12}")
+    for backend, r in results["embedding"].items():
+        a = r["agreement_with_torch"]
+        gpt2 = results["gpt2"].get(backend, {}).get("seconds_per_paragraph")
+        row = [r['load_seconds'], r['texts_per_second'], r['batch_latency_ms_p50'], r['batch_latency_ms_p95'],
+               a['top1_match'], a['top5_overlap'], a['spearman'], gpt2]
+        widths = [8, 10, 9, 9, 7, 7, 8, 12]
+        print(f"{backend:<8}" + "".join(f"{'-' if v is None else v:>{w}}" for v, w in zip(row, widths)))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"Results saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
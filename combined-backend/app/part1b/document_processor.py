@@ -7,67 +7,70 @@ Handles direct PDF text extraction and section extraction
 import fitz  
 import re
 import os
-from typing import List, Dict
-import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
+from typing import Callable, List, Dict, Optional
+
+from ..services.model_registry import model_registry
+from ..utils.process_pool import parallel_map
 
 class DocumentProcessor:
     """Handles PDF processing and section extraction"""
     
-    def __init__(self):
+    def __init__(self, load_header_model: bool = True):
+        self.header_tokenizer = None
+        self.header_model = None
+        if not load_header_model:
+            # Section extraction itself never calls the model (pool workers skip it)
+            return
         try:
-            print("Loading DistilGPT-2 for intelligent header selection...")
-            
-            # Try to load from local cache first (created during Docker build)
-            try:
-                self.header_tokenizer = GPT2Tokenizer.from_pretrained('distilgpt2', local_files_only=True)
-                self.header_model = GPT2LMHeadModel.from_pretrained('distilgpt2', local_files_only=True)
-                print("📁 Loaded models from local cache")
-            except:
-                # Fallback to online download (for development)
-                self.header_tokenizer = GPT2Tokenizer.from_pretrained('distilgpt2')
-                self.header_model = GPT2LMHeadModel.from_pretrained('distilgpt2')
-                print("🌐 Downloaded models from Hugging Face Hub")
-            
-            if self.header_tokenizer.pad_token is None:
-                self.header_tokenizer.pad_token = self.header_tokenizer.eos_token
-            print("DistilGPT-2 for header selection loaded successfully!")
+            # Shared with SubSectionAnalyzer through the model registry
+            self.header_tokenizer, self.header_model = model_registry.get_gpt2('distilgpt2')
         except Exception as e:
             print(f"Failed to load DistilGPT-2 for header selection: {e}")
-            self.header_tokenizer = None
-            self.header_model = None
     
-    def batch_process_pdfs(self, pdf_paths: List[str], persona: str = "", job: str = "") -> List[Dict]:
-        """Process multiple PDFs with direct text extraction"""
-        processed_docs = []
-        
+    def batch_process_pdfs(self, pdf_paths: List[str], persona: str = "", job: str = "",
+                           workers: int = None,
+                           on_document: Callable[[str, List[Dict], Optional[str]], None] = None) -> List[Dict]:
+        """
+        Process multiple PDFs with direct text extraction
+        PDFs are parsed in parallel worker processes (workers defaults to EXTRACTION_WORKERS or
+        the number of cores); sections are returned in pdf_paths order
+        on_document(pdf_path, sections, error) is called as each PDF finishes, in completion order
+        """
+        existing_paths = []
         for pdf_path in pdf_paths:
             if not os.path.exists(pdf_path):
                 print(f"Warning: File not found - {pdf_path}")
                 continue
-                
-            try:
-                print(f"   Processing: {os.path.basename(pdf_path)}")
-                
-                doc_sections = []
-                pdf_document = fitz.open(pdf_path)
-                for page_num in range(len(pdf_document)):
-                    page = pdf_document[page_num]
-                    raw_text = page.get_text("text")
-                    if raw_text.strip():
-                        cleaned_text = self.clean_text(raw_text)
-                        sections = self.extract_sections(cleaned_text, page_num + 1, pdf_path, persona, job)
-                        doc_sections.extend(sections)
-
-                processed_docs.extend(doc_sections)
-                print(f"   Extracted {len(doc_sections)} sections from {os.path.basename(pdf_path)}")
-                
-            except Exception as e:
-                print(f"Error processing {pdf_path}: {str(e)}")
+            existing_paths.append(pdf_path)
+        
+        processed_docs = []
+        def report(index: int, doc_sections: Optional[List[Dict]], error: Optional[str]) -> None:
+            if on_document:
+                on_document(existing_paths[index], doc_sections or [], error)
+        
+        results = parallel_map(extract_pdf_sections, existing_paths, persona, job, workers=workers, on_result=report)
+        for pdf_path, (doc_sections, error) in zip(existing_paths, results):
+            if error:
+                print(f"Error processing {pdf_path}: {error}")
                 continue
+            processed_docs.extend(doc_sections)
+            print(f"   Extracted {len(doc_sections)} sections from {os.path.basename(pdf_path)}")
         
         return processed_docs
     
+    def process_pdf(self, pdf_path: str, persona: str = "", job: str = "") -> List[Dict]:
+        """Extract the sections of one PDF"""
+        doc_sections = []
+        with fitz.open(pdf_path) as pdf_document:
+            for page_num in range(len(pdf_document)):
+                page = pdf_document[page_num]
+                raw_text = page.get_text("text")
+                if raw_text.strip():
+                    cleaned_text = self.clean_text(raw_text)
+                    sections = self.extract_sections(cleaned_text, page_num + 1, pdf_path, persona, job)
+                    doc_sections.extend(sections)
+        return doc_sections
+    
     def clean_text(self, text: str) -> str:
         """Clean OCR text"""
         text = re.sub(r'\n\s*\n', '\n\n', text)
@@ -231,4 +234,16 @@ class DocumentProcessor:
             r'^[A-Z]{2,}$'  # All caps short words
         ]
         
-        return any(re.match(pattern, line) for pattern in header_patterns)
\ No newline at end of file
+        return any(re.match(pattern, line) for pattern in header_patterns)
+
+
+# Processor reused by every file a pool worker handles
+_worker_processor: Optional[DocumentProcessor] = None
+
+def extract_pdf_sections(pdf_path: str, persona: str = "", job: str = "") -> List[Dict]:
+    """Sections of one PDF; module-level so it can run in a process pool worker"""
+    global _worker_processor
+    if _worker_processor is None:
+        _worker_processor = DocumentProcessor(load_header_model=False)
+    print(f"   Processing: {os.path.basename(pdf_path)}")
+    return _worker_processor.process_pdf(pdf_path, persona, job)
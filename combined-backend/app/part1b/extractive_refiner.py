@@ -0,0 +1,78 @@
+# src/extractive_refiner.py
+import os
+import re
+import numpy as np
+from typing import List, Dict
+
+# Sentence boundaries: terminal punctuation followed by whitespace, line breaks and bullets
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+|\s*\n+\s*|\s*[•▪●]\s*')
+
+class ExtractiveRefiner:
+    """
+    Builds refined_text by selecting the most job-relevant sentences of a paragraph
+    (maximal marginal relevance over sentence embeddings) instead of sampling DistilGPT-2.
+    Uses the RelevanceAnalyzer's sentence transformer and the job vectors from ranking, so
+    it is fast and returns the same text for the same input every time.
+    """
+
+    def __init__(self, relevance_analyzer):
+        self.relevance_analyzer = relevance_analyzer
+        self.max_sentences = int(os.getenv("EXTRACTIVE_MAX_SENTENCES", "3"))
+        self.max_chars = int(os.getenv("EXTRACTIVE_MAX_CHARS", "600"))
+        # 1.0 = pure relevance, lower values penalise sentences similar to ones already picked
+        self.mmr_lambda = float(os.getenv("EXTRACTIVE_MMR_LAMBDA", "0.7"))
+
+    def split_sentences(self, paragraph: str) -> List[str]:
+        """Sentences of a paragraph; fragments of fewer than 3 words are dropped unless nothing else is left"""
+        parts = [part.strip() for part in SENTENCE_SPLIT.split(paragraph) if part and part.strip()]
+        sentences = [part for part in parts if len(part.split()) >= 3]
+        return sentences or parts
+
+    def refine_many(self, paragraphs: List[str], job: str, job_vectors: Dict[str, np.ndarray] = None) -> List[str]:
+        """
+        Extractive refined_text for each paragraph
+        All sentences of all paragraphs are encoded in one batch; job_vectors (from
+        RelevanceAnalyzer.encode_job_context) are encoded here only if not provided
+        """
+        sentence_lists = [self.split_sentences(paragraph) for paragraph in paragraphs]
+        flat_sentences = [sentence for sentences in sentence_lists for sentence in sentences]
+        if not flat_sentences:
+            return list(paragraphs)
+
+        if job_vectors is None:
+            job_vectors = self.relevance_analyzer.encode_job_context(job)
+        embeddings = self.relevance_analyzer._encode_normalized(flat_sentences)
+
+        # Same multi-context relevance as section ranking: 70% best match, 30% average
+        context_sims = embeddings @ job_vectors["contexts"].T
+        relevance = 0.7 * context_sims.max(axis=1) + 0.3 * context_sims.mean(axis=1)
+
+        refined = []
+        offset = 0
+        for paragraph, sentences in zip(paragraphs, sentence_lists):
+            count = len(sentences)
+            if count == 0:
+                refined.append(paragraph)
+                continue
+            selected = self._select(embeddings[offset:offset + count], relevance[offset:offset + count], sentences)
+            refined.append(" ".join(sentences[i] for i in sorted(selected)))
+            offset += count
+        return refined
+
+    def _select(self, embeddings: np.ndarray, relevance: np.ndarray, sentences: List[str]) -> List[int]:
+        """Greedy MMR within one paragraph; ties go to the earlier sentence (np.argmax)"""
+        selected = []
+        remaining = np.ones(len(sentences), dtype=bool)
+        max_redundancy = np.zeros(len(sentences), dtype=np.float32)
+        total_chars = 0
+        while remaining.any() and len(selected) < self.max_sentences:
+            scores = self.mmr_lambda * relevance - (1.0 - self.mmr_lambda) * max_redundancy
+            scores = np.where(remaining, scores, -np.inf)
+            best = int(np.argmax(scores))
+            remaining[best] = False
+            if selected and total_chars + len(sentences[best]) > self.max_chars:
+                continue
+            selected.append(best)
+            total_chars += len(sentences[best])
+            max_redundancy = np.maximum(max_redundancy, embeddings @ embeddings[best])
+        return selected
@@ -10,7 +10,7 @@ import json
 import sys
 import argparse
 from datetime import datetime
-from src.pipeline import DocumentAnalysisPipeline
+from src.pipeline import DocumentAnalysisPipeline, REFINEMENT_MODES
 from src.input_loader import load_input_json
 
 def main():
@@ -20,6 +20,8 @@ def main():
     parser = argparse.ArgumentParser(description='Document Analysis Pipeline')
     parser.add_argument('--input_json', type=str, help='Path to input JSON configuration file')
     parser.add_argument('--collection', type=str, help='Collection name (e.g., collection1, collection2)')
+    parser.add_argument('--refinement_mode', type=str, choices=REFINEMENT_MODES, default=None,
+                        help='How refined_text is produced: generative (DistilGPT-2) or extractive (deterministic, fast)')
     args = parser.parse_args()
     
     # Reduce annoying warnings
@@ -28,7 +30,7 @@ def main():
     # If no arguments provided, process all collections automatically
     if not args.input_json and not args.collection:
         print("No arguments provided. Processing all collections automatically...")
-        process_all_collections()
+        process_all_collections(args.refinement_mode)
         return
     
     # Determine input and output based on collection structure
@@ -150,7 +152,8 @@ def main():
     print("Starting document analysis...")
     try:
         print("DEBUG: About to call analyzer.process_documents...")
-        analysis_result = analyzer.process_documents(pdf_paths, user_persona, user_task)
+        analysis_result = analyzer.process_documents(pdf_paths, user_persona, user_task,
+                                                     refinement_mode=args.refinement_mode)
         print("DEBUG: analyzer.process_documents completed successfully")
         
         # Save the results
@@ -169,7 +172,7 @@ def main():
         traceback.print_exc()
         return
 
-def process_all_collections():
+def process_all_collections(refinement_mode=None):
     """Process all collections automatically"""
     print("🔍 Scanning for collections...")
     
@@ -217,7 +220,8 @@ def process_all_collections():
             analyzer = DocumentAnalysisPipeline()
             
             # Process documents
-            analysis_result = analyzer.process_documents(pdf_paths, user_persona, user_task)
+            analysis_result = analyzer.process_documents(pdf_paths, user_persona, user_task,
+                                                         refinement_mode=refinement_mode)
             
             # Save results
             with open(output_json_path, 'w') as f:
@@ -2,13 +2,16 @@
 import time
 import os
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 
 # Reduce warnings
 os.environ['HF_HUB_DISABLE_SYMLINKS_WARNING'] = '1'
 
 from .document_processor import DocumentProcessor
 
+# refined_text: sampled DistilGPT-2 summary, or job-relevant sentences picked with MMR (deterministic)
+REFINEMENT_MODES = ("generative", "extractive")
+
 class DocumentAnalysisPipeline:
     """Main pipeline that coordinates the whole analysis process"""
     
@@ -20,6 +23,12 @@ class DocumentAnalysisPipeline:
         self.shared_model = None
         self.shared_tokenizer = None
         
+        # How many ranked sections to keep for deduplication (top-k via argpartition)
+        self.ranking_shortlist = int(os.getenv("PART1B_RANKING_SHORTLIST", "50"))
+        
+        # Default refinement mode, overridable per request
+        self.refinement_mode = os.getenv("PART1B_REFINEMENT_MODE", "generative").lower()
+        
         # Try to load the relevance analyzer
         try:
             from .relevance_analyzer import RelevanceAnalyzer
@@ -40,15 +49,39 @@ class DocumentAnalysisPipeline:
             print(f"Couldn't load subsection analyzer: {e}")
             self.subsection_analyzer = None
     
-    def process_documents(self, pdf_paths: List[str], persona: str = "Researcher", job: str = "Analyze document content") -> Dict:
-        """Main function that processes a bunch of PDFs and returns analysis results"""
+    def process_documents(self, pdf_paths: List[str], persona: str = "Researcher", job: str = "Analyze document content",
+                          llm_shortlist: int = None, llm_budget: int = None,
+                          progress: Callable[..., None] = None, refinement_mode: str = None) -> Dict:
+        """
+        Main function that processes a bunch of PDFs and returns analysis results
+        llm_shortlist / llm_budget override the cascade ranking knobs for this request
+        refinement_mode ("generative" or "extractive") overrides PART1B_REFINEMENT_MODE
+        progress(stage, fraction, data) is called between stages with partial results
+        ("document_parsed", "ranked"); an exception raised by it aborts the run
+        """
+        refinement_mode = (refinement_mode or self.refinement_mode).lower()
+        if refinement_mode not in REFINEMENT_MODES:
+            raise ValueError(f"Unknown refinement mode '{refinement_mode}' (expected one of {', '.join(REFINEMENT_MODES)})")
+        
         start_time = time.time()
+        report = progress or (lambda stage, fraction, data=None: None)
+        report("extracting", 0.05)
+        
+        parsed_documents = []
+        def on_document(pdf_path: str, sections: List[Dict], error: Optional[str]) -> None:
+            parsed_documents.append(pdf_path)
+            report("document_parsed", 0.05 + 0.3 * len(parsed_documents) / max(len(pdf_paths), 1), {
+                "document": os.path.basename(str(pdf_path)),
+                "sections_found": len(sections),
+                "section_titles": [section['section_title'] for section in sections[:10]],
+                "error": error
+            })
         
         print("DEBUG: Starting process_documents...")
         print("Processing PDF documents...")
         # Extract sections from all the PDFs
         print("DEBUG: About to call batch_process_pdfs...")
-        all_sections = self.doc_processor.batch_process_pdfs(pdf_paths, persona, job)
+        all_sections = self.doc_processor.batch_process_pdfs(pdf_paths, persona, job, on_document=on_document)
         print("DEBUG: batch_process_pdfs completed")
         print(f"   Found {len(all_sections)} sections total")
         
@@ -104,15 +137,23 @@ class DocumentAnalysisPipeline:
             return basic_result
         
         # Rank sections by relevance (limit processing time)
+        report("ranking", 0.35)
         print("DEBUG: About to start ranking sections...")
         print("🎯 Ranking sections by relevance...")
         try:
-            ranked_sections = self.relevance_analyzer.rank_sections(all_sections, persona, job)
+            ranked_sections = self.relevance_analyzer.rank_sections(
+                all_sections, persona, job,
+                top_k=self.ranking_shortlist,
+                llm_shortlist=llm_shortlist,
+                llm_budget=llm_budget
+            )
+            ranking_stages = self.relevance_analyzer.last_ranking_stats
             print("DEBUG: Ranking completed successfully")
         except Exception as e:
             print(f"❌ Ranking failed: {e}")
             # Use sections as-is if ranking fails
             ranked_sections = all_sections
+            ranking_stages = {"mode": "unranked", "local_stage_sections": 0, "llm_stage_sections": 0}
             for i, section in enumerate(ranked_sections, 1):
                 section['importance_rank'] = i
                 section['relevance_score'] = 0.5  # Default score
@@ -163,15 +204,34 @@ class DocumentAnalysisPipeline:
             for i, section in enumerate(selected_sections)
         ]
 
+        # Top sections are final here; publish them before the slow subsection refinement
+        report("ranked", 0.6, {"extracted_sections": extracted_sections, "ranking_stages": ranking_stages})
+        
         # Analyze subsections for top 5 sections only
         print("🔍 Analyzing subsections...")
         top_sections = selected_sections
         print(f"   Analyzing subsections for {len(top_sections)} top sections...")
         subsection_analysis = []
 
+        refine = None
+        if refinement_mode == "extractive":
+            from .extractive_refiner import ExtractiveRefiner
+            extractive_refiner = ExtractiveRefiner(self.relevance_analyzer)
+            job_vectors = getattr(self.relevance_analyzer, 'last_job_vectors', None)
+            refine = lambda paragraphs: extractive_refiner.refine_many(paragraphs, job, job_vectors)
+        
+        survivors_only = getattr(self.subsection_analyzer, 'survivors_only', False)
         for i, section in enumerate(top_sections):
+            # Sections are in rank order: once 5 subsections exist, later sections cannot make the cut
+            if survivors_only and len(subsection_analysis) >= 5:
+                print(f"   Top 5 subsections filled, skipping {len(top_sections) - i} remaining sections")
+                break
+            report("refining", 0.6 + 0.35 * i / len(top_sections), {"section_title": section.get('section_title', '')})
             print(f"   Processing section {i+1}/{len(top_sections)}: {section.get('section_title', 'Unknown')}")
-            subsections = self.subsection_analyzer.analyze_subsections(section, persona, job, extracted_sections)
+            limit = 5 - len(subsection_analysis) if survivors_only else 5
+            subsections = self.subsection_analyzer.analyze_subsections(
+                section, persona, job, extracted_sections, limit=limit, refine=refine
+            )
             subsection_analysis.extend(subsections)
             print(f"   Added {len(subsections)} subsections")
 
@@ -194,7 +254,9 @@ class DocumentAnalysisPipeline:
                 "persona": persona,
                 "job_to_be_done": job,
                 "processing_timestamp": datetime.now().isoformat(),
-                "processing_time_seconds": round(processing_time, 2)
+                "processing_time_seconds": round(processing_time, 2),
+                "ranking_stages": ranking_stages,
+                "refinement_mode": refinement_mode
             },
             "extracted_sections": extracted_sections,
             "subsection_analysis": [
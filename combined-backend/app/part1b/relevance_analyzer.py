@@ -1,21 +1,34 @@
 # src/relevance_analyzer.py
 import os
+import numpy as np
 import torch
-from sentence_transformers import SentenceTransformer, util
+from sentence_transformers import util
 from typing import List, Dict
 
+from ..services.model_registry import model_registry
+from ..services.llm_dispatcher import llm_dispatcher
+
 class RelevanceAnalyzer:
     """Figures out which sections are most relevant to the user's needs"""
     
-    def __init__(self):
+    def __init__(self, backend: str = None):
         try:
-            print("Loading sentence transformer for semantic similarity...")
-            self.semantic_model = SentenceTransformer('all-MiniLM-L6-v2')
-            print("Sentence transformer loaded successfully!")
+            # Shared process-wide model, loaded on first use only (backend: torch / int8 / onnx, default from config)
+            self.semantic_model = model_registry.get_sentence_transformer('all-MiniLM-L6-v2', backend=backend)
         except Exception as e:
             print(f"Failed to load sentence transformer: {e}")
             raise
         
+        # Number of texts sent to the sentence transformer per encode batch
+        self.encode_batch_size = int(os.getenv("PART1B_ENCODE_BATCH_SIZE", "64"))
+        
+        # Cascade ranking: local embeddings score everything, only the top-K go to the LLM
+        self.cascade_enabled = os.getenv("PART1B_CASCADE", "true").lower() == "true"
+        self.llm_shortlist_size = int(os.getenv("PART1B_LLM_SHORTLIST", "10"))
+        self.llm_call_budget = int(os.getenv("PART1B_LLM_BUDGET", "2"))
+        self.last_ranking_stats = {}
+        self.last_job_vectors = None
+        
         # Initialize Gemini LLM integration
         self.use_gemini_enhancement = True
         try:
@@ -23,7 +36,8 @@ class RelevanceAnalyzer:
             import sys
             sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
             from chat_with_llm import get_llm_response
-            self.llm_service = get_llm_response
+            from ..services.llm_router import llm_router
+            self.llm_service = llm_router.complete  # Failover across LLM_PROVIDERS
             print("✅ Gemini LLM integration enabled for Part 1B analysis")
         except Exception as e:
             print(f"⚠️ Gemini LLM integration unavailable: {e}")
@@ -56,16 +70,10 @@ class RelevanceAnalyzer:
         
         return contexts
 
-    def gemini_enhanced_relevance_analysis(self, section_text: str, section_title: str, job: str, persona: str) -> Dict[str, any]:
-        """
-        Uses Gemini LLM to provide enhanced relevance analysis for Part 1B
-        """
-        if not self.use_gemini_enhancement or not self.llm_service:
-            return {"relevance_score": 0.0, "reasoning": "Gemini LLM unavailable", "enhanced": False}
-        
-        try:
-            # Create a focused prompt for relevance analysis
-            prompt = f"""
+    def _build_relevance_messages(self, section_text: str, section_title: str, job: str, persona: str) -> List[Dict[str, str]]:
+        """Builds the per-section relevance prompt"""
+        # Create a focused prompt for relevance analysis
+        prompt = f"""
             Analyze the relevance of this document section for a specific task:
 
             **Persona**: {persona}
@@ -88,44 +96,168 @@ class RelevanceAnalyzer:
             }}
             """
 
-            messages = [
-                {"role": "system", "content": "You are an expert document analyst. Provide precise relevance scoring for document sections based on user tasks."},
-                {"role": "user", "content": prompt}
-            ]
+        return [
+            {"role": "system", "content": "You are an expert document analyst. Provide precise relevance scoring for document sections based on user tasks."},
+            {"role": "user", "content": prompt}
+        ]
 
-            # Get Gemini response
-            response = self.llm_service(messages)
+    def _parse_relevance_response(self, response: str) -> Dict[str, any]:
+        """Parses a per-section relevance response into an analysis dict"""
+        if not response:
+            return {"relevance_score": 0.0, "reasoning": "Empty LLM response", "enhanced": False}
+        
+        # Try to parse JSON response
+        import json
+        try:
+            analysis = json.loads(response.strip())
+            return {
+                "relevance_score": float(analysis.get("relevance_score", 0.5)),
+                "reasoning": analysis.get("overall_assessment", "Gemini analysis completed"),
+                "key_reasons": analysis.get("key_reasons", []),
+                "matching_elements": analysis.get("matching_elements", []),
+                "enhanced": True
+            }
+        except json.JSONDecodeError:
+            # Fallback: extract score from text response
+            score = 0.5
+            if "relevance_score" in response.lower():
+                import re
+                score_match = re.search(r'relevance_score.*?(\d\.\d+)', response.lower())
+                if score_match:
+                    score = float(score_match.group(1))
+            
+            return {
+                "relevance_score": score,
+                "reasoning": response[:200] + "..." if len(response) > 200 else response,
+                "enhanced": True
+            }
+
+    def gemini_enhanced_relevance_analysis(self, section_text: str, section_title: str, job: str, persona: str) -> Dict[str, any]:
+        """
+        Uses Gemini LLM to provide enhanced relevance analysis for Part 1B
+        """
+        if not self.use_gemini_enhancement or not self.llm_service:
+            return {"relevance_score": 0.0, "reasoning": "Gemini LLM unavailable", "enhanced": False}
+        
+        try:
+            messages = self._build_relevance_messages(section_text, section_title, job, persona)
             
-            # Try to parse JSON response
-            import json
-            try:
-                analysis = json.loads(response.strip())
-                return {
-                    "relevance_score": float(analysis.get("relevance_score", 0.5)),
-                    "reasoning": analysis.get("overall_assessment", "Gemini analysis completed"),
-                    "key_reasons": analysis.get("key_reasons", []),
-                    "matching_elements": analysis.get("matching_elements", []),
-                    "enhanced": True
-                }
-            except json.JSONDecodeError:
-                # Fallback: extract score from text response
-                score = 0.5
-                if "relevance_score" in response.lower():
-                    import re
-                    score_match = re.search(r'relevance_score.*?(\d\.\d+)', response.lower())
-                    if score_match:
-                        score = float(score_match.group(1))
-                
-                return {
-                    "relevance_score": score,
-                    "reasoning": response[:200] + "..." if len(response) > 200 else response,
-                    "enhanced": True
-                }
+            # Get Gemini response (rate limited and retried by the dispatcher)
+            response = llm_dispatcher.call_sync(messages, llm_fn=self.llm_service)
+            return self._parse_relevance_response(response)
                 
         except Exception as e:
             print(f"⚠️ Gemini analysis failed: {e}")
             return {"relevance_score": 0.0, "reasoning": f"LLM error: {str(e)}", "enhanced": False}
 
+    def gemini_relevance_analysis_many(self, sections: List[Dict], job: str, persona: str) -> List[Dict[str, any]]:
+        """Per-section relevance analysis for many sections, fanned out concurrently through the dispatcher"""
+        if not self.use_gemini_enhancement or not self.llm_service:
+            return [{"relevance_score": 0.0, "reasoning": "Gemini LLM unavailable", "enhanced": False} for _ in sections]
+        
+        batch = [
+            self._build_relevance_messages(section.get('content', ''), section.get('section_title', ''), job, persona)
+            for section in sections
+        ]
+        responses = llm_dispatcher.map_sync(batch, llm_fn=self.llm_service)
+        return [self._parse_relevance_response(response) for response in responses]
+
+    def _build_batch_relevance_messages(self, sections: List[Dict], job: str, persona: str) -> List[Dict[str, str]]:
+        """Builds one prompt that scores a whole shortlist of sections"""
+        sections_block = ""
+        for i, section in enumerate(sections):
+            sections_block += f"""
+            [Section {i}]
+            Title: {section.get('section_title', '')}
+            Content: {section.get('content', '')[:800]}...
+            """
+        
+        prompt = f"""
+            Analyze the relevance of each document section below for a specific task:
+
+            **Persona**: {persona}
+            **Task**: {job}
+            {sections_block}
+            For EVERY section, provide a relevance score (0.0 to 1.0) and a brief assessment.
+
+            Respond in this exact JSON format, one entry per section id:
+            {{
+                "sections": [
+                    {{
+                        "id": 0,
+                        "relevance_score": 0.85,
+                        "key_reasons": ["reason 1", "reason 2"],
+                        "overall_assessment": "brief assessment"
+                    }}
+                ]
+            }}
+            """
+
+        return [
+            {"role": "system", "content": "You are an expert document analyst. Provide precise relevance scoring for document sections based on user tasks."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def _parse_batch_relevance_response(self, response: str, count: int) -> List[Dict[str, any]]:
+        """Parses a shortlist relevance response into one analysis dict per section"""
+        unavailable = {"relevance_score": 0.0, "reasoning": "Empty LLM response", "enhanced": False}
+        if not response:
+            return [dict(unavailable) for _ in range(count)]
+        
+        try:
+            # Extract the JSON object from the response (may be wrapped in markdown)
+            import json
+            json_start = response.find('{')
+            json_end = response.rfind('}') + 1
+            parsed = json.loads(response[json_start:json_end]) if json_start != -1 and json_end > 0 else {}
+        except ValueError as e:
+            print(f"⚠️ Gemini batch response could not be parsed: {e}")
+            return [dict(unavailable, reasoning="Unparseable LLM response") for _ in range(count)]
+        
+        by_id = {}
+        for entry in parsed.get("sections", []):
+            try:
+                by_id[int(entry.get("id"))] = entry
+            except (TypeError, ValueError):
+                continue
+        
+        results = []
+        for i in range(count):
+            entry = by_id.get(i)
+            if entry is None:
+                results.append(dict(unavailable, reasoning="Section missing from LLM response"))
+                continue
+            try:
+                score = min(max(float(entry.get("relevance_score", 0.5)), 0.0), 1.0)
+            except (TypeError, ValueError):
+                score = 0.5
+            results.append({
+                "relevance_score": score,
+                "reasoning": entry.get("overall_assessment", "Gemini analysis completed"),
+                "key_reasons": entry.get("key_reasons", []),
+                "matching_elements": entry.get("matching_elements", []),
+                "enhanced": True
+            })
+        return results
+
+    def gemini_batch_relevance_analysis(self, section_groups: List[List[Dict]], job: str, persona: str) -> List[List[Dict[str, any]]]:
+        """
+        Scores shortlist groups with one LLM prompt per group (cascade stage 2).
+        Groups are dispatched concurrently; returns one analysis list per group, in order.
+        """
+        if not self.use_gemini_enhancement or not self.llm_service:
+            return [
+                [{"relevance_score": 0.0, "reasoning": "Gemini LLM unavailable", "enhanced": False} for _ in group]
+                for group in section_groups
+            ]
+        
+        batch = [self._build_batch_relevance_messages(group, job, persona) for group in section_groups]
+        responses = llm_dispatcher.map_sync(batch, llm_fn=self.llm_service)
+        return [
+            self._parse_batch_relevance_response(response, len(group))
+            for response, group in zip(responses, section_groups)
+        ]
+
     def calculate_semantic_similarity_multi_context(self, section_text: str, job: str) -> float:
         """Compares section content with job description using multiple perspectives"""
         try:
@@ -191,17 +323,7 @@ class RelevanceAnalyzer:
         """Uses semantic clustering to understand contexts"""
         try:
             # Extract key phrases from the section using pure logic
-            words = section_text.lower().split()
-            key_phrases = []
-            
-            for i, word in enumerate(words):
-                if len(word) > 3 and word.isalpha():
-                    if i < len(words) - 1:
-                        # Create 2-word phrases
-                        phrase = f"{word} {words[i+1]}" if words[i+1].isalpha() else word
-                        key_phrases.append(phrase)
-                    else:
-                        key_phrases.append(word)
+            key_phrases = self._extract_key_phrases(section_text)
             
             if not key_phrases:
                 return 0.0
@@ -212,18 +334,8 @@ class RelevanceAnalyzer:
             # Convert phrases to embeddings
             phrase_embeddings = self.semantic_model.encode(key_phrases, convert_to_tensor=True)
             
-            # Create job-related concept embeddings using the job itself
-            job_words = job.lower().split()
-            job_concepts = []
-            
             # Create concept phrases from the job description using pure logic
-            for i, word in enumerate(job_words):
-                if len(word) > 3 and word.isalpha():
-                    if i < len(job_words) - 1:
-                        concept = f"{word} {job_words[i+1]}" if job_words[i+1].isalpha() else word
-                        job_concepts.append(concept)
-                    else:
-                        job_concepts.append(word)
+            job_concepts = self._extract_key_phrases(job)
             
             # Also add the full job description
             job_concepts.append(job.lower())
@@ -287,13 +399,140 @@ class RelevanceAnalyzer:
             print(f"Error in semantic reasoning: {e}")
             return 0.0
 
-    def calculate_final_relevance_score(self, section: Dict, persona: str, job: str) -> float:
+    def _extract_key_phrases(self, text: str) -> List[str]:
+        """Builds 2-word key phrases from text using pure logic (same rules for sections and jobs)"""
+        words = text.lower().split()
+        key_phrases = []
+        
+        for i, word in enumerate(words):
+            if len(word) > 3 and word.isalpha():
+                if i < len(words) - 1:
+                    # Create 2-word phrases
+                    phrase = f"{word} {words[i+1]}" if words[i+1].isalpha() else word
+                    key_phrases.append(phrase)
+                else:
+                    key_phrases.append(word)
+        
+        return key_phrases
+
+    def _encode_normalized(self, texts: List[str]) -> np.ndarray:
+        """Encodes a list of texts in one batched call and returns unit-length float32 vectors"""
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        embeddings = self.semantic_model.encode(
+            texts,
+            batch_size=self.encode_batch_size,
+            convert_to_numpy=True,
+            normalize_embeddings=True,
+            show_progress_bar=False
+        )
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def encode_job_context(self, job: str) -> Dict[str, np.ndarray]:
+        """
+        Encodes every job-side vector needed for ranking exactly once per request
+        (expanded contexts, the raw job, contradiction patterns and job concepts)
+        """
+        job_contexts = self.expand_job_context(job)
+        contradiction_patterns = [
+            f"not suitable for {job.lower()}",
+            f"incompatible with {job.lower()}",
+            f"does not meet {job.lower()} requirements",
+            f"avoid {job.lower()}",
+            f"not recommended for {job.lower()}"
+        ]
+        # Job concepts plus the full job description
+        job_concepts = self._extract_key_phrases(job) + [job.lower()]
+        
+        all_texts = job_contexts + [job] + contradiction_patterns + job_concepts
+        embeddings = self._encode_normalized(all_texts)
+        
+        n_contexts = len(job_contexts)
+        n_contradictions = len(contradiction_patterns)
+        return {
+            "contexts": embeddings[:n_contexts],
+            "job": embeddings[n_contexts],
+            "contradictions": embeddings[n_contexts + 1:n_contexts + 1 + n_contradictions],
+            "concepts": embeddings[n_contexts + 1 + n_contradictions:]
+        }
+
+    def compute_semantic_features(self, sections: List[Dict], job: str, job_vectors: Dict[str, np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """
+        Batched equivalent of calculate_semantic_similarity_multi_context (text and title),
+        semantic_clustering_analysis and semantic_reasoning_analysis for many sections at once.
+        Section texts, titles and key phrases are each encoded in large batches and every
+        cosine score is a single matrix product.
+        
+        Returns:
+            Dict of arrays (one value per section): text_score, title_score,
+            clustering_bonus, reasoning_bonus
+        """
+        n = len(sections)
+        if n == 0:
+            empty = np.zeros(0, dtype=np.float32)
+            return {"text_score": empty, "title_score": empty, "clustering_bonus": empty, "reasoning_bonus": empty}
+        
+        if job_vectors is None:
+            job_vectors = self.encode_job_context(job)
+        
+        texts = [section.get('content', '')[:512] for section in sections]
+        titles = [section.get('section_title', '')[:512] for section in sections]
+        
+        # One batch for all section texts and titles
+        section_embeddings = self._encode_normalized(texts + titles)
+        text_embeddings = section_embeddings[:n]
+        title_embeddings = section_embeddings[n:]
+        
+        # Multi-context similarity: 70% best match, 30% average over the expanded job contexts
+        text_context_sims = text_embeddings @ job_vectors["contexts"].T
+        title_context_sims = title_embeddings @ job_vectors["contexts"].T
+        text_score = np.maximum(0.0, 0.7 * text_context_sims.max(axis=1) + 0.3 * text_context_sims.mean(axis=1))
+        title_score = np.maximum(0.0, 0.7 * title_context_sims.max(axis=1) + 0.3 * title_context_sims.mean(axis=1))
+        
+        # Semantic reasoning: direct job similarity minus a penalty when the section contradicts the job
+        job_section_similarity = text_embeddings @ job_vectors["job"]
+        max_contradiction = (text_embeddings @ job_vectors["contradictions"].T).max(axis=1)
+        contradiction_penalty = np.where(max_contradiction > 0.5, 0.4, 0.0)
+        reasoning_bonus = np.maximum(0.0, (job_section_similarity - contradiction_penalty) * 0.5)
+        
+        # Semantic clustering: key phrases of every section encoded in one flat batch
+        phrase_lists = [self._extract_key_phrases(section.get('content', ''))[:20] for section in sections]
+        flat_phrases = [phrase for phrases in phrase_lists for phrase in phrases]
+        clustering_bonus = np.zeros(n, dtype=np.float32)
+        if flat_phrases:
+            phrase_embeddings = self._encode_normalized(flat_phrases)
+            best_concept_match = (phrase_embeddings @ job_vectors["concepts"].T).max(axis=1)
+            offset = 0
+            for i, phrases in enumerate(phrase_lists):
+                count = len(phrases)
+                if count:
+                    section_matches = best_concept_match[offset:offset + count]
+                    k = min(5, count)
+                    top_matches = np.partition(section_matches, count - k)[count - k:]
+                    clustering_bonus[i] = top_matches.mean() * 0.3
+                offset += count
+        
+        return {
+            "text_score": text_score,
+            "title_score": title_score,
+            "clustering_bonus": clustering_bonus,
+            "reasoning_bonus": reasoning_bonus
+        }
+
+    def calculate_final_relevance_score(self, section: Dict, persona: str, job: str, semantic_features: Dict[str, float] = None,
+                                        gemini_analysis: Dict[str, any] = None) -> float:
         """Combines all the analysis to give a final relevance score using Gemini LLM enhancement + semantic logic"""
         section_text = section.get('content', '')
         section_title = section.get('section_title', '')
+        
+        # Semantic features are normally precomputed in one batch by rank_sections
+        if semantic_features is None:
+            batch_features = self.compute_semantic_features([section], job)
+            semantic_features = {name: float(values[0]) for name, values in batch_features.items()}
 
-        # 🚀 GEMINI LLM ENHANCED ANALYSIS
-        gemini_analysis = self.gemini_enhanced_relevance_analysis(section_text, section_title, job, persona)
+        # 🚀 GEMINI LLM ENHANCED ANALYSIS (may already have been fetched concurrently by rank_sections)
+        if gemini_analysis is None:
+            gemini_analysis = self.gemini_enhanced_relevance_analysis(section_text, section_title, job, persona)
         
         if gemini_analysis["enhanced"]:
             print(f"   🤖 Gemini analysis: {gemini_analysis['relevance_score']:.3f} - {gemini_analysis['reasoning'][:50]}...")
@@ -301,8 +540,8 @@ class RelevanceAnalyzer:
             gemini_score = gemini_analysis["relevance_score"]
             
             # Get semantic validation score
-            base_score = self.calculate_semantic_similarity_multi_context(section_text, job)
-            title_score = self.calculate_semantic_similarity_multi_context(section_title, job)
+            base_score = semantic_features["text_score"]
+            title_score = semantic_features["title_score"]
             semantic_validation = (base_score * 0.8) + (title_score * 0.2)
             
             # Combine Gemini with semantic validation (80% Gemini, 20% semantic)
@@ -319,59 +558,139 @@ class RelevanceAnalyzer:
             return min(max(final_score, 0.0), 1.0)
         
         else:
-            print("   📊 Using fallback semantic analysis...")
             # FALLBACK: Original semantic analysis
-            # Get the base semantic similarity (pure model-based relevance)
-            base_score = self.calculate_semantic_similarity_multi_context(section_text, job)
-            
-            # Add semantic similarity for section title as well
-            title_score = self.calculate_semantic_similarity_multi_context(section_title, job)
-            
-            # Combine text and title similarity (text is more important)
-            combined_semantic_score = (base_score * 0.8) + (title_score * 0.2)
-            
-            # Add bonuses for content patterns
-            content_bonus = self.analyze_section_content_patterns(section_text, section_title)
-            
-            # Add semantic clustering bonus
-            clustering_bonus = self.semantic_clustering_analysis(section_text, job)
-            
-            # Add semantic reasoning bonus
-            reasoning_bonus = self.semantic_reasoning_analysis(section_text, job)
-            
-            # Bonus for longer, more comprehensive sections
-            length_bonus = min(0.1, len(section_text) / 10000)
-
-            # Penalty for generic section titles
-            # Pure logic: Penalty for generic titles (no hardcoded words)
-            generic_penalty = 0.0
-            words = section_title.split()
-            if len(words) == 1 and len(section_title) < 15:
-                generic_penalty = 0.5
-            elif len(words) <= 2 and all(len(word) <= 2 for word in words):
-                generic_penalty = 0.5
-
-            # Pure logic: Bonus for descriptive titles (no hardcoded words)
-            descriptive_bonus = 0.0
-            if (section_title and 
-                len(section_title.split()) >= 2 and 
-                len(section_title.split()) <= 5 and 
-                section_title[0].isupper() and
-                len([word for word in section_title.split() if len(word) > 2]) >= 2):
-                descriptive_bonus = 0.3
-
-            # Combine everything with pure semantic logic as the primary factor
-            final_score = (combined_semantic_score * 0.7 +  # 70% pure semantic similarity
-                          content_bonus * 0.1 +  # 10% content patterns
-                          clustering_bonus * 0.05 +  # 5% clustering
-                          reasoning_bonus * 0.05 +  # 5% semantic reasoning
-                          length_bonus -  # Length bonus
-                          generic_penalty +  # Generic penalty
-                          descriptive_bonus)  # Descriptive bonus
-            
-            return min(max(final_score, 0.0), 1.0)
+            return self.calculate_semantic_relevance_score(section, semantic_features)
+
+    def calculate_semantic_relevance_score(self, section: Dict, semantic_features: Dict[str, float]) -> float:
+        """Local-only relevance score from precomputed semantic features plus pure-logic bonuses"""
+        section_text = section.get('content', '')
+        section_title = section.get('section_title', '')
+        
+        # Get the base semantic similarity (pure model-based relevance)
+        base_score = semantic_features["text_score"]
+        
+        # Add semantic similarity for section title as well
+        title_score = semantic_features["title_score"]
+        
+        # Combine text and title similarity (text is more important)
+        combined_semantic_score = (base_score * 0.8) + (title_score * 0.2)
+        
+        # Add bonuses for content patterns
+        content_bonus = self.analyze_section_content_patterns(section_text, section_title)
+        
+        # Add semantic clustering bonus
+        clustering_bonus = semantic_features["clustering_bonus"]
+        
+        # Add semantic reasoning bonus
+        reasoning_bonus = semantic_features["reasoning_bonus"]
+        
+        # Bonus for longer, more comprehensive sections
+        length_bonus = min(0.1, len(section_text) / 10000)
+
+        # Penalty for generic section titles
+        # Pure logic: Penalty for generic titles (no hardcoded words)
+        generic_penalty = 0.0
+        words = section_title.split()
+        if len(words) == 1 and len(section_title) < 15:
+            generic_penalty = 0.5
+        elif len(words) <= 2 and all(len(word) <= 2 for word in words):
+            generic_penalty = 0.5
+
+        # Pure logic: Bonus for descriptive titles (no hardcoded words)
+        descriptive_bonus = 0.0
+        if (section_title and 
+            len(section_title.split()) >= 2 and 
+            len(section_title.split()) <= 5 and 
+            section_title[0].isupper() and
+            len([word for word in section_title.split() if len(word) > 2]) >= 2):
+            descriptive_bonus = 0.3
+
+        # Combine everything with pure semantic logic as the primary factor
+        final_score = (combined_semantic_score * 0.7 +  # 70% pure semantic similarity
+                      content_bonus * 0.1 +  # 10% content patterns
+                      clustering_bonus * 0.05 +  # 5% clustering
+                      reasoning_bonus * 0.05 +  # 5% semantic reasoning
+                      length_bonus -  # Length bonus
+                      generic_penalty +  # Generic penalty
+                      descriptive_bonus)  # Descriptive bonus
+        
+        return float(min(max(final_score, 0.0), 1.0))
+    
+    def _cascade_scores(self, sections: List[Dict], section_features: List[Dict[str, float]], persona: str, job: str,
+                        llm_shortlist: int = None, llm_budget: int = None) -> np.ndarray:
+        """
+        Two-stage scoring: every section gets a local embedding score, then only the
+        top-K shortlist is reranked by the LLM in at most `llm_budget` batched prompts.
+        Returns sort keys where reranked sections always stay ahead of local-only ones.
+        """
+        shortlist_size = self.llm_shortlist_size if llm_shortlist is None else llm_shortlist
+        budget = self.llm_call_budget if llm_budget is None else llm_budget
+        
+        # Stage 1: local sentence-transformer scores for all sections
+        local_scores = np.zeros(len(sections), dtype=np.float64)
+        for i, section in enumerate(sections):
+            score = self.calculate_semantic_relevance_score(section, section_features[i])
+            section['relevance_score'] = score
+            local_scores[i] = score
+        
+        # Stage 2: LLM rerank of the shortlist
+        llm_available = self.use_gemini_enhancement and self.llm_service is not None
+        shortlist_size = max(0, min(shortlist_size, len(sections))) if llm_available and budget > 0 else 0
+        shortlist_idx = np.argsort(-local_scores, kind='stable')[:shortlist_size]
+        
+        llm_calls = 0
+        reranked = 0
+        sort_keys = local_scores.copy()
+        if shortlist_size > 0:
+            chunk_size = -(-shortlist_size // budget)  # ceil division
+            chunks = [shortlist_idx[start:start + chunk_size] for start in range(0, shortlist_size, chunk_size)]
+            
+            # The few shortlist prompts run concurrently through the LLM dispatcher
+            chunk_results = self.gemini_batch_relevance_analysis(
+                [[sections[i] for i in chunk] for chunk in chunks], job, persona
+            )
+            llm_calls = len(chunks)
+            
+            for chunk, analyses in zip(chunks, chunk_results):
+                for i, analysis in zip(chunk, analyses):
+                    section = sections[i]
+                    if not analysis["enhanced"]:
+                        continue
+                    features = section_features[i]
+                    semantic_validation = (features["text_score"] * 0.8) + (features["title_score"] * 0.2)
+                    # Combine Gemini with semantic validation (80% Gemini, 20% semantic)
+                    final_score = min(max((analysis["relevance_score"] * 0.8) + (semantic_validation * 0.2), 0.0), 1.0)
+                    section['relevance_score'] = final_score
+                    section['gemini_analysis'] = {
+                        "relevance_score": analysis["relevance_score"],
+                        "reasoning": analysis["reasoning"],
+                        "key_reasons": analysis.get("key_reasons", []),
+                        "matching_elements": analysis.get("matching_elements", [])
+                    }
+                    # Reranked sections are ordered among themselves, ahead of local-only ones
+                    sort_keys[i] = 2.0 + final_score
+                    reranked += 1
+        
+        self.last_ranking_stats = {
+            "mode": "cascade",
+            "local_stage_sections": len(sections),
+            "llm_stage_sections": int(shortlist_size),
+            "llm_reranked_sections": reranked,
+            "llm_calls": llm_calls,
+            "llm_budget": budget
+        }
+        print(f"   Cascade: {len(sections)} sections scored locally, {shortlist_size} sent to LLM in {llm_calls} call(s)")
+        return sort_keys
     
-    def rank_sections(self, sections: List[Dict], persona: str, job: str) -> List[Dict]:
+    def rank_sections(self, sections: List[Dict], persona: str, job: str, top_k: int = None,
+                      llm_shortlist: int = None, llm_budget: int = None) -> List[Dict]:
+        """
+        Ranks sections by relevance to the job.
+        Job-side vectors are encoded once, section texts/titles/phrases in a few large batches,
+        and top_k (when given) is selected with argpartition instead of a full sort.
+        In cascade mode only the top `llm_shortlist` sections are sent to the LLM,
+        using at most `llm_budget` prompts; per-stage counts end up in last_ranking_stats.
+        """
         print(f"Ranking {len(sections)} sections using semantic understanding...")
         
         # Group sections by PDF for variety
@@ -390,17 +709,42 @@ class RelevanceAnalyzer:
             all_sections.extend(pdf_sections)
             print(f"   Taking {len(pdf_sections)} sections from {pdf_name}")
         
+        if not all_sections:
+            return []
+        
         print(f"   Processing all {len(all_sections)} sections for ranking")
         
-        # Calculate scores for each section
-        for i, section in enumerate(all_sections):
-            if i % 10 == 0:
-                print(f"   Processed {i}/{len(all_sections)} sections...")
-            score = self.calculate_final_relevance_score(section, persona, job)
-            section['relevance_score'] = score
+        # Batched semantic features for every section at once; job vectors are kept for extractive refinement
+        self.last_job_vectors = self.encode_job_context(job)
+        features = self.compute_semantic_features(all_sections, job, self.last_job_vectors)
+        section_features = [
+            {name: float(values[i]) for name, values in features.items()}
+            for i in range(len(all_sections))
+        ]
         
-        # Sort by score (highest first)
-        ranked_sections = sorted(all_sections, key=lambda x: x['relevance_score'], reverse=True)
+        if not self.cascade_enabled:
+            # Legacy mode: one LLM prompt per section, fanned out concurrently
+            gemini_analyses = self.gemini_relevance_analysis_many(all_sections, job, persona)
+            scores = np.zeros(len(all_sections), dtype=np.float64)
+            for i, section in enumerate(all_sections):
+                score = self.calculate_final_relevance_score(section, persona, job, section_features[i], gemini_analyses[i])
+                section['relevance_score'] = score
+                scores[i] = score
+            self.last_ranking_stats = {
+                "mode": "per_section_llm",
+                "local_stage_sections": len(all_sections),
+                "llm_stage_sections": len(all_sections) if self.use_gemini_enhancement else 0
+            }
+        else:
+            scores = self._cascade_scores(all_sections, section_features, persona, job, llm_shortlist, llm_budget)
+        
+        # Select top_k with argpartition, then order (highest first, ties keep input order)
+        if top_k is not None and 0 < top_k < len(all_sections):
+            candidate_idx = np.argpartition(-scores, top_k - 1)[:top_k]
+        else:
+            candidate_idx = np.arange(len(all_sections))
+        order = candidate_idx[np.lexsort((candidate_idx, -scores[candidate_idx]))]
+        ranked_sections = [all_sections[i] for i in order]
         
         # Add importance ranks
         for i, section in enumerate(ranked_sections, 1):
@@ -1,4 +1,7 @@
+import asyncio
+import shutil
 import tempfile
+import threading
 import os
 import json
 import time
@@ -7,18 +10,30 @@ from pathlib import Path
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 from fastapi import APIRouter, UploadFile, File, HTTPException, Form, Depends
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, StreamingResponse
 
-from .pipeline import DocumentAnalysisPipeline
+from .pipeline import DocumentAnalysisPipeline, REFINEMENT_MODES
 from .relevance_analyzer import RelevanceAnalyzer
 from ..part1a.pdf_structure_extractor import MultilingualPDFExtractor
 from sqlalchemy.orm import Session
 from ..database.database import get_db
 from ..database.models import PDFDocument
-from ..text_selection.service import TextSelectionService
+from ..services.model_registry import model_registry
+from ..services.llm_dispatcher import llm_dispatcher
+from ..services.ingestion_service import ingestion_service, join_page_texts
+from ..services.hybrid_retrieval import hybrid_retriever
+from ..services.context_packer import context_packer
+from ..services.execution import execution_layer
+from ..services.analysis_jobs import analysis_job_service
+from ..services.embedding_cache import embedding_cache
 
 router = APIRouter(prefix="/part1b", tags=["Document Analysis"])
 
+# Passages retrieved (BM25 + dense) across the corpus before any LLM call in find-relevant-sections
+RELEVANT_SECTIONS_PASSAGES = int(os.getenv("RELEVANT_SECTIONS_PASSAGES", "30"))
+# Token budget of each document's context in the section-detection prompt
+RELEVANT_SECTIONS_CONTEXT_TOKENS = int(os.getenv("RELEVANT_SECTIONS_CONTEXT_TOKENS", "2000"))
+
 class TextAnalysisRequest(BaseModel):
     """Request model for text-based analysis"""
     selected_text: str
@@ -40,17 +55,37 @@ class AnalysisRequest(BaseModel):
     persona: str = "Researcher"
     job: str = "Analyze document content and extract relevant sections"
 
+def _check_refinement_mode(refinement_mode: Optional[str]) -> None:
+    if refinement_mode is not None and refinement_mode.lower() not in REFINEMENT_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Invalid refinement_mode: {refinement_mode} (expected one of {', '.join(REFINEMENT_MODES)})"
+        )
+
+def _run_pipeline(**kwargs) -> Dict[str, Any]:
+    """Build the pipeline and analyze documents (blocking; runs in the execution layer)"""
+    pipeline = DocumentAnalysisPipeline()
+    return pipeline.process_documents(**kwargs)
+
 @router.post("/analyze")
 async def analyze_documents(
     persona: str = Form("Researcher"),
     job: str = Form("Analyze document content and extract relevant sections"),
     profile_id: int = Form(None),
     files: List[UploadFile] = File(...),
+    llm_shortlist: Optional[int] = Form(None),
+    llm_budget: Optional[int] = Form(None),
+    refinement_mode: Optional[str] = Form(None),
     db: Session = Depends(get_db)
 ) -> Dict[str, Any]:
     """
     Analyze PDF documents and store complete history in database
+    
+    llm_shortlist: how many locally ranked sections are reranked by the LLM (cascade top-K)
+    llm_budget: maximum number of LLM calls spent on this request
+    refinement_mode: "generative" (DistilGPT-2) or "extractive" (deterministic sentence selection)
     """
+    _check_refinement_mode(refinement_mode)
     
     # Validate files
     pdf_files = []
@@ -81,13 +116,16 @@ async def analyze_documents(
                 content = await file.read()
                 temp_file.write(content)
 
-        # Process documents
+        # Process documents on the CPU lane so the event loop keeps serving other requests
         start_time = time.time()
-        pipeline = DocumentAnalysisPipeline()
-        result = pipeline.process_documents(
+        result = await execution_layer.run_cpu(
+            _run_pipeline,
             pdf_paths=temp_file_paths,
             persona=persona,
-            job=job
+            job=job,
+            llm_shortlist=llm_shortlist,
+            llm_budget=llm_budget,
+            refinement_mode=refinement_mode
         )
         processing_time = time.time() - start_time
 
@@ -97,6 +135,8 @@ async def analyze_documents(
         
         return result
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing documents: {str(e)}")
     
@@ -113,12 +153,196 @@ async def analyze_documents(
         except:
             pass
 
+def _sse_event(event: str, data: Any) -> str:
+    """One Server-Sent Events frame"""
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+class _StreamClosed(Exception):
+    """Raised from the progress callback once the SSE client has gone away"""
+
+@router.post("/analyze-stream")
+async def analyze_documents_stream(
+    persona: str = Form("Researcher"),
+    job: str = Form("Analyze document content and extract relevant sections"),
+    files: List[UploadFile] = File(...),
+    llm_shortlist: Optional[int] = Form(None),
+    llm_budget: Optional[int] = Form(None),
+    refinement_mode: Optional[str] = Form(None)
+) -> StreamingResponse:
+    """
+    Streaming variant of /analyze (Server-Sent Events)
+    
+    Events, in order:
+        progress         {stage, progress}
+        document_parsed  {document, sections_found, section_titles, error}   one per PDF, as parsed
+        ranked           {extracted_sections, ranking_stages}                top 5, before refinement
+        refining         {section_title, progress}                           one per top section
+        complete         full /analyze result
+        error            {detail}
+    """
+    _check_refinement_mode(refinement_mode)
+    for file in files:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only PDF files are allowed. Invalid file: {file.filename}"
+            )
+    if len(files) == 0:
+        raise HTTPException(status_code=400, detail="At least one PDF file is required")
+
+    temp_dir = tempfile.mkdtemp()
+    temp_file_paths = []
+    for file in files:
+        temp_file_path = os.path.join(temp_dir, file.filename)
+        temp_file_paths.append(temp_file_path)
+        with open(temp_file_path, "wb") as temp_file:
+            temp_file.write(await file.read())
+
+    loop = asyncio.get_running_loop()
+    events: asyncio.Queue = asyncio.Queue()
+    client_gone = threading.Event()
+
+    def report(stage: str, fraction: float, data: Dict[str, Any] = None) -> None:
+        # Runs on the pipeline thread; stop at the next stage boundary if nobody is listening
+        if client_gone.is_set():
+            raise _StreamClosed()
+        payload = dict(data or {})
+        payload["progress"] = round(fraction, 3)
+        if stage in ("document_parsed", "ranked", "refining"):
+            loop.call_soon_threadsafe(events.put_nowait, (stage, payload))
+        else:
+            loop.call_soon_threadsafe(events.put_nowait, ("progress", {"stage": stage, **payload}))
+
+    start_time = time.time()
+    try:
+        analysis = asyncio.ensure_future(execution_layer.run_cpu(
+            _run_pipeline,
+            pdf_paths=temp_file_paths,
+            persona=persona,
+            job=job,
+            llm_shortlist=llm_shortlist,
+            llm_budget=llm_budget,
+            progress=report,
+            refinement_mode=refinement_mode
+        ))
+        # Admission is decided on the first step; a full queue becomes a plain 503/429 response
+        await asyncio.sleep(0)
+        if analysis.done() and isinstance(analysis.exception(), HTTPException):
+            raise analysis.exception()
+    except BaseException:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        raise
+    def cleanup(task: asyncio.Future) -> None:
+        # Temporary files stay until the pipeline thread is done with them
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        if not task.cancelled():
+            task.exception()  # Consumed by event_stream, or moot once the client left
+    analysis.add_done_callback(cleanup)
+
+    async def event_stream():
+        try:
+            while True:
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait({next_event, analysis}, return_when=asyncio.FIRST_COMPLETED)
+                if next_event.done():
+                    stage, payload = next_event.result()
+                    yield _sse_event(stage, payload)
+                    continue
+                next_event.cancel()
+                # Drain events queued before the pipeline finished
+                while not events.empty():
+                    stage, payload = events.get_nowait()
+                    yield _sse_event(stage, payload)
+                try:
+                    result = analysis.result()
+                    result['processing_time'] = time.time() - start_time
+                    yield _sse_event("complete", result)
+                except Exception as e:
+                    yield _sse_event("error", {"detail": f"Error analyzing documents: {str(e)}"})
+                return
+        finally:
+            # Client disconnected (or stream finished): let the pipeline stop early
+            client_gone.set()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/jobs")
+async def submit_analysis_job(
+    persona: str = Form("Researcher"),
+    job: str = Form("Analyze document content and extract relevant sections"),
+    files: List[UploadFile] = File(...),
+    llm_shortlist: Optional[int] = Form(None),
+    llm_budget: Optional[int] = Form(None),
+    refinement_mode: Optional[str] = Form(None)
+) -> Dict[str, Any]:
+    """
+    Queue the same analysis as /analyze and return immediately with a job id
+    Poll GET /jobs/{job_id}, then fetch GET /jobs/{job_id}/result
+    Identical submissions (same PDFs, persona, job and options) share one run
+    """
+    _check_refinement_mode(refinement_mode)
+    uploads = []
+    for file in files:
+        if not file.filename.lower().endswith('.pdf'):
+            raise HTTPException(
+                status_code=400,
+                detail=f"Only PDF files are allowed. Invalid file: {file.filename}"
+            )
+        uploads.append({"filename": file.filename, "content": await file.read()})
+
+    if len(uploads) == 0:
+        raise HTTPException(status_code=400, detail="At least one PDF file is required")
+
+    try:
+        return await execution_layer.run_io(
+            analysis_job_service.submit, uploads, persona, job,
+            llm_shortlist=llm_shortlist, llm_budget=llm_budget,
+            refinement_mode=refinement_mode.lower() if refinement_mode else None
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error submitting analysis job: {str(e)}")
+
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str) -> Dict[str, Any]:
+    """Status, stage and progress (0-1) of an analysis job"""
+    status = analysis_job_service.get_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return status
+
+@router.get("/jobs/{job_id}/result")
+async def get_analysis_job_result(job_id: str) -> Dict[str, Any]:
+    """Result of a completed analysis job (same shape as /analyze)"""
+    status = analysis_job_service.get_status(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    if status["status"] in ("queued", "running"):
+        raise HTTPException(status_code=409, detail=f"Analysis job is {status['status']} ({status['progress']:.0%})")
+    if status["status"] != "completed":
+        raise HTTPException(status_code=410, detail=f"Analysis job {status['status']}: {status['error'] or 'no result'}")
+    return analysis_job_service.get_result(job_id)
+
+@router.post("/jobs/{job_id}/cancel")
+async def cancel_analysis_job(job_id: str) -> Dict[str, Any]:
+    """Cancel a queued or running analysis job (running jobs stop at the next stage boundary)"""
+    status = analysis_job_service.cancel(job_id)
+    if not status:
+        raise HTTPException(status_code=404, detail="Analysis job not found")
+    return status
+
 @router.post("/analyze-single")
 async def analyze_single_document(
     file: UploadFile = File(...),
     persona: str = Form("Researcher"),
     job: str = Form("Analyze document content and extract relevant sections"),
-    profile_id: int = Form(None)
+    profile_id: int = Form(None),
+    refinement_mode: Optional[str] = Form(None)
 ) -> Dict[str, Any]:
     """
     Analyze a single PDF document.
@@ -127,11 +351,13 @@ async def analyze_single_document(
         file: Uploaded PDF file
         persona: User role/persona
         job: Specific task to accomplish
+        refinement_mode: "generative" or "extractive"
         
     Returns:
         Dict containing analysis results
     """
-    return await analyze_documents(persona=persona, job=job, profile_id=profile_id, files=[file])
+    return await analyze_documents(persona=persona, job=job, profile_id=profile_id, files=[file],
+                                   llm_shortlist=None, llm_budget=None, refinement_mode=refinement_mode)
 
 @router.post("/analyze-collection")
 async def analyze_collection(
@@ -215,7 +441,18 @@ async def analyze_collection(
 @router.get("/health")
 async def health_check():
     """Health check endpoint for Part 1B"""
-    return {"status": "healthy", "service": "Document Analysis System (Part 1B)"}
+    return {
+        "status": "healthy",
+        "service": "Document Analysis System (Part 1B)",
+        "execution": execution_layer.describe(),
+        "analysis_jobs": analysis_job_service.describe(),
+        "embedding_cache": embedding_cache.describe()
+    }
+
+@router.get("/models")
+async def get_loaded_models():
+    """Introspection endpoint: models loaded into the shared process-wide registry"""
+    return model_registry.describe()
 
 @router.get("/info")
 async def get_service_info():
@@ -288,6 +525,84 @@ class TextAnalysisRequest(BaseModel):
     persona: str = "Researcher"
     job: str = "Analyze content and extract key information"
 
+def _analyze_text_sections(text: str, persona: str, job: str) -> Dict[str, Any]:
+    """Rank the text as a single section (blocking: embeddings and LLM rerank; runs in the execution layer)"""
+    # Initialize the pipeline
+    pipeline = DocumentAnalysisPipeline()
+    
+    # Create a mock document structure from the text
+    mock_sections = [
+        {
+            "text": text,
+            "content": text,  # Add both for compatibility
+            "page": 1,
+            "section_title": "Direct Text Input",
+            "section_type": "direct_input",
+            "document": "text_input",
+            "metadata": {
+                "source": "text_input",
+                "length": len(text)
+            }
+        }
+    ]
+    
+    start_time = time.time()
+    
+    # Process the text through the analysis pipeline with Gemini enhancement
+    if pipeline.relevance_analyzer:
+        print(f"🚀 Analyzing text with Gemini LLM enhancement...")
+        print(f"   Persona: {persona}")
+        print(f"   Job: {job}")
+        print(f"   Text length: {len(text)} characters")
+        
+        # Use the enhanced relevance analyzer (now with Gemini)
+        ranked_sections = pipeline.relevance_analyzer.rank_sections(
+            sections=mock_sections,
+            persona=persona,
+            job=job
+        )
+        
+        analyzed_sections = {
+            "top_sections": [
+                {
+                    "text": section["text"][:1000] + ("..." if len(section["text"]) > 1000 else ""),
+                    "relevance_score": section.get("relevance_score", 0.0),
+                    "page": section.get("page", 1),
+                    "section_title": section.get("section_title", ""),
+                    "importance_rank": section.get("importance_rank", 1),
+                    "gemini_analysis": section.get("gemini_analysis", {}),
+                    "reasoning": section.get("gemini_analysis", {}).get("reasoning", "Standard analysis")
+                } for section in ranked_sections[:5]  # Top 5 sections
+            ],
+            "analysis_metadata": {
+                "total_sections": len(ranked_sections),
+                "processing_time": time.time() - start_time,
+                "analyzer_status": "gemini_enhanced" if ranked_sections and ranked_sections[0].get("gemini_analysis") else "fallback_mode",
+                "gemini_enabled": pipeline.relevance_analyzer.use_gemini_enhancement,
+                "ranking_stages": pipeline.relevance_analyzer.last_ranking_stats
+            }
+        }
+    else:
+        # Fallback: just return the input with basic analysis
+        analyzed_sections = {
+            "top_sections": [
+                {
+                    "text": text[:1000] + ("..." if len(text) > 1000 else ""),
+                    "relevance_score": 0.8,
+                    "page": 1,
+                    "reasoning": "Direct text input - no ranking performed (analyzer unavailable)"
+                }
+            ],
+            "analysis_metadata": {
+                "total_sections": 1,
+                "processing_time": time.time() - start_time,
+                "analyzer_status": "fallback_mode",
+                "gemini_enabled": False
+            }
+        }
+
+    return analyzed_sections
+
 @router.post("/analyze-text")
 async def analyze_text(request: LegacyTextAnalysisRequest) -> Dict[str, Any]:
     """
@@ -295,78 +610,11 @@ async def analyze_text(request: LegacyTextAnalysisRequest) -> Dict[str, Any]:
     Perfect for testing the analysis pipeline with sample text
     """
     try:
-        # Initialize the pipeline
-        pipeline = DocumentAnalysisPipeline()
-        
-        # Create a mock document structure from the text
-        mock_sections = [
-            {
-                "text": request.text,
-                "content": request.text,  # Add both for compatibility
-                "page": 1,
-                "section_title": "Direct Text Input",
-                "section_type": "direct_input",
-                "document": "text_input",
-                "metadata": {
-                    "source": "text_input",
-                    "length": len(request.text)
-                }
-            }
-        ]
-        
+        # Ranking loads models and calls the LLM; keep it off the event loop
         start_time = time.time()
-        
-        # Process the text through the analysis pipeline with Gemini enhancement
-        if pipeline.relevance_analyzer:
-            print(f"🚀 Analyzing text with Gemini LLM enhancement...")
-            print(f"   Persona: {request.persona}")
-            print(f"   Job: {request.job}")
-            print(f"   Text length: {len(request.text)} characters")
-            
-            # Use the enhanced relevance analyzer (now with Gemini)
-            ranked_sections = pipeline.relevance_analyzer.rank_sections(
-                sections=mock_sections,
-                persona=request.persona,
-                job=request.job
-            )
-            
-            analyzed_sections = {
-                "top_sections": [
-                    {
-                        "text": section["text"][:1000] + ("..." if len(section["text"]) > 1000 else ""),
-                        "relevance_score": section.get("relevance_score", 0.0),
-                        "page": section.get("page", 1),
-                        "section_title": section.get("section_title", ""),
-                        "importance_rank": section.get("importance_rank", 1),
-                        "gemini_analysis": section.get("gemini_analysis", {}),
-                        "reasoning": section.get("gemini_analysis", {}).get("reasoning", "Standard analysis")
-                    } for section in ranked_sections[:5]  # Top 5 sections
-                ],
-                "analysis_metadata": {
-                    "total_sections": len(ranked_sections),
-                    "processing_time": time.time() - start_time,
-                    "analyzer_status": "gemini_enhanced" if ranked_sections and ranked_sections[0].get("gemini_analysis") else "fallback_mode",
-                    "gemini_enabled": pipeline.relevance_analyzer.use_gemini_enhancement
-                }
-            }
-        else:
-            # Fallback: just return the input with basic analysis
-            analyzed_sections = {
-                "top_sections": [
-                    {
-                        "text": request.text[:1000] + ("..." if len(request.text) > 1000 else ""),
-                        "relevance_score": 0.8,
-                        "page": 1,
-                        "reasoning": "Direct text input - no ranking performed (analyzer unavailable)"
-                    }
-                ],
-                "analysis_metadata": {
-                    "total_sections": 1,
-                    "processing_time": time.time() - start_time,
-                    "analyzer_status": "fallback_mode",
-                    "gemini_enabled": False
-                }
-            }
+        analyzed_sections = await execution_layer.run_cpu(
+            _analyze_text_sections, request.text, request.persona, request.job
+        )
         
         processing_time = time.time() - start_time
         
@@ -383,6 +631,8 @@ async def analyze_text(request: LegacyTextAnalysisRequest) -> Dict[str, Any]:
             "analysis_results": analyzed_sections,
             "input_preview": request.text[:200] + ("..." if len(request.text) > 200 else "")
         }
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Text analysis failed: {e}")
         raise HTTPException(
@@ -397,6 +647,19 @@ async def analyze_text(request: LegacyTextAnalysisRequest) -> Dict[str, Any]:
             detail=f"Text analysis failed: {str(e)}"
         )
 
+def _retrieve_passages(text: str) -> List[Dict[str, Any]]:
+    """Corpus-wide hybrid retrieval (blocking: query encoding, index search)"""
+    ingestion_service.backfill_corpus()
+    return hybrid_retriever.search(text, limit=RELEVANT_SECTIONS_PASSAGES)
+
+def _pack_document_context(text: str, page_texts: Dict[int, str], passages: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Retrieved passages + page text of one document, packed by relevance to the selection (blocking)"""
+    candidates = [
+        {"page": passage["page"], "title": passage["section_title"], "text": passage["content"]}
+        for passage in passages
+    ] + [{"page": page, "title": None, "text": page_text} for page, page_text in page_texts.items()]
+    return context_packer.pack(text, candidates, RELEVANT_SECTIONS_CONTEXT_TOKENS)
+
 @router.post("/find-relevant-sections")
 async def find_relevant_sections(
     request: RelevantSectionsRequest,
@@ -413,10 +676,6 @@ async def find_relevant_sections(
     try:
         print(f"🚀 Finding relevant sections for selected text: {request.text[:100]}...")
         
-        # Initialize services
-        relevance_analyzer = RelevanceAnalyzer()
-        text_service = TextSelectionService()
-        
         # Get all PDF documents from database for cross-document search
         documents = db.query(PDFDocument).all()
         
@@ -431,43 +690,59 @@ async def find_relevant_sections(
         
         all_sections = []
         
-        # Process each document to extract text content and use Gemini for intelligent section detection
-        for doc in documents:
+        # Hybrid retrieval decides which documents get an LLM call and which passages lead the prompt
+        try:
+            retrieved_passages = await execution_layer.run_cpu(_retrieve_passages, request.text)
+        except HTTPException:
+            raise
+        except Exception as e:
+            print(f"⚠ Hybrid retrieval unavailable, sending every document: {e}")
+            retrieved_passages = []
+        passages_by_document = {}
+        for passage in retrieved_passages:
+            passages_by_document.setdefault(passage["document_id"], []).append(passage)
+        
+        candidate_documents = documents
+        if passages_by_document:
+            candidate_documents = sorted(
+                [doc for doc in documents if doc.id in passages_by_document],
+                key=lambda doc: -passages_by_document[doc.id][0]["score"]
+            )
+            print(f"🔎 Hybrid retrieval matched {len(candidate_documents)} of {len(documents)} documents")
+        
+        # Phase 1: extract text and build one section-detection prompt per document
+        prepared_documents = []
+        context_tokens = 0
+        for doc in candidate_documents:
             try:
-                if not doc.file_path or not os.path.exists(doc.file_path):
-                    print(f"⚠ File not found: {doc.file_path}")
-                    continue
-                    
                 print(f"📄 Processing document: {doc.original_filename}")
                 
-                # Extract raw text from PDF using PyMuPDF
-                import fitz  # PyMuPDF
-                pdf_document = fitz.open(doc.file_path)
-                full_text = ""
-                page_texts = {}
-                
-                for page_num in range(len(pdf_document)):
-                    page = pdf_document.load_page(page_num)
-                    page_text = page.get_text()
-                    page_texts[page_num + 1] = page_text
-                    full_text += f"\n--- Page {page_num + 1} ---\n{page_text}"
-                
-                pdf_document.close()
+                # Page text stored at ingestion time (the PDF is not re-opened)
+                page_texts = await execution_layer.run_io(ingestion_service.get_page_texts, doc.id)
+                full_text = join_page_texts(page_texts)
                 
                 if not full_text.strip():
                     print(f"⚠ No text extracted from {doc.original_filename}")
                     continue
                 
-                # Use Gemini API for intelligent section detection and relevance analysis
-                from app.insights.gemini_generator import GeminiInsightsGenerator
-                gemini_generator = GeminiInsightsGenerator()
+                # Retrieved passages and page text, most relevant first, within the token budget
+                document_passages = passages_by_document.get(doc.id, [])
+                packed = await execution_layer.run_cpu(_pack_document_context, request.text, page_texts, document_passages)
+                prompt_content = "\n\n".join(
+                    f"[Page {chunk['page']}]{' ' + chunk['title'] if chunk['title'] else ''}\n{chunk['text']}"
+                    for chunk in packed["chunks"]
+                )
+                context_tokens += packed["tokens_used"]
+                print(f"📦 Packed {len(packed['chunks'])} of {packed['candidates']} chunks "
+                      f"({packed['tokens_used']}/{packed['budget_tokens']} tokens) for {doc.original_filename}")
                 
+                # Use Gemini API for intelligent section detection and relevance analysis
                 # Prompt Gemini to identify relevant sections based on selected text
                 gemini_prompt = f"""
                 Analyze this PDF document and find sections relevant to the selected text: "{request.text}"
                 
                 Document: {doc.original_filename}
-                Content: {full_text[:8000]}  # Limit to first 8000 chars for API efficiency
+                Content: {prompt_content}
                 
                 Task: Identify the top 3 most relevant sections/headings and their content that relate to the selected text.
                 
@@ -483,9 +758,27 @@ async def find_relevant_sections(
                     ]
                 }}
                 """
+                prepared_documents.append((doc, full_text, document_passages, gemini_prompt))
                 
+            except HTTPException:
+                raise
+            except Exception as e:
+                print(f"⚠ Error processing document {doc.original_filename}: {e}")
+                continue
+        
+        # Phase 2: all document prompts go out concurrently through the LLM dispatcher,
+        # so wall-clock time is set by the slowest document instead of the sum
+        gemini_responses = await llm_dispatcher.map([
+            [{"role": "user", "content": gemini_prompt}]
+            for _, _, _, gemini_prompt in prepared_documents
+        ])
+        
+        # Phase 3: parse each response and map it onto the Part 1A outline
+        for (doc, full_text, document_passages, _), gemini_response in zip(prepared_documents, gemini_responses):
+            try:
                 try:
-                    gemini_response = gemini_generator.generate_insights(gemini_prompt)
+                    if not gemini_response:
+                        raise ValueError("Empty LLM response")
                     
                     # Parse Gemini response
                     import json
@@ -501,10 +794,8 @@ async def find_relevant_sections(
                     else:
                         gemini_data = gemini_response
                     
-                    # Integrate Part 1A for accurate page extraction and section titles
-                    from app.part1a.pdf_structure_extractor import MultilingualPDFExtractor
-                    extractor = MultilingualPDFExtractor()
-                    structure = extractor.extract_structure(doc.file_path)
+                    # Part 1A outline stored at ingestion time, for accurate page numbers and section titles
+                    structure = await execution_layer.run_io(ingestion_service.get_outline, doc.id)
                     outline = structure.get("outline", [])
                     
                     print(f"📋 Found {len(outline)} sections in Part 1A outline for {doc.original_filename}")
@@ -614,6 +905,24 @@ async def find_relevant_sections(
                             
                 except Exception as e:
                     print(f"⚠ Gemini API error for {doc.original_filename}: {e}")
+                    # Fallback: the document's best retrieved passages, with their real pages
+                    if document_passages:
+                        for passage in document_passages[:3]:
+                            all_sections.append({
+                                'content': passage['content'].strip()[:300],
+                                'section_title': passage['section_title'] or "Relevant Section",
+                                'document_name': doc.original_filename,
+                                'document_id': doc.id,
+                                'page': passage['page'],
+                                'relevance_score': 0.3,
+                                'metadata': {
+                                    'extracted_by': 'fallback_hybrid_passages',
+                                    'analysis_method': 'bm25_dense_rrf',
+                                    'dense_score': passage['dense_score']
+                                }
+                            })
+                        continue
+                    
                     # Fallback: create simple text chunks if Gemini fails
                     text_chunks = full_text.split('\n\n')[:3]  # Take first 3 paragraphs
                     for i, chunk in enumerate(text_chunks):
@@ -692,10 +1001,13 @@ async def find_relevant_sections(
                 "timestamp": datetime.now().isoformat(),
                 "documents_searched": len(documents),
                 "analysis_method": "gemini_enhanced_with_semantic_fallback",
-                "top_sections_count": len(top_sections)
+                "top_sections_count": len(top_sections),
+                "context_tokens": context_tokens
             }
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"❌ Error in find_relevant_sections: {e}")
         return {
@@ -3,42 +3,55 @@ import os
 os.environ['HF_HUB_DISABLE_SYMLINKS_WARNING'] = '1'
 
 import torch
-from transformers import GPT2Tokenizer, GPT2LMHeadModel
-from typing import List, Dict
+from typing import Callable, List, Dict
+from transformers import StoppingCriteria, StoppingCriteriaList
+
+from ..services.model_registry import model_registry
+
+class _SentenceStop(StoppingCriteria):
+    """Early stopping for batched sampling: every row has ended (EOS) or written enough sentences"""
+    
+    def __init__(self, prompt_length: int, terminator_ids: torch.Tensor, eos_token_id: int, sentences: int):
+        self.prompt_length = prompt_length
+        self.terminator_ids = terminator_ids
+        self.eos_token_id = eos_token_id
+        self.sentences = sentences
+    
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        generated = input_ids[:, self.prompt_length:]
+        finished = (generated == self.eos_token_id).any(dim=1)
+        sentence_counts = torch.isin(generated, self.terminator_ids).sum(dim=1)
+        return bool((finished | (sentence_counts >= self.sentences)).all())
 
 class SubSectionAnalyzer:
     """Analyzes and refines subsection content"""
     
-    def __init__(self):
+    def __init__(self, survivors_only: bool = None, backend: str = None):
         try:
-            print("Loading DistilGPT-2 tokenizer for subsection analysis...")
-            
-            # Try to load from local cache first (created during Docker build)
-            try:
-                self.tokenizer = GPT2Tokenizer.from_pretrained('distilgpt2', local_files_only=True)
-                self.model = GPT2LMHeadModel.from_pretrained('distilgpt2', local_files_only=True)
-                print("📁 Loaded models from local cache")
-            except:
-                # Fallback to online download (for development)
-                self.tokenizer = GPT2Tokenizer.from_pretrained('distilgpt2')
-                self.model = GPT2LMHeadModel.from_pretrained('distilgpt2')
-                print("🌐 Downloaded models from Hugging Face Hub")
-            
-            # Add padding token
-            if self.tokenizer.pad_token is None:
-                self.tokenizer.pad_token = self.tokenizer.eos_token
-                
-            print("✅ DistilGPT-2 for subsection analysis loaded successfully!")
-            
+            # Shared with DocumentProcessor through the model registry (backend: torch / int8 / onnx)
+            self.tokenizer, self.model = model_registry.get_gpt2('distilgpt2', backend=backend)
         except Exception as e:
             print(f"❌ Failed to load DistilGPT-2 for subsection analysis: {e}")
             raise  # Re-raise the exception
+        
+        self.batch_size = int(os.getenv("SUBSECTION_BATCH_SIZE", "8"))
+        self.max_new_tokens = int(os.getenv("SUBSECTION_MAX_NEW_TOKENS", "200"))
+        self.stop_sentences = int(os.getenv("SUBSECTION_STOP_SENTENCES", "3"))
+        # Only refine paragraphs that can make the top-5 cut
+        if survivors_only is None:
+            survivors_only = os.getenv("SUBSECTION_REFINE_SURVIVORS_ONLY", "true").lower() == "true"
+        self.survivors_only = survivors_only
+        self._terminator_ids = None
     
-    # In src/subsection_analyzer.py, update the analyze_subsections method:
-
-    def analyze_subsections(self, section: Dict, persona: str, job: str, extracted_sections: List[Dict]) -> List[Dict]:
-        """Analyze subsections and return only the top 5 most important (by importance_rank of parent section), with more descriptive refined_text and no parent_section."""
-        import os
+    def analyze_subsections(self, section: Dict, persona: str, job: str, extracted_sections: List[Dict],
+                            limit: int = 5, refine: Callable[[List[str]], List[str]] = None) -> List[Dict]:
+        """
+        Analyze subsections and return only the top `limit` most important (by importance_rank of parent
+        section), with more descriptive refined_text and no parent_section.
+        With survivors_only, paragraphs are refined in paragraph order until `limit` of them pass,
+        instead of refining up to 15 and discarding all but `limit`.
+        refine(paragraphs) -> refined texts replaces the DistilGPT-2 refinement (e.g. extractive mode).
+        """
         content = section.get('content', '')
         print(f"   Analyzing section: {section.get('section_title', 'Unknown')} (content length: {len(content)})")
         if len(content.strip()) < 30:
@@ -48,32 +61,41 @@ class SubSectionAnalyzer:
         if not paragraphs:
             paragraphs = [p.strip() for p in content.split('\n') if p.strip()]
         print(f"   Found {len(paragraphs)} paragraphs")
+        
+        # Find importance_rank for this section; subsections without one are dropped anyway
+        importance_rank = None
+        for sec in extracted_sections:
+            if (
+                os.path.basename(sec['document']) == os.path.basename(section['document']) and
+                sec.get('section_title') == section.get('section_title') and
+                sec.get('page_number') == section.get('page')
+            ):
+                importance_rank = sec.get('importance_rank')
+                break
+        if importance_rank is None or limit <= 0:
+            return []
+        
+        if refine is None:
+            refine = lambda texts: self.refine_contents(texts, persona, job)
+        
+        candidates = [(i, paragraph) for i, paragraph in enumerate(paragraphs[:15]) if len(paragraph) >= 20]
         subsections = []
-        for i, paragraph in enumerate(paragraphs[:15]):
-            if len(paragraph) < 20:
-                continue
-            refined_text = self.refine_content(paragraph, persona, job)
-            if refined_text and len(refined_text.strip()) > 15:
-                # Find importance_rank for this section
-                importance_rank = None
-                for sec in extracted_sections:
-                    if (
-                        os.path.basename(sec['document']) == os.path.basename(section['document']) and
-                        sec.get('section_title') == section.get('section_title') and
-                        sec.get('page_number') == section.get('page')
-                    ):
-                        importance_rank = sec.get('importance_rank')
-                        break
-                subsections.append({
-                    'document': os.path.basename(section['document']),
-                    'refined_text': refined_text,
-                    'page_number': section['page'],
-                    'importance_rank': importance_rank,
-                    'original_paragraph_index': i
-                })
+        while candidates and (not self.survivors_only or len(subsections) < limit):
+            # All candidates at once, or just enough to fill the remaining slots
+            take = len(candidates) if not self.survivors_only else limit - len(subsections)
+            window, candidates = candidates[:take], candidates[take:]
+            refined_texts = refine([paragraph for _, paragraph in window])
+            for (i, _), refined_text in zip(window, refined_texts):
+                if refined_text and len(refined_text.strip()) > 15:
+                    subsections.append({
+                        'document': os.path.basename(section['document']),
+                        'refined_text': refined_text,
+                        'page_number': section['page'],
+                        'importance_rank': importance_rank,
+                        'original_paragraph_index': i
+                    })
         # Sort by importance_rank (ascending, 1 is most important), then by paragraph order
-        subsections = [s for s in subsections if s['importance_rank'] is not None]
-        subsections = sorted(subsections, key=lambda x: (x['importance_rank'], x['original_paragraph_index']))[:5]
+        subsections = sorted(subsections, key=lambda x: (x['importance_rank'], x['original_paragraph_index']))[:limit]
         
         # Format output according to challenge specification
         formatted_subsections = []
@@ -87,36 +109,85 @@ class SubSectionAnalyzer:
         print(f"   Generated {len(formatted_subsections)} top subsections by importance")
         return formatted_subsections
     
-    def refine_content(self, text: str, persona: str, job: str) -> str:
-        """Refine content focus using language model, with a prompt for a more descriptive summary."""
-        try:
-            if len(text) < 30:
-                return text
-            prompt = f"""
+    def _build_prompt(self, text: str, persona: str, job: str) -> str:
+        return f"""
             Persona: {persona}
             Task: {job}
             Content: {text[:400]}
             
             Write a detailed, descriptive summary of the above content, highlighting key points, context, and practical details relevant to the task. Make the summary informative and actionable for the persona.
             """
-            print(f"   Refining content (length: {len(text)})")
-            inputs = self.tokenizer.encode(prompt, return_tensors='pt', max_length=512, truncation=True)
-            with torch.no_grad():
-                outputs = self.model.generate(
-                    inputs,
-                    max_length=min(len(inputs[0]) + 200, 512),
-                    num_return_sequences=1,
-                    temperature=0.7,
-                    do_sample=True,
-                    pad_token_id=self.tokenizer.eos_token_id,
-                    eos_token_id=self.tokenizer.eos_token_id
-                )
-            generated = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-            if len(generated) > len(prompt):
-                refined = generated[len(prompt):].strip()
-                return refined if refined else text
-            else:
-                return text
-        except Exception as e:
-            print(f"   ⚠️  Content refinement error: {e}")
-            return text  # Return original text as fallback
\ No newline at end of file
+    
+    def _get_terminator_ids(self) -> torch.Tensor:
+        """Vocabulary ids of tokens that end a sentence (computed once)"""
+        if self._terminator_ids is None:
+            ids = [
+                token_id for token, token_id in self.tokenizer.get_vocab().items()
+                if self.tokenizer.convert_tokens_to_string([token]).rstrip().endswith(('.', '!', '?'))
+            ]
+            self._terminator_ids = torch.tensor(ids, dtype=torch.long)
+        return self._terminator_ids
+    
+    def refine_content(self, text: str, persona: str, job: str) -> str:
+        """Refine content focus using language model, with a prompt for a more descriptive summary."""
+        return self.refine_contents([text], persona, job)[0]
+    
+    def refine_contents(self, texts: List[str], persona: str, job: str) -> List[str]:
+        """
+        Batched refine_content: prompts are grouped by token length into batches of SUBSECTION_BATCH_SIZE,
+        left-padded and generated with one `generate` call per batch
+        Texts shorter than 30 characters, and any failed batch, fall back to the original text
+        """
+        refined = list(texts)
+        pending = [i for i, text in enumerate(texts) if len(text) >= 30]
+        if not pending:
+            return refined
+        
+        prompts = {i: self._build_prompt(texts[i], persona, job) for i in pending}
+        encoded = {i: self.tokenizer.encode(prompts[i], max_length=512, truncation=True) for i in pending}
+        # Similar lengths share a batch, so little compute goes to padding
+        pending.sort(key=lambda i: len(encoded[i]))
+        
+        print(f"   Refining {len(pending)} paragraphs in batches of {self.batch_size}")
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            try:
+                inputs = self._left_padded([encoded[i] for i in batch])
+                prompt_length = inputs['input_ids'].shape[1]
+                stopping = StoppingCriteriaList([_SentenceStop(
+                    prompt_length, self._get_terminator_ids(), self.tokenizer.eos_token_id, self.stop_sentences
+                )])
+                with torch.no_grad():
+                    outputs = self.model.generate(
+                        **inputs,
+                        max_new_tokens=self.max_new_tokens,
+                        num_return_sequences=1,
+                        temperature=0.7,
+                        do_sample=True,
+                        pad_token_id=self.tokenizer.eos_token_id,
+                        eos_token_id=self.tokenizer.eos_token_id,
+                        stopping_criteria=stopping
+                    )
+                # Left padding: every row's new tokens start at prompt_length
+                generated = self.tokenizer.batch_decode(outputs[:, prompt_length:], skip_special_tokens=True)
+                for i, text in zip(batch, generated):
+                    if text.strip():
+                        refined[i] = text.strip()
+            except Exception as e:
+                print(f"   ⚠️  Content refinement error: {e}")
+        return refined
+    
+    def _left_padded(self, sequences: List[List[int]]) -> Dict[str, torch.Tensor]:
+        """
+        Batch inputs with the prompts left-padded, so new tokens line up at the end
+        Padded here rather than by setting padding_side on the tokenizer, which is shared
+        through the model registry
+        """
+        width = max(len(ids) for ids in sequences)
+        input_ids = torch.full((len(sequences), width), self.tokenizer.pad_token_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(sequences), width), dtype=torch.long)
+        for row, ids in enumerate(sequences):
+            if ids:
+                input_ids[row, width - len(ids):] = torch.tensor(ids, dtype=torch.long)
+                attention_mask[row, width - len(ids):] = 1
+        return {"input_ids": input_ids, "attention_mask": attention_mask}
@@ -0,0 +1,311 @@
+"""
+Analysis Job Service
+Runs /part1b analyses in a local worker pool instead of inside the HTTP request
+- Job state, progress and results are persisted in analysis_jobs (pdf_collections.db)
+- Uploaded PDFs are kept under data/analysis_jobs/<job_id>/ until the job finishes, so
+  jobs that were queued or running when the server stopped are resumed on startup
+- Identical submissions (same file hashes, persona, job and options) that arrive while a run
+  is queued or running share that run
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.database.database import SessionLocal, engine, DB_DIR
+from app.database.models import AnalysisJob
+
+JOBS_DIR = DB_DIR / "analysis_jobs"
+
+ACTIVE_STATUSES = ("queued", "running")
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobCancelled(Exception):
+    """Raised from the progress callback to stop a running job"""
+
+
+class AnalysisJobService:
+    """Submit / poll / cancel for DocumentAnalysisPipeline runs"""
+
+    def __init__(self, max_workers: int = None):
+        self.max_workers = max_workers or int(os.getenv("ANALYSIS_JOB_WORKERS", "2"))
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="analysis-job")
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._cancel_events: Dict[str, threading.Event] = {}
+
+        AnalysisJob.__table__.create(bind=engine, checkfirst=True)
+        self._resume_interrupted_jobs()
+
+    @staticmethod
+    def dedup_key(file_hashes: List[str], persona: str, job: str, options: Dict[str, Any]) -> str:
+        """Same PDFs (in any order), persona, job and options -> same key"""
+        payload = json.dumps(
+            {"files": sorted(file_hashes), "persona": persona, "job": job, "options": options},
+            sort_keys=True
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    # Submission
+
+    def submit(
+        self,
+        files: List[Dict[str, Any]],
+        persona: str,
+        job: str,
+        llm_shortlist: int = None,
+        llm_budget: int = None,
+        refinement_mode: str = None
+    ) -> Dict[str, Any]:
+        """
+        Queue an analysis, or join an identical one that is queued or running
+
+        Args:
+            files: [{"filename": str, "content": bytes}]
+            persona, job: Analysis persona and job-to-be-done
+            llm_shortlist, llm_budget: Cascade ranking overrides
+            refinement_mode: "generative" or "extractive" (None = PART1B_REFINEMENT_MODE)
+
+        Returns:
+            Job status dict plus "deduplicated": True when an existing run was joined
+        """
+        options = {"llm_shortlist": llm_shortlist, "llm_budget": llm_budget, "refinement_mode": refinement_mode}
+        hashed_files = [
+            {"filename": f["filename"], "file_hash": hashlib.sha256(f["content"]).hexdigest(), "content": f["content"]}
+            for f in files
+        ]
+        key = self.dedup_key([f["file_hash"] for f in hashed_files], persona, job, options)
+
+        # The lock makes check-and-insert atomic for concurrent identical submissions
+        with self._lock:
+            db = SessionLocal()
+            try:
+                existing = (
+                    db.query(AnalysisJob)
+                    .filter(AnalysisJob.dedup_key == key)
+                    .filter(AnalysisJob.status.in_(ACTIVE_STATUSES))
+                    .order_by(AnalysisJob.created_at)
+                    .first()
+                )
+                if existing:
+                    status = self._to_status(existing)
+                    status["deduplicated"] = True
+                    return status
+
+                job_id = str(uuid.uuid4())
+                job_dir = JOBS_DIR / job_id
+                job_dir.mkdir(parents=True, exist_ok=True)
+                stored_files = []
+                for index, f in enumerate(hashed_files):
+                    # Index prefix keeps same-named uploads apart
+                    path = job_dir / f"{index}_{os.path.basename(f['filename'])}"
+                    with open(path, "wb") as out:
+                        out.write(f["content"])
+                    stored_files.append({"filename": f["filename"], "file_hash": f["file_hash"], "path": str(path)})
+
+                record = AnalysisJob(
+                    id=job_id,
+                    dedup_key=key,
+                    status="queued",
+                    stage="queued",
+                    progress=0.0,
+                    persona=persona,
+                    job_to_be_done=job,
+                    options=json.dumps(options),
+                    files=json.dumps(stored_files)
+                )
+                db.add(record)
+                db.commit()
+                status = self._to_status(record)
+            finally:
+                db.close()
+
+            self._schedule(job_id)
+
+        status["deduplicated"] = False
+        print(f"🗂️ Analysis job {job_id} queued ({len(files)} PDFs)")
+        return status
+
+    def _schedule(self, job_id: str) -> None:
+        self._cancel_events[job_id] = threading.Event()
+        self._futures[job_id] = self._executor.submit(self._run, job_id)
+
+    def _resume_interrupted_jobs(self) -> None:
+        """Requeue jobs left queued/running by a previous process if their PDFs are still on disk"""
+        db = SessionLocal()
+        try:
+            interrupted = db.query(AnalysisJob).filter(AnalysisJob.status.in_(ACTIVE_STATUSES)).all()
+            resumed = []
+            for record in interrupted:
+                files = json.loads(record.files or "[]")
+                if files and all(os.path.exists(f["path"]) for f in files) and not record.cancel_requested:
+                    record.status, record.stage, record.progress, record.started_at = "queued", "queued", 0.0, None
+                    resumed.append(record.id)
+                else:
+                    record.status = "cancelled" if record.cancel_requested else "failed"
+                    record.error = None if record.cancel_requested else "Interrupted by server restart"
+                    record.finished_at = datetime.utcnow()
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            for job_id in resumed:
+                self._schedule(job_id)
+        if resumed:
+            print(f"🗂️ Resumed {len(resumed)} interrupted analysis jobs")
+
+    # Execution
+
+    def _update(self, job_id: str, **fields: Any) -> None:
+        db = SessionLocal()
+        try:
+            db.query(AnalysisJob).filter(AnalysisJob.id == job_id).update(fields, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+    def _run(self, job_id: str) -> None:
+        db = SessionLocal()
+        try:
+            record = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not record or record.status != "queued":
+                return
+            files = json.loads(record.files or "[]")
+            persona, job = record.persona, record.job_to_be_done
+            options = json.loads(record.options or "{}")
+        finally:
+            db.close()
+
+        cancel_event = self._cancel_events.get(job_id) or threading.Event()
+        if cancel_event.is_set():
+            self._finish(job_id, "cancelled")
+            return
+
+        self._update(job_id, status="running", stage="starting", started_at=datetime.utcnow())
+
+        def report(stage: str, fraction: float, data: Dict[str, Any] = None) -> None:
+            # Checkpoint between pipeline stages: persist progress, honour cancellation
+            if cancel_event.is_set():
+                raise JobCancelled()
+            self._update(job_id, stage=stage, progress=round(fraction, 3))
+
+        try:
+            from app.part1b.pipeline import DocumentAnalysisPipeline
+            pipeline = DocumentAnalysisPipeline()
+            result = pipeline.process_documents(
+                pdf_paths=[f["path"] for f in files],
+                persona=persona,
+                job=job,
+                llm_shortlist=options.get("llm_shortlist"),
+                llm_budget=options.get("llm_budget"),
+                progress=report,
+                refinement_mode=options.get("refinement_mode")
+            )
+            # Report uploaded names rather than the job directory's stored names
+            result.setdefault("metadata", {})["input_documents"] = [f["filename"] for f in files]
+            self._finish(job_id, "completed", result=json.dumps(result))
+            print(f"✅ Analysis job {job_id} completed")
+        except JobCancelled:
+            self._finish(job_id, "cancelled")
+            print(f"🛑 Analysis job {job_id} cancelled")
+        except Exception as e:
+            self._finish(job_id, "failed", error=str(e))
+            print(f"❌ Analysis job {job_id} failed: {e}")
+
+    def _finish(self, job_id: str, status: str, result: str = None, error: str = None) -> None:
+        fields = {"status": status, "stage": status, "finished_at": datetime.utcnow(), "error": error}
+        if status == "completed":
+            fields.update(progress=1.0, result=result)
+        self._update(job_id, **fields)
+        shutil.rmtree(JOBS_DIR / job_id, ignore_errors=True)
+        with self._lock:
+            self._futures.pop(job_id, None)
+            self._cancel_events.pop(job_id, None)
+
+    # Queries
+
+    @staticmethod
+    def _to_status(record: AnalysisJob) -> Dict[str, Any]:
+        return {
+            "job_id": record.id,
+            "status": record.status,
+            "stage": record.stage,
+            "progress": record.progress or 0.0,
+            "persona": record.persona,
+            "job": record.job_to_be_done,
+            "documents": [f["filename"] for f in json.loads(record.files or "[]")],
+            "error": record.error,
+            "created_at": record.created_at.isoformat() if record.created_at else None,
+            "started_at": record.started_at.isoformat() if record.started_at else None,
+            "finished_at": record.finished_at.isoformat() if record.finished_at else None
+        }
+
+    def get_status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = SessionLocal()
+        try:
+            record = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            return self._to_status(record) if record else None
+        finally:
+            db.close()
+
+    def get_result(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Pipeline result of a completed job (None otherwise)"""
+        db = SessionLocal()
+        try:
+            record = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not record or record.status != "completed" or not record.result:
+                return None
+            return json.loads(record.result)
+        finally:
+            db.close()
+
+    def cancel(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Cancel a queued or running job (a running job stops at its next stage boundary)
+        Deduplicated submissions share the run, so this cancels it for all of them
+        """
+        db = SessionLocal()
+        try:
+            record = db.query(AnalysisJob).filter(AnalysisJob.id == job_id).first()
+            if not record:
+                return None
+            if record.status in FINISHED_STATUSES:
+                return self._to_status(record)
+            record.cancel_requested = True
+            db.commit()
+        finally:
+            db.close()
+
+        with self._lock:
+            event = self._cancel_events.get(job_id)
+            future = self._futures.get(job_id)
+        if event:
+            event.set()
+        if future and future.cancel():
+            # Never started
+            self._finish(job_id, "cancelled")
+        return self.get_status(job_id)
+
+    def describe(self) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            counts: Dict[str, int] = {}
+            for (status,) in db.query(AnalysisJob.status).all():
+                counts[status] = counts.get(status, 0) + 1
+        finally:
+            db.close()
+        with self._lock:
+            in_process = len(self._futures)
+        return {"max_workers": self.max_workers, "scheduled": in_process, "jobs_by_status": counts}
+
+
+# Global analysis job service
+analysis_job_service = AnalysisJobService()
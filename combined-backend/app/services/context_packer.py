@@ -0,0 +1,255 @@
+"""
+Context Packer
+Token-budgeted prompt context in place of fixed character cuts (first N pages, first N
+characters, top N documents)
+- Candidate texts are split into chunks of about CONTEXT_CHUNK_TOKENS tokens on paragraph and
+  sentence boundaries
+- A cheap word-overlap score keeps the best CONTEXT_MAX_CANDIDATES chunks, which are then ranked
+  by cosine similarity to the query embedding (shared sentence transformer; chunk vectors go
+  through the embedding cache). Without an encoder the word-overlap ranking is used
+- Near-identical chunks (same normalized text, or cosine >= CONTEXT_DEDUP_THRESHOLD) are dropped,
+  and so are unrelated ones (cosine < CONTEXT_MIN_SIMILARITY, or no query word) once anything
+  relevant is packed: the budget is a ceiling, not a target
+- The budget is filled greedily in relevance order: a chunk that does not fit is skipped and
+  smaller ones after it may still be taken
+- Token counts come from tiktoken when it is installed, otherwise ~4 characters per token
+"""
+
+import math
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from app.services.model_registry import model_registry, DEFAULT_SENTENCE_MODEL
+
+try:
+    import tiktoken
+    _ENCODING = tiktoken.get_encoding("cl100k_base")
+except Exception:
+    _ENCODING = None
+
+CHARS_PER_TOKEN = 4
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+_WORD = re.compile(r"[a-z0-9]{3,}")
+
+
+def count_tokens(text: str) -> int:
+    """Prompt tokens of a text (tiktoken cl100k when installed, else a character estimate)"""
+    if not text:
+        return 0
+    if _ENCODING is not None:
+        return len(_ENCODING.encode(text, disallowed_special=()))
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def _merge(pieces: List[str], max_tokens: int) -> List[str]:
+    """Join neighbouring pieces while the result stays within max_tokens"""
+    merged: List[str] = []
+    current, current_tokens = [], 0
+    for piece in pieces:
+        tokens = count_tokens(piece)
+        if current and current_tokens + tokens > max_tokens:
+            merged.append(" ".join(current))
+            current, current_tokens = [], 0
+        current.append(piece)
+        current_tokens += tokens
+    if current:
+        merged.append(" ".join(current))
+    return merged
+
+
+def chunk_text(text: str, max_tokens: int) -> List[str]:
+    """
+    Split text into chunks of at most ~max_tokens: paragraphs, long paragraphs on sentence (then
+    word) boundaries; short paragraphs are joined with their neighbours
+    """
+    chunks: List[str] = []
+    for paragraph in re.split(r"\n\s*\n", text or ""):
+        paragraph = " ".join(paragraph.split())
+        if not paragraph:
+            continue
+        if count_tokens(paragraph) <= max_tokens:
+            chunks.append(paragraph)
+            continue
+        pieces: List[str] = []
+        for sentence in _SENTENCE_END.split(paragraph):
+            if count_tokens(sentence) <= max_tokens:
+                pieces.append(sentence)
+                continue
+            words = sentence.split()
+            step = max(1, max_tokens * CHARS_PER_TOKEN // 6)  # ~6 characters per word with its space
+            pieces.extend(" ".join(words[i:i + step]) for i in range(0, len(words), step))
+        chunks.extend(_merge(pieces, max_tokens))
+
+    # Headings and one-line paragraphs are too small to rank on their own
+    small = max_tokens // 4
+    result: List[str] = []
+    for chunk in chunks:
+        if result and (count_tokens(result[-1]) < small or count_tokens(chunk) < small) \
+                and count_tokens(result[-1]) + count_tokens(chunk) <= max_tokens:
+            result[-1] = f"{result[-1]} {chunk}"
+        else:
+            result.append(chunk)
+    return result
+
+
+def _words(text: str) -> set:
+    return set(_WORD.findall(text.lower()))
+
+
+class ContextPacker:
+    """Relevance-ranked, deduplicated, token-budgeted selection of prompt context"""
+
+    def __init__(self, model_name: str = None):
+        self.model_name = model_name or os.getenv("CONTEXT_PACKER_MODEL", DEFAULT_SENTENCE_MODEL)
+        self.chunk_tokens = int(os.getenv("CONTEXT_CHUNK_TOKENS", "200"))
+        self.max_candidates = int(os.getenv("CONTEXT_MAX_CANDIDATES", "300"))
+        self.dedup_threshold = float(os.getenv("CONTEXT_DEDUP_THRESHOLD", "0.95"))
+        self.min_similarity = float(os.getenv("CONTEXT_MIN_SIMILARITY", "0.2"))
+        self._lock = threading.Lock()
+        self._encoder_error: Optional[str] = None
+        self._stats = {
+            "packs": 0, "chunks_considered": 0, "chunks_packed": 0, "duplicates_dropped": 0,
+            "tokens_budgeted": 0, "tokens_used": 0
+        }
+
+    def _encode(self, texts: List[str]) -> Optional[np.ndarray]:
+        if self._encoder_error or not texts:
+            return None
+        try:
+            model = model_registry.get_sentence_transformer(self.model_name)
+            return np.asarray(model.encode(
+                texts,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            ), dtype=np.float32)
+        except Exception as e:
+            # Do not retry a missing model on every prompt
+            self._encoder_error = str(e)
+            print(f"⚠️ Context packer: encoder unavailable, ranking by word overlap: {e}")
+            return None
+
+    def pack(
+        self,
+        query: str,
+        candidates: Sequence[Dict[str, Any]],
+        budget_tokens: int,
+        query_vector: Optional[np.ndarray] = None,
+        max_chunks_per_source: int = None
+    ) -> Dict[str, Any]:
+        """
+        Most relevant, non-duplicate chunks of the candidates that fit in budget_tokens
+
+        Args:
+            query: Text the context should be relevant to (selected text, persona + job, ...)
+            candidates: Dicts with "text" plus any metadata (copied onto each of its chunks);
+                an optional "source" groups chunks for max_chunks_per_source
+            budget_tokens: Token budget of the packed context
+            query_vector: Normalized query embedding, if the caller already has one
+            max_chunks_per_source: Keeps one long source from taking the whole budget
+
+        Returns:
+            {"chunks": [candidate metadata + text, tokens, score; best first],
+             "tokens_used", "budget_tokens", "candidates", "duplicates", "ranking"}
+        """
+        chunks: List[Dict[str, Any]] = []
+        for candidate in candidates:
+            metadata = {k: v for k, v in candidate.items() if k != "text"}
+            for text in chunk_text(candidate.get("text", ""), self.chunk_tokens):
+                chunks.append({**metadata, "text": text, "tokens": count_tokens(text)})
+
+        # Stage 1: word overlap with the query (no query: keep the candidates' own order)
+        query_words = _words(query or "")
+        for index, chunk in enumerate(chunks):
+            if query_words:
+                chunk["score"] = len(query_words & _words(chunk["text"])) / len(query_words)
+            else:
+                chunk["score"] = 1.0 / (1 + index)
+        ranked = sorted(chunks, key=lambda chunk: -chunk["score"])[:self.max_candidates]
+        ranking = "lexical" if query_words else "order"
+
+        # Stage 2: embedding similarity to the query
+        vectors = None
+        if query:
+            if query_vector is None:
+                encoded = self._encode([" ".join(query.split())[:1000]])
+                query_vector = encoded[0] if encoded is not None else None
+            if query_vector is not None:
+                vectors = self._encode([chunk["text"] for chunk in ranked])
+        if vectors is not None:
+            similarities = vectors @ np.asarray(query_vector, dtype=np.float32)
+            for chunk, similarity in zip(ranked, similarities):
+                chunk["score"] = float(similarity)
+            order = np.argsort(-similarities, kind="stable")
+            ranked, vectors = [ranked[i] for i in order], vectors[order]
+            ranking = "embedding"
+
+        # Dedupe + greedy fill down to the relevance floor
+        floor = {"embedding": self.min_similarity, "lexical": 1e-9}.get(ranking)
+        packed: List[Dict[str, Any]] = []
+        packed_vectors: List[np.ndarray] = []
+        seen_texts, per_source = set(), {}
+        tokens_used = duplicates = 0
+        for index, chunk in enumerate(ranked):
+            if packed and floor is not None and chunk["score"] < floor:
+                break
+            normalized = chunk["text"].lower()
+            vector = vectors[index] if vectors is not None else None
+            if normalized in seen_texts or (
+                vector is not None and packed_vectors
+                and float(np.max(np.stack(packed_vectors) @ vector)) >= self.dedup_threshold
+            ):
+                duplicates += 1
+                continue
+            source = chunk.get("source")
+            if max_chunks_per_source and per_source.get(source, 0) >= max_chunks_per_source:
+                continue
+            if tokens_used + chunk["tokens"] > budget_tokens:
+                continue
+            seen_texts.add(normalized)
+            if vector is not None:
+                packed_vectors.append(vector)
+            per_source[source] = per_source.get(source, 0) + 1
+            tokens_used += chunk["tokens"]
+            chunk["score"] = round(chunk["score"], 4)
+            packed.append(chunk)
+
+        with self._lock:
+            self._stats["packs"] += 1
+            self._stats["chunks_considered"] += len(chunks)
+            self._stats["chunks_packed"] += len(packed)
+            self._stats["duplicates_dropped"] += duplicates
+            self._stats["tokens_budgeted"] += budget_tokens
+            self._stats["tokens_used"] += tokens_used
+
+        return {
+            "chunks": packed,
+            "tokens_used": tokens_used,
+            "budget_tokens": budget_tokens,
+            "candidates": len(chunks),
+            "duplicates": duplicates,
+            "ranking": ranking
+        }
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            budgeted = self._stats["tokens_budgeted"]
+            return {
+                "model": self.model_name,
+                "encoder_error": self._encoder_error,
+                "tokenizer": "tiktoken:cl100k_base" if _ENCODING is not None else f"~{CHARS_PER_TOKEN} chars/token",
+                "chunk_tokens": self.chunk_tokens,
+                "max_candidates": self.max_candidates,
+                "dedup_threshold": self.dedup_threshold,
+                "min_similarity": self.min_similarity,
+                **self._stats,
+                "budget_utilization": round(self._stats["tokens_used"] / budgeted, 3) if budgeted else None
+            }
+
+
+# Global context packer
+context_packer = ContextPacker()
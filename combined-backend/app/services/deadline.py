@@ -0,0 +1,72 @@
+"""
+Request Deadlines
+Per-request time budget that LLM calls made on behalf of the request respect
+- The HTTP middleware starts the budget: X-Request-Timeout (seconds) from the client, capped
+  at REQUEST_DEADLINE_SECONDS, on any route. Without the header only the LLM routes
+  (REQUEST_DEADLINE_PATHS prefixes, SSE streams excepted) get REQUEST_DEADLINE_SECONDS; analyses,
+  batch extraction and streams run without a deadline
+- The deadline lives in a ContextVar, so it follows the request into asyncio tasks and into
+  execution-layer threads (the thread lanes run jobs in a copy of the caller's context)
+- Each LLM call waits for min(its own timeout, time left on the request)
+"""
+
+import os
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from fastapi import Request
+
+# Absolute time.monotonic() deadline of the current request, or None
+_request_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+DEFAULT_REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE_SECONDS", "120"))
+DEFAULT_DEADLINE_PATHS = tuple(
+    prefix.strip() for prefix in os.getenv("REQUEST_DEADLINE_PATHS", "/insights/").split(",") if prefix.strip()
+)
+
+
+def set_request_deadline(seconds: float):
+    """Start a budget of `seconds` for the current context; returns the ContextVar token"""
+    return _request_deadline.set(time.monotonic() + seconds)
+
+
+def reset_request_deadline(token) -> None:
+    _request_deadline.reset(token)
+
+
+def call_deadline(timeout: float) -> float:
+    """Absolute deadline of one call: now + timeout, never past the request's own deadline"""
+    deadline = time.monotonic() + timeout
+    request_deadline = _request_deadline.get()
+    return min(deadline, request_deadline) if request_deadline is not None else deadline
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until an absolute deadline (None = no deadline), never negative"""
+    return None if deadline is None else max(deadline - time.monotonic(), 0.0)
+
+
+def default_deadline(path: str) -> Optional[float]:
+    """Budget of a request that did not send X-Request-Timeout (None = no deadline)"""
+    if path.endswith("/stream") or not path.startswith(DEFAULT_DEADLINE_PATHS):
+        return None
+    return DEFAULT_REQUEST_DEADLINE
+
+
+async def request_deadline_middleware(request: Request, call_next):
+    """HTTP middleware: sets the request's deadline, if it has one, before any handler runs"""
+    seconds = default_deadline(request.url.path)
+    header = request.headers.get("x-request-timeout")
+    if header:
+        try:
+            seconds = min(max(float(header), 0.0), DEFAULT_REQUEST_DEADLINE)
+        except ValueError:
+            pass
+    if seconds is None:
+        return await call_next(request)
+    token = set_request_deadline(seconds)
+    try:
+        return await call_next(request)
+    finally:
+        reset_request_deadline(token)
@@ -0,0 +1,315 @@
+"""
+Embedding Cache
+Two-level cache of embedding vectors keyed by model id and sha256 of the normalized text
+(whitespace collapsed), so the same section text is embedded once per model
+- Memory: LRU bounded by a byte budget (EMBEDDING_CACHE_MEMORY_MB)
+- Disk:   the embedding_cache table in pdf_collections.db (float32 BLOBs), bounded by
+          EMBEDDING_CACHE_MAX_ROWS and EMBEDDING_CACHE_MAX_AGE_DAYS: rows past the age limit and
+          the oldest rows past the row limit are purged on startup and as writes go on
+Sentence transformers from the model registry are wrapped in CachedSentenceEncoder, so every
+.encode() call goes through the cache; the text-selection API embedding paths use
+get_or_compute directly
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database.database import SessionLocal, engine
+from app.database.models import EmbeddingCacheEntry
+
+# Per-entry bookkeeping on top of the vector bytes (key tuple, OrderedDict node, array header)
+ENTRY_OVERHEAD_BYTES = 200
+DISK_QUERY_CHUNK = 500
+# Old/overflow rows are purged from the disk tier every this many writes
+PURGE_EVERY_WRITES = 100
+
+
+def normalize_text(text: str) -> str:
+    return " ".join(text.split())
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """Thread-safe memory LRU + SQLite store of embedding vectors"""
+
+    def __init__(self, memory_mb: float = None):
+        self.enabled = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+        self.max_memory_bytes = int((memory_mb or float(os.getenv("EMBEDDING_CACHE_MEMORY_MB", "64"))) * 1024 * 1024)
+        self._memory: "OrderedDict[Tuple[str, str], np.ndarray]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, int]] = {}
+        self.max_disk_rows = int(os.getenv("EMBEDDING_CACHE_MAX_ROWS", "200000"))
+        self.max_age_days = float(os.getenv("EMBEDDING_CACHE_MAX_AGE_DAYS", "30"))
+        self._writes = 0
+        self._purged = 0
+        self._disk_available = False
+        if self.enabled and os.getenv("EMBEDDING_CACHE_DISK", "true").lower() == "true":
+            self._disk_available = self._create_table()
+            if self._disk_available:
+                self.purge()
+
+    def _create_table(self) -> bool:
+        try:
+            EmbeddingCacheEntry.__table__.create(bind=engine, checkfirst=True)
+            return True
+        except Exception as e:
+            print(f"⚠️ Embedding cache: SQLite tier unavailable, using memory only: {e}")
+            return False
+
+    def purge(self) -> int:
+        """Delete rows older than the age limit, then the oldest rows past the row limit (0 = no limit)"""
+        if not self._disk_available:
+            return 0
+        db = SessionLocal()
+        try:
+            removed = 0
+            if self.max_age_days > 0:
+                removed += (
+                    db.query(EmbeddingCacheEntry)
+                    .filter(EmbeddingCacheEntry.created_at < datetime.utcnow() - timedelta(days=self.max_age_days))
+                    .delete(synchronize_session=False)
+                )
+            overflow = db.query(EmbeddingCacheEntry).count() - self.max_disk_rows if self.max_disk_rows > 0 else 0
+            if overflow > 0:
+                oldest = (
+                    db.query(EmbeddingCacheEntry.id)
+                    .order_by(EmbeddingCacheEntry.created_at, EmbeddingCacheEntry.id).limit(overflow).subquery()
+                )
+                removed += (
+                    db.query(EmbeddingCacheEntry)
+                    .filter(EmbeddingCacheEntry.id.in_(oldest.select()))
+                    .delete(synchronize_session=False)
+                )
+            db.commit()
+            if removed:
+                with self._lock:
+                    self._purged += removed
+            return removed
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Embedding cache purge failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    def _count(self, model_id: str, field: str, amount: int) -> None:
+        if amount:
+            stats = self._stats.setdefault(model_id, {"memory_hits": 0, "disk_hits": 0, "misses": 0})
+            stats[field] += amount
+
+    # Memory tier
+
+    def _remember(self, key: Tuple[str, str], vector: np.ndarray) -> None:
+        # Caller holds the lock
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            return
+        self._memory[key] = vector
+        self._memory_bytes += vector.nbytes + ENTRY_OVERHEAD_BYTES
+        while self._memory_bytes > self.max_memory_bytes and self._memory:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted.nbytes + ENTRY_OVERHEAD_BYTES
+
+    # Disk tier
+
+    def _load(self, model_id: str, hashes: List[str]) -> Dict[str, np.ndarray]:
+        found = {}
+        db = SessionLocal()
+        try:
+            for start in range(0, len(hashes), DISK_QUERY_CHUNK):
+                rows = (
+                    db.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.vector)
+                    .filter(EmbeddingCacheEntry.model_id == model_id)
+                    .filter(EmbeddingCacheEntry.text_hash.in_(hashes[start:start + DISK_QUERY_CHUNK]))
+                    .all()
+                )
+                for row_hash, blob in rows:
+                    found[row_hash] = np.frombuffer(blob, dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Embedding cache lookup failed: {e}")
+        finally:
+            db.close()
+        return found
+
+    def _store(self, model_id: str, vectors: Dict[str, np.ndarray]) -> None:
+        db = SessionLocal()
+        try:
+            statement = sqlite_insert(EmbeddingCacheEntry.__table__).on_conflict_do_nothing(
+                index_elements=["model_id", "text_hash"]
+            )
+            db.execute(statement, [
+                {"model_id": model_id, "text_hash": h, "dim": int(v.shape[0]), "vector": v.tobytes()}
+                for h, v in vectors.items()
+            ])
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Embedding cache store failed: {e}")
+        finally:
+            db.close()
+
+    # Lookup / store
+
+    def get_many(self, model_id: str, texts: Sequence[str]) -> List[Optional[np.ndarray]]:
+        """Cached vector per text (None where neither tier has it); counts hits and misses"""
+        if not self.enabled:
+            return [None] * len(texts)
+        hashes = [text_hash(text) for text in texts]
+        results: Dict[str, np.ndarray] = {}
+
+        with self._lock:
+            for h in hashes:
+                vector = self._memory.get((model_id, h))
+                if vector is not None:
+                    self._memory.move_to_end((model_id, h))
+                    results[h] = vector
+            self._count(model_id, "memory_hits", sum(1 for h in hashes if h in results))
+
+        pending = [h for h in dict.fromkeys(hashes) if h not in results]
+        if pending and self._disk_available:
+            found = self._load(model_id, pending)
+            with self._lock:
+                for h, vector in found.items():
+                    self._remember((model_id, h), vector)
+                self._count(model_id, "disk_hits", sum(1 for h in hashes if h in found))
+            results.update(found)
+
+        with self._lock:
+            self._count(model_id, "misses", sum(1 for h in hashes if h not in results))
+        return [results.get(h) for h in hashes]
+
+    def put_many(self, model_id: str, texts: Sequence[str], vectors: Sequence[Any]) -> List[Optional[np.ndarray]]:
+        """Store vectors for texts (None entries and a disabled cache skip it); returns them as float32 arrays"""
+        fresh: Dict[str, np.ndarray] = {}
+        stored: List[Optional[np.ndarray]] = []
+        for text, vector in zip(texts, vectors):
+            if vector is None:
+                stored.append(None)
+                continue
+            vector = np.asarray(vector, dtype=np.float32).reshape(-1)
+            fresh[text_hash(text)] = vector
+            stored.append(vector)
+        if fresh and self.enabled:
+            with self._lock:
+                for h, vector in fresh.items():
+                    self._remember((model_id, h), vector)
+                self._writes += 1
+                purge = self._writes % PURGE_EVERY_WRITES == 0
+            if self._disk_available:
+                self._store(model_id, fresh)
+                if purge:
+                    self.purge()
+        return stored
+
+    def get_or_compute(
+        self,
+        model_id: str,
+        texts: Sequence[str],
+        compute: Callable[[List[str]], Sequence[Any]]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        One float32 vector per text, in order
+        compute(missing_texts) is called once with the distinct texts found in neither tier and must
+        return one vector (or None on failure) per text; None results are returned but not cached.
+        With the cache disabled, compute(texts) gets every text and nothing is stored
+        """
+        if not self.enabled:
+            return self.put_many(model_id, texts, compute(list(texts)))
+        results = self.get_many(model_id, texts)
+        missing = list(dict.fromkeys(normalize_text(text) for text, vector in zip(texts, results) if vector is None))
+        if missing:
+            computed = dict(zip(missing, self.put_many(model_id, missing, compute(missing))))
+            results = [
+                vector if vector is not None else computed.get(normalize_text(text))
+                for text, vector in zip(texts, results)
+            ]
+        return results
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            totals = {"memory_hits": 0, "disk_hits": 0, "misses": 0}
+            models = {}
+            for model_id, stats in self._stats.items():
+                lookups = sum(stats.values())
+                models[model_id] = {
+                    **stats,
+                    "hit_rate": round((stats["memory_hits"] + stats["disk_hits"]) / lookups, 3) if lookups else None
+                }
+                for field in totals:
+                    totals[field] += stats[field]
+            lookups = sum(totals.values())
+            return {
+                "enabled": self.enabled,
+                "disk_tier": self._disk_available,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "max_disk_rows": self.max_disk_rows,
+                "max_age_days": self.max_age_days,
+                "purged_rows": self._purged,
+                **totals,
+                "hit_rate": round((totals["memory_hits"] + totals["disk_hits"]) / lookups, 3) if lookups else None,
+                "models": models
+            }
+
+
+class CachedSentenceEncoder:
+    """
+    SentenceTransformer proxy whose encode() reads and fills the embedding cache
+    Other attributes are delegated to the wrapped model
+    """
+
+    def __init__(self, model: Any, model_id: str, cache: EmbeddingCache):
+        self._model = model
+        self.model_id = model_id
+        self._cache = cache
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._model, name)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = None,
+               convert_to_numpy: bool = True, convert_to_tensor: bool = False,
+               normalize_embeddings: bool = False, **kwargs):
+        if kwargs:
+            # Prompts, precision, token embeddings...: not what the cache stores
+            return self._model.encode(
+                sentences, batch_size=batch_size, show_progress_bar=show_progress_bar,
+                convert_to_numpy=convert_to_numpy, convert_to_tensor=convert_to_tensor,
+                normalize_embeddings=normalize_embeddings, **kwargs
+            )
+
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+
+        def compute(missing: List[str]) -> np.ndarray:
+            return self._model.encode(missing, batch_size=batch_size, show_progress_bar=False, convert_to_numpy=True)
+
+        vectors = self._cache.get_or_compute(self.model_id, texts, compute) if texts else []
+        dim = vectors[0].shape[0] if len(vectors) else self._model.get_sentence_embedding_dimension()
+        embeddings = np.stack(vectors) if len(vectors) else np.zeros((0, dim), dtype=np.float32)
+        if normalize_embeddings:
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        if single:
+            embeddings = embeddings[0]
+
+        if convert_to_tensor or not convert_to_numpy:
+            import torch
+            tensor = torch.from_numpy(np.ascontiguousarray(embeddings))
+            return tensor if convert_to_tensor or single else list(tensor)
+        return embeddings
+
+
+# Global embedding cache
+embedding_cache = EmbeddingCache()
@@ -0,0 +1,312 @@
+"""
+Embedding Provider Client
+Pooled, batched HTTP client for the Ollama / OpenAI / Cohere embedding APIs
+- One keep-alive requests.Session (or httpx.AsyncClient for the async variant) per process
+- Many texts per request through each provider's batch endpoint (EMBEDDING_API_BATCH_SIZE)
+- Provider health (Ollama /api/tags, API key presence) cached for EMBEDDING_HEALTH_TTL seconds
+- The working Ollama model is remembered instead of probing every candidate on every call
+- Vectors go through the embedding cache, so only uncached texts are sent
+"""
+
+import asyncio
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+from app.services.embedding_cache import embedding_cache
+
+# Ollama models in order of preference
+OLLAMA_MODELS = [
+    "nomic-embed-text",  # Recommended for contest (1.5GB)
+    "mxbai-embed-large",  # Alternative high-quality option
+    "all-minilm"  # Fallback option
+]
+OPENAI_MODEL = "text-embedding-3-large"
+COHERE_MODEL = "embed-english-v3.0"
+
+
+class EmbeddingProviderClient:
+    """Embeddings from the configured API provider (EMBEDDING_API_TYPE)"""
+
+    def __init__(self, provider: str = None):
+        self.provider = (provider or os.getenv('EMBEDDING_API_TYPE', 'ollama')).lower()  # ollama, openai, cohere
+        self.base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434').rstrip('/')
+        self.api_key = os.getenv('OPENAI_API_KEY', '')  # For OpenAI/Cohere
+        self.batch_size = int(os.getenv("EMBEDDING_API_BATCH_SIZE", "64"))
+        self.health_ttl = float(os.getenv("EMBEDDING_HEALTH_TTL", "60"))
+        self.timeout = float(os.getenv("EMBEDDING_API_TIMEOUT", "30"))
+        pool_size = int(os.getenv("EMBEDDING_API_POOL_SIZE", "10"))
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._lock = threading.Lock()
+        self._health: Optional[Tuple[bool, float]] = None  # (available, checked_at)
+        self._installed_models: List[str] = []
+        self._model: Optional[str] = None  # Remembered working model
+        self._ollama_batch_endpoint = True  # /api/embed (Ollama >= 0.3); False -> per-text /api/embeddings
+        self._stats = {"requests": 0, "texts_sent": 0, "errors": 0, "health_checks": 0}
+
+    # Health / model selection
+
+    def is_available(self, force: bool = False) -> bool:
+        """Provider reachability, re-checked at most every EMBEDDING_HEALTH_TTL seconds"""
+        with self._lock:
+            if not force and self._health and time.time() - self._health[1] < self.health_ttl:
+                return self._health[0]
+
+        available = self._check_health()
+        with self._lock:
+            self._health = (available, time.time())
+            self._stats["health_checks"] += 1
+        return available
+
+    def _check_health(self) -> bool:
+        if self.provider in ("openai", "cohere"):
+            return bool(self.api_key)
+        if self.provider != "ollama":
+            return False
+        try:
+            response = self.session.get(f"{self.base_url}/api/tags", timeout=5)
+            if response.status_code != 200:
+                return False
+            names = [m.get("name", "") for m in response.json().get("models", [])]
+            with self._lock:
+                self._installed_models = names
+            return True
+        except Exception as e:
+            print(f"⚠️ Ollama connection failed: {e}")
+            return False
+
+    def _candidate_models(self) -> List[str]:
+        """Ollama models to try: the remembered one, then installed candidates, then the rest"""
+        with self._lock:
+            remembered, installed = self._model, self._installed_models
+        installed_base = {name.split(":")[0] for name in installed}
+        preferred = [m for m in OLLAMA_MODELS if m in installed_base]
+        ordered = ([remembered] if remembered else []) + preferred + OLLAMA_MODELS
+        return list(dict.fromkeys(ordered))
+
+    @property
+    def model_name(self) -> Optional[str]:
+        if self.provider == "openai":
+            return OPENAI_MODEL
+        if self.provider == "cohere":
+            return COHERE_MODEL
+        return self._model
+
+    def _mark_unhealthy(self) -> None:
+        with self._lock:
+            self._health = (False, time.time())
+            self._stats["errors"] += 1
+
+    # Request building / parsing (shared by the sync and async clients)
+
+    def _use_batch_endpoint(self) -> bool:
+        """Whether Ollama batches go to /api/embed; read once per fetch and passed along, since
+        another thread may switch it while a batch is in flight"""
+        with self._lock:
+            return self.provider != "ollama" or self._ollama_batch_endpoint
+
+    def _request(self, model: str, texts: List[str], batch_endpoint: bool) -> Tuple[str, Dict[str, str], Dict[str, Any]]:
+        """(url, headers, json body) for one batch"""
+        if self.provider == "openai":
+            return (
+                "https://api.openai.com/v1/embeddings",
+                {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                {"model": model, "input": texts}
+            )
+        if self.provider == "cohere":
+            return (
+                "https://api.cohere.ai/v1/embed",
+                {"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                {"model": model, "texts": texts, "input_type": "search_document"}
+            )
+        if batch_endpoint:
+            return f"{self.base_url}/api/embed", {}, {"model": model, "input": texts}
+        return f"{self.base_url}/api/embeddings", {}, {"model": model, "prompt": texts[0]}
+
+    def _parse(self, data: Dict[str, Any], count: int, batch_endpoint: bool) -> List[Optional[List[float]]]:
+        if self.provider == "openai":
+            vectors = [item["embedding"] for item in sorted(data["data"], key=lambda item: item["index"])]
+        elif self.provider == "cohere":
+            vectors = data["embeddings"]
+        elif batch_endpoint:
+            vectors = data.get("embeddings") or []
+        else:
+            vectors = [data.get("embedding")]
+        if len(vectors) != count:
+            raise ValueError(f"expected {count} embeddings, got {len(vectors)}")
+        return vectors
+
+    def _batches(self, texts: List[str], batch_endpoint: bool) -> List[List[str]]:
+        size = self.batch_size if batch_endpoint else 1
+        return [texts[i:i + size] for i in range(0, len(texts), size)]
+
+    # Sync API
+
+    def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """One vector per text (None where the provider failed); cached texts are not sent"""
+        texts = list(texts)
+        if not texts or not self.is_available():
+            return [None] * len(texts)
+
+        if self.provider == "ollama":
+            for model in self._candidate_models():
+                vectors = embedding_cache.get_or_compute(f"ollama:{model}", texts, lambda missing: self._fetch(model, missing))
+                if any(v is not None for v in vectors):
+                    with self._lock:
+                        self._model = model
+                    return [v.tolist() if v is not None else None for v in vectors]
+            print("❌ No Ollama embedding models available")
+            return [None] * len(texts)
+
+        model = self.model_name
+        vectors = embedding_cache.get_or_compute(f"{self.provider}:{model}", texts, lambda missing: self._fetch(model, missing))
+        return [v.tolist() if v is not None else None for v in vectors]
+
+    def _fetch(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        results: List[Optional[List[float]]] = []
+        batch_endpoint = self._use_batch_endpoint()
+        for batch in self._batches(texts, batch_endpoint):
+            results.extend(self._post_batch(model, batch, batch_endpoint))
+        return results
+
+    def _post_batch(self, model: str, batch: List[str], batch_endpoint: bool) -> List[Optional[List[float]]]:
+        url, headers, body = self._request(model, batch, batch_endpoint)
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["texts_sent"] += len(batch)
+        try:
+            response = self.session.post(url, headers=headers, json=body, timeout=self.timeout)
+            if response.status_code == 404 and self.provider == "ollama" and batch_endpoint \
+                    and "model" not in response.text.lower():
+                # Older Ollama without /api/embed: one text per request from now on
+                with self._lock:
+                    self._ollama_batch_endpoint = False
+                return self._fetch(model, batch)
+            if response.status_code == 404:
+                print(f"📋 Model {model} not found")
+                with self._lock:
+                    if self._model == model:
+                        self._model = None
+                return [None] * len(batch)
+            if response.status_code != 200:
+                print(f"⚠️ {self.provider} embedding API error {response.status_code} for {model}")
+                with self._lock:
+                    self._stats["errors"] += 1
+                return [None] * len(batch)
+            return self._parse(response.json(), len(batch), batch_endpoint)
+        except requests.exceptions.ConnectionError as e:
+            print(f"⚠️ {self.provider} embedding request failed: {e}")
+            self._mark_unhealthy()
+            return [None] * len(batch)
+        except Exception as e:
+            print(f"⚠️ {self.provider} embedding request failed: {e}")
+            with self._lock:
+                self._stats["errors"] += 1
+            return [None] * len(batch)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "provider": self.provider,
+                "model": self.model_name,
+                "available": self._health[0] if self._health else None,
+                "health_checked_seconds_ago": round(time.time() - self._health[1], 1) if self._health else None,
+                "batch_endpoint": self._ollama_batch_endpoint if self.provider == "ollama" else True,
+                **self._stats
+            }
+
+
+class AsyncEmbeddingProviderClient:
+    """
+    asyncio variant sharing configuration, health and model choice with a sync client
+    Requests go through one pooled httpx.AsyncClient; cache reads/writes run in a thread
+    """
+
+    def __init__(self, client: EmbeddingProviderClient):
+        self.client = client
+        self._http: Optional["httpx.AsyncClient"] = None
+
+    def _http_client(self) -> "httpx.AsyncClient":
+        if self._http is None or self._http.is_closed:
+            pool_size = int(os.getenv("EMBEDDING_API_POOL_SIZE", "10"))
+            self._http = httpx.AsyncClient(
+                timeout=self.client.timeout,
+                limits=httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+            )
+        return self._http
+
+    async def embed(self, texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Async counterpart of EmbeddingProviderClient.embed"""
+        if not HTTPX_AVAILABLE:
+            return await asyncio.to_thread(self.client.embed, texts)
+
+        texts = list(texts)
+        if not texts or not await asyncio.to_thread(self.client.is_available):
+            return [None] * len(texts)
+
+        models = self.client._candidate_models() if self.client.provider == "ollama" else [self.client.model_name]
+        for model in models:
+            model_id = f"{self.client.provider}:{model}"
+            cached = await asyncio.to_thread(embedding_cache.get_many, model_id, texts)
+            missing = list(dict.fromkeys(t for t, v in zip(texts, cached) if v is None))
+            fetched = {}
+            if missing:
+                vectors = []
+                batch_endpoint = self.client._use_batch_endpoint()
+                for batch in self.client._batches(missing, batch_endpoint):
+                    vectors.extend(await self._post_batch(model, batch, batch_endpoint))
+                stored = await asyncio.to_thread(embedding_cache.put_many, model_id, missing, vectors)
+                fetched = dict(zip(missing, stored))
+            results = [v if v is not None else fetched.get(t) for t, v in zip(texts, cached)]
+            if any(v is not None for v in results):
+                if self.client.provider == "ollama":
+                    with self.client._lock:
+                        self.client._model = model
+                return [v.tolist() if v is not None else None for v in results]
+        return [None] * len(texts)
+
+    async def _post_batch(self, model: str, batch: List[str], batch_endpoint: bool) -> List[Optional[List[float]]]:
+        url, headers, body = self.client._request(model, batch, batch_endpoint)
+        with self.client._lock:
+            self.client._stats["requests"] += 1
+            self.client._stats["texts_sent"] += len(batch)
+        try:
+            response = await self._http_client().post(url, headers=headers, json=body)
+            if response.status_code != 200:
+                # Endpoint/model fallbacks are handled by the sync client, which reads the
+                # endpoint choice again (it may have switched to per-text requests)
+                return await asyncio.to_thread(self.client._fetch, model, batch)
+            return self.client._parse(response.json(), len(batch), batch_endpoint)
+        except httpx.ConnectError as e:
+            print(f"⚠️ {self.client.provider} embedding request failed: {e}")
+            self.client._mark_unhealthy()
+            return [None] * len(batch)
+        except Exception as e:
+            print(f"⚠️ {self.client.provider} embedding request failed: {e}")
+            with self.client._lock:
+                self.client._stats["errors"] += 1
+            return [None] * len(batch)
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+
+
+# Global embedding clients
+embedding_client = EmbeddingProviderClient()
+async_embedding_client = AsyncEmbeddingProviderClient(embedding_client)
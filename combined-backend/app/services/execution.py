@@ -0,0 +1,190 @@
+"""
+Execution Layer
+Keeps blocking work off the asyncio event loop with bounded, separately sized executors
+- cpu:     threads for in-process CPU work that needs loaded models (torch inference, ranking)
+- io:      threads for blocking I/O (SQLite reads, synchronous HTTP/LLM SDK calls)
+- process: the shared process pool for picklable CPU work (fitz parsing, Part 1A extraction)
+Each lane admits at most max_workers + max_queue jobs; past that, requests are rejected with
+503 (or EXECUTION_REJECT_STATUS) and a Retry-After estimate instead of piling up
+Thread lanes run each job in a copy of the caller's contextvars (e.g. the request deadline)
+"""
+
+import asyncio
+import contextvars
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Tuple
+
+from fastapi import HTTPException
+
+from app.utils.process_pool import get_process_pool, default_worker_count
+
+
+class ExecutorOverloaded(HTTPException):
+    """Raised when a lane's queue is full; handlers that re-raise HTTPException pass it through"""
+
+    def __init__(self, lane: str, retry_after: int, status_code: int = 503):
+        super().__init__(
+            status_code=status_code,
+            detail=f"Server busy: {lane} queue is full, retry in {retry_after}s",
+            headers={"Retry-After": str(retry_after)}
+        )
+        self.lane = lane
+        self.retry_after = retry_after
+
+
+def _timed_call(func: Callable, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    """Runs in the worker; returns (result, started_at, finished_at) as wall-clock times"""
+    started_at = time.time()
+    result = func(*args, **kwargs)
+    return result, started_at, time.time()
+
+
+class ExecutionLane:
+    """One bounded executor with admission control and queue/wait metrics"""
+
+    def __init__(self, name: str, max_workers: int, max_queue: int, executor: Executor, reject_status: int = 503,
+                 copy_context: bool = True):
+        self.name = name
+        self.copy_context = copy_context  # False for process pools (contexts do not pickle)
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.reject_status = reject_status
+        self._executor = executor
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waits = deque(maxlen=500)  # seconds, most recent jobs
+        self._stats = {
+            "submitted": 0, "completed": 0, "failed": 0, "rejected": 0,
+            "total_wait": 0.0, "max_wait": 0.0, "total_run": 0.0
+        }
+
+    @property
+    def capacity(self) -> int:
+        return self.max_workers + self.max_queue
+
+    def _retry_after(self) -> int:
+        """Seconds until a slot is likely free: queued work / workers x average run time"""
+        completed = self._stats["completed"]
+        average_run = self._stats["total_run"] / completed if completed else 1.0
+        queued = max(self._in_flight - self.max_workers, 0) + 1
+        return int(min(max(math.ceil(average_run * queued / self.max_workers), 1), 60))
+
+    def _release(self, _future) -> None:
+        # Runs when the job really finishes, even if the awaiting request was cancelled
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Run func(*args, **kwargs) in this lane and await its result"""
+        with self._lock:
+            if self._in_flight >= self.capacity:
+                self._stats["rejected"] += 1
+                raise ExecutorOverloaded(self.name, self._retry_after(), self.reject_status)
+            self._in_flight += 1
+            self._stats["submitted"] += 1
+
+        enqueued_at = time.time()
+        try:
+            if self.copy_context:
+                future = self._executor.submit(contextvars.copy_context().run, _timed_call, func, args, kwargs)
+            else:
+                future = self._executor.submit(_timed_call, func, args, kwargs)
+        except Exception:
+            with self._lock:
+                self._in_flight -= 1
+            raise
+        future.add_done_callback(self._release)
+
+        try:
+            result, started_at, finished_at = await asyncio.wrap_future(future)
+        except Exception:
+            with self._lock:
+                self._stats["failed"] += 1
+            raise
+
+        wait = max(started_at - enqueued_at, 0.0)
+        with self._lock:
+            self._stats["completed"] += 1
+            self._stats["total_wait"] += wait
+            self._stats["max_wait"] = max(self._stats["max_wait"], wait)
+            self._stats["total_run"] += finished_at - started_at
+            self._waits.append(wait)
+        return result
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            completed = self._stats["completed"]
+            waits = sorted(self._waits)
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": max(self._in_flight - self.max_workers, 0),
+                "submitted": self._stats["submitted"],
+                "completed": completed,
+                "failed": self._stats["failed"],
+                "rejected": self._stats["rejected"],
+                "avg_wait_ms": round(self._stats["total_wait"] / completed * 1000, 1) if completed else None,
+                "p95_wait_ms": round(waits[math.ceil(0.95 * len(waits)) - 1] * 1000, 1) if waits else None,
+                "max_wait_ms": round(self._stats["max_wait"] * 1000, 1),
+                "avg_run_ms": round(self._stats["total_run"] / completed * 1000, 1) if completed else None
+            }
+
+
+class ExecutionLayer:
+    """The cpu, io and process lanes shared by every router"""
+
+    def __init__(self):
+        reject_status = int(os.getenv("EXECUTION_REJECT_STATUS", "503"))
+        cpu_workers = int(os.getenv("EXECUTION_CPU_WORKERS", str(min(4, os.cpu_count() or 1))))
+        io_workers = int(os.getenv("EXECUTION_IO_WORKERS", "16"))
+        process_workers = default_worker_count()
+
+        self.cpu = ExecutionLane(
+            "cpu", cpu_workers, int(os.getenv("EXECUTION_CPU_QUEUE", "16")),
+            ThreadPoolExecutor(max_workers=cpu_workers, thread_name_prefix="exec-cpu"), reject_status
+        )
+        self.io = ExecutionLane(
+            "io", io_workers, int(os.getenv("EXECUTION_IO_QUEUE", "64")),
+            ThreadPoolExecutor(max_workers=io_workers, thread_name_prefix="exec-io"), reject_status
+        )
+        self.process = ExecutionLane(
+            "process", process_workers, int(os.getenv("EXECUTION_PROCESS_QUEUE", "32")),
+            _SharedProcessPool(process_workers), reject_status, copy_context=False
+        )
+
+    async def run_cpu(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await self.cpu.run(func, *args, **kwargs)
+
+    async def run_io(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        return await self.io.run(func, *args, **kwargs)
+
+    async def run_process(self, func: Callable, *args: Any, **kwargs: Any) -> Any:
+        """func and its arguments must be picklable (module-level function, plain data)"""
+        return await self.process.run(func, *args, **kwargs)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "cpu": self.cpu.describe(),
+            "io": self.io.describe(),
+            "process": self.process.describe()
+        }
+
+
+class _SharedProcessPool(Executor):
+    """Submits to the process pool shared with parallel_map (recreated if a worker died)"""
+
+    def __init__(self, workers: int):
+        self.workers = workers
+
+    def submit(self, fn, *args, **kwargs):
+        return get_process_pool(self.workers).submit(fn, *args, **kwargs)
+
+
+# Global execution layer
+execution_layer = ExecutionLayer()
@@ -0,0 +1,198 @@
+"""
+Hybrid Retrieval
+Fuses BM25 (SQLite FTS5) and dense (vector index) rankings with reciprocal rank fusion
+Used by /documents/search, /text-selection and /part1b/find-relevant-sections
+"""
+
+import os
+import time
+from collections import defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.services.lexical_index import lexical_index, LexicalIndex
+from app.services.model_registry import model_registry
+from app.services.vector_index import section_index, get_section_entries, VectorIndex
+
+# Passage sources the dense index covers; page rows are lexical-only
+EMBEDDED_SOURCES = ("section", "paragraph")
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[Sequence[Hashable]],
+    k: int = 60,
+    weights: Sequence[float] = None
+) -> Dict[Hashable, float]:
+    """
+    Reciprocal rank fusion: score(d) = sum_i w_i / (k + rank_i(d)), ranks starting at 1
+
+    Args:
+        rankings: Best-first lists of item keys, one per retriever
+        k: Damping constant (60 in the original RRF paper)
+        weights: Optional per-ranking weights
+
+    Returns:
+        Dict of item key -> fused score
+    """
+    weights = weights or [1.0] * len(rankings)
+    scores: Dict[Hashable, float] = defaultdict(float)
+    for ranking, weight in zip(rankings, weights):
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] += weight / (k + rank)
+    return dict(scores)
+
+
+class HybridRetriever:
+    """Lexical + dense passage retrieval over the ingested corpus"""
+
+    def __init__(self, lexical: LexicalIndex, dense: VectorIndex):
+        self.lexical = lexical
+        self.dense = dense
+        self.rrf_k = int(os.getenv("HYBRID_RRF_K", "60"))
+        self.lexical_weight = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+        self.dense_weight = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+        self.min_dense_score = float(os.getenv("HYBRID_MIN_DENSE_SCORE", "0.3"))
+
+    @property
+    def available(self) -> bool:
+        self.dense.ensure_built()
+        return self.lexical.available or len(self.dense) > 0
+
+    def encode_query(self, text: str) -> Optional[np.ndarray]:
+        """Encode a query with the model the dense index was built from"""
+        try:
+            model = model_registry.get_sentence_transformer(self.dense.model_name)
+            return model.encode(
+                [text[:512]],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )[0]
+        except Exception as e:
+            print(f"⚠️ Hybrid retrieval: dense query encoder unavailable, using BM25 only: {e}")
+            return None
+
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        exclude_document_id: int = None,
+        include_pages: bool = False,
+        candidates: int = None,
+        query_vector: np.ndarray = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Fused passage ranking, best first
+
+        Returns:
+            List of {"key", "source", "document_id", "page", "section_title", "content",
+            "score" (RRF), "bm25_rank", "dense_rank", "dense_score" (cosine or None)}
+        """
+        candidates = candidates or max(limit * 4, 50)
+        start_time = time.perf_counter()
+        self.dense.ensure_built()
+
+        sources = EMBEDDED_SOURCES + ("page",) if include_pages else EMBEDDED_SOURCES
+        lexical_hits = self.lexical.search(query, candidates, sources=sources, exclude_document_id=exclude_document_id)
+        lexical_ms = (time.perf_counter() - start_time) * 1000
+
+        if query_vector is None and len(self.dense) > 0:
+            query_vector = self.encode_query(query)
+        dense_hits = (
+            self.dense.search(query_vector, k=candidates, exclude_document_id=exclude_document_id)
+            if query_vector is not None else []
+        )
+
+        # Sections and paragraphs share keys across both retrievers (document_sections ids)
+        def passage_key(source: str, source_id: int) -> Tuple[str, int]:
+            return ("page" if source == "page" else "section", source_id)
+
+        lexical_keys = [passage_key(hit["source"], hit["source_id"]) for hit in lexical_hits]
+        dense_keys = [("section", hit["section_id"]) for hit in dense_hits]
+        fused = reciprocal_rank_fusion(
+            [lexical_keys, dense_keys],
+            k=self.rrf_k,
+            weights=[self.lexical_weight, self.dense_weight]
+        )
+        ranked_keys = sorted(fused, key=lambda key: -fused[key])[:limit]
+
+        lexical_by_key = {key: (rank, hit) for rank, (key, hit) in enumerate(zip(lexical_keys, lexical_hits), start=1)}
+        dense_by_key = {key: (rank, hit) for rank, (key, hit) in enumerate(zip(dense_keys, dense_hits), start=1)}
+
+        # Dense-only hits need their text; lexical-only hits need their cosine score
+        lookup_ids = [
+            key[1] for key in ranked_keys
+            if key[0] == "section" and (key not in lexical_by_key or (query_vector is not None and key not in dense_by_key))
+        ]
+        stored = get_section_entries(lookup_ids, with_embeddings=query_vector is not None)
+
+        results = []
+        for key in ranked_keys:
+            lexical_entry = lexical_by_key.get(key)
+            dense_entry = dense_by_key.get(key)
+            if lexical_entry:
+                hit = lexical_entry[1]
+                source, document_id, page, title, content = hit["source"], hit["document_id"], hit["page"], hit["section_title"], hit["content"]
+            else:
+                entry = stored.get(key[1]) if key[0] == "section" else None
+                if not entry:
+                    continue
+                source, document_id, page, title, content = entry["kind"], entry["document_id"], entry["page"], entry["section_title"], entry["content"]
+
+            dense_score = dense_entry[1]["score"] if dense_entry else None
+            if dense_score is None and key[0] == "section" and stored.get(key[1], {}).get("embedding") is not None:
+                dense_score = float(stored[key[1]]["embedding"] @ query_vector)
+
+            results.append({
+                "key": key,
+                "source": source,
+                "document_id": document_id,
+                "page": page,
+                "section_title": title,
+                "content": content,
+                "score": fused[key],
+                "bm25_rank": lexical_entry[0] if lexical_entry else None,
+                "dense_rank": dense_entry[0] if dense_entry else None,
+                "dense_score": dense_score
+            })
+
+        total_ms = (time.perf_counter() - start_time) * 1000
+        print(f"🔎 Hybrid retrieval: {len(lexical_hits)} lexical + {len(dense_hits)} dense candidates "
+              f"-> {len(results)} (lexical {lexical_ms:.2f}ms, total {total_ms:.1f}ms)")
+        return results
+
+    def rank_documents(
+        self,
+        query: str,
+        limit: int = None,
+        exclude_document_id: int = None,
+        passages: int = 200
+    ) -> List[Tuple[int, float]]:
+        """
+        Documents ordered by their best fused passage score (page text included)
+
+        Dense k-NN always returns neighbours, however unrelated, so a passage only counts when
+        BM25 matched it or its cosine similarity is at least HYBRID_MIN_DENSE_SCORE; documents
+        without such a passage are left out
+        """
+        best: Dict[int, float] = {}
+        for hit in self.search(query, limit=passages, exclude_document_id=exclude_document_id, include_pages=True):
+            if hit["bm25_rank"] is None and (hit["dense_score"] is None or hit["dense_score"] < self.min_dense_score):
+                continue
+            best[hit["document_id"]] = max(best.get(hit["document_id"], 0.0), hit["score"])
+        ranked = sorted(best.items(), key=lambda item: -item[1])
+        return ranked[:limit] if limit else ranked
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "rrf_k": self.rrf_k,
+            "weights": {"lexical": self.lexical_weight, "dense": self.dense_weight},
+            "min_dense_score": self.min_dense_score,
+            "lexical": self.lexical.describe(),
+            "dense": self.dense.describe()
+        }
+
+
+# Global hybrid retriever over the ingested corpus
+hybrid_retriever = HybridRetriever(lexical_index, section_index)
@@ -0,0 +1,135 @@
+"""
+Inference Backend
+Builds the sentence-transformer and DistilGPT-2 models for the configured CPU backend
+- torch: fp32 PyTorch (the original path)
+- int8:  PyTorch with dynamic int8 quantization of the Linear layers (GPT-2's Conv1D
+         projections are converted to Linear first so the transformer blocks are quantized too)
+- onnx:  ONNX Runtime through sentence-transformers' ONNX backend / optimum's ORTModelForCausalLM;
+         GPT-2 exports are saved under data/onnx/ and reused on later starts
+INFERENCE_BACKEND selects the backend for both families; EMBEDDING_BACKEND and GPT2_BACKEND
+override it per family. A backend whose packages are missing falls back to torch.
+"""
+
+import os
+from typing import Any, Tuple
+
+from app.database.database import DB_DIR
+
+INFERENCE_BACKENDS = ("torch", "int8", "onnx")
+
+ONNX_DIR = DB_DIR / "onnx"
+
+
+def configured_backend(family: str) -> str:
+    """Backend for "embedding" or "gpt2" from EMBEDDING_BACKEND / GPT2_BACKEND, else INFERENCE_BACKEND"""
+    backend = os.getenv(f"{family.upper()}_BACKEND") or os.getenv("INFERENCE_BACKEND", "torch")
+    backend = backend.strip().lower()
+    if backend not in INFERENCE_BACKENDS:
+        print(f"⚠️ Unknown inference backend '{backend}' for {family}, using torch")
+        return "torch"
+    return backend
+
+
+def _quantize_dynamic(model: Any) -> Any:
+    """Dynamic int8 quantization of every nn.Linear (weights int8, activations quantized on the fly)"""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def _conv1d_to_linear(model: Any) -> Any:
+    """Replace GPT-2's transformers Conv1D layers (y = x @ W + b) with equivalent nn.Linear layers"""
+    import torch
+    from transformers.pytorch_utils import Conv1D
+
+    for module in list(model.modules()):
+        for child_name, child in list(module.named_children()):
+            if isinstance(child, Conv1D):
+                linear = torch.nn.Linear(child.weight.shape[0], child.weight.shape[1])
+                linear.weight.data = child.weight.data.t().contiguous()
+                linear.bias.data = child.bias.data
+                setattr(module, child_name, linear)
+    return model
+
+
+def load_sentence_transformer(model_name: str, backend: str) -> Tuple[Any, str]:
+    """
+    SentenceTransformer for model_name on the requested backend
+
+    Returns:
+        (model, backend actually used)
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "onnx":
+        try:
+            # Needs sentence-transformers>=3.2 with optimum[onnxruntime]
+            return SentenceTransformer(model_name, backend="onnx"), "onnx"
+        except Exception as e:
+            print(f"⚠️ ONNX backend unavailable for {model_name}, using torch: {e}")
+            return SentenceTransformer(model_name), "torch"
+
+    model = SentenceTransformer(model_name)
+    if backend == "int8":
+        try:
+            return _quantize_dynamic(model), "int8"
+        except Exception as e:
+            print(f"⚠️ int8 quantization failed for {model_name}, using torch: {e}")
+    return model, "torch"
+
+
+def _from_pretrained_local_first(loader: Any, model_name: str, **kwargs: Any) -> Tuple[Any, bool]:
+    """
+    loader.from_pretrained from the local cache (created during the Docker build), downloading
+    from the Hugging Face Hub when this artifact is not cached
+
+    Returns:
+        (loaded object, whether it came from the local cache)
+    """
+    try:
+        return loader.from_pretrained(model_name, local_files_only=True, **kwargs), True
+    except OSError:
+        # Not cached (the tokenizer may be while the weights are not): fall back to the Hub
+        return loader.from_pretrained(model_name, **kwargs), False
+
+
+def load_gpt2(model_name: str, backend: str) -> Tuple[Any, Any, str]:
+    """
+    (tokenizer, model) for a GPT-2 family model on the requested backend
+    Every model returned supports .generate() like GPT2LMHeadModel
+
+    Returns:
+        (tokenizer, model, backend actually used)
+    """
+    from transformers import GPT2Tokenizer, GPT2LMHeadModel
+
+    # Each artifact is loaded from the local cache first, downloaded only if it is missing
+    tokenizer, _ = _from_pretrained_local_first(GPT2Tokenizer, model_name)
+
+    # Add padding token
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    if backend == "onnx":
+        try:
+            from optimum.onnxruntime import ORTModelForCausalLM
+            export_dir = ONNX_DIR / model_name.replace("/", "_")
+            if (export_dir / "model.onnx").exists():
+                model = ORTModelForCausalLM.from_pretrained(export_dir)
+            else:
+                print(f"📦 Exporting {model_name} to ONNX ({export_dir})...")
+                model, _ = _from_pretrained_local_first(ORTModelForCausalLM, model_name, export=True)
+                model.save_pretrained(export_dir)
+            return tokenizer, model, "onnx"
+        except Exception as e:
+            print(f"⚠️ ONNX backend unavailable for {model_name}, using torch: {e}")
+            backend = "torch"
+
+    model, cached = _from_pretrained_local_first(GPT2LMHeadModel, model_name)
+    print("📁 Loaded models from local cache" if cached else "🌐 Downloaded models from Hugging Face Hub")
+    model.eval()
+    if backend == "int8":
+        try:
+            return tokenizer, _quantize_dynamic(_conv1d_to_linear(model)), "int8"
+        except Exception as e:
+            print(f"⚠️ int8 quantization failed for {model_name}, using torch: {e}")
+    return tokenizer, model, "torch"
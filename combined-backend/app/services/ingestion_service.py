@@ -0,0 +1,440 @@
+"""
+Document Ingestion Service
+Parses, sections and embeds each PDF once per file hash, at upload time
+Query-time features (text selection, relevant sections, insights bulb) read the stored artifacts
+instead of re-opening the PDF:
+- Page text       -> document_snippets (one row per page)
+- Part 1A outline -> document_ingestions.outline
+- Part 1B sections, page paragraphs and their embeddings -> document_sections
+  (also fed to the corpus vector index used by text selection)
+"""
+
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import numpy as np
+
+from app.database.database import SessionLocal, engine
+from app.database.models import PDFDocument, DocumentSnippet, DocumentIngestion, DocumentSection, create_ingestion_tables
+from app.services.model_registry import model_registry, DEFAULT_SENTENCE_MODEL
+from app.services.vector_index import section_index
+from app.services.lexical_index import lexical_index
+from app.services.outline_cache import outline_cache
+
+# Bump when page/outline/section extraction changes so stored artifacts are rebuilt
+INGESTION_PIPELINE_VERSION = "2"
+
+# Page text blocks shorter than this are not indexed as paragraphs
+MIN_PARAGRAPH_LENGTH = 100
+
+
+def join_page_texts(page_texts: Dict[int, str]) -> str:
+    """Whole-document text with page markers, from get_page_texts()"""
+    return "".join(f"\n--- Page {page_num} ---\n{text}" for page_num, text in page_texts.items())
+
+
+class DocumentIngestionService:
+    """Builds and serves the precomputed per-document artifacts"""
+
+    def __init__(self, embedding_model: str = None):
+        self.embedding_model = embedding_model or os.getenv("INGESTION_EMBEDDING_MODEL", DEFAULT_SENTENCE_MODEL)
+        self.encode_batch_size = int(os.getenv("PART1B_ENCODE_BATCH_SIZE", "64"))
+        self._lock = threading.Lock()
+        self._hash_locks: Dict[str, threading.Lock] = {}
+        self._section_processor = None
+        self._corpus_backfilled = False
+
+        # Ingestion tables are new; create them on existing databases
+        create_ingestion_tables(engine)
+
+    def _get_hash_lock(self, file_hash: str) -> threading.Lock:
+        """Serializes ingestion of the same file (upload task vs. lazy backfill)"""
+        with self._lock:
+            if file_hash not in self._hash_locks:
+                self._hash_locks[file_hash] = threading.Lock()
+            return self._hash_locks[file_hash]
+
+    def _get_section_processor(self):
+        """Part 1B section extractor, created once"""
+        if self._section_processor is None:
+            from app.part1b.document_processor import DocumentProcessor
+            self._section_processor = DocumentProcessor(load_header_model=False)
+        return self._section_processor
+
+    # Extraction
+
+    def _extract_pages(self, file_path: str) -> Tuple[List[str], List[Dict]]:
+        """Raw text of every page, in page order, and the page's paragraph-sized text blocks"""
+        page_texts = []
+        paragraphs = []
+        pdf_document = fitz.open(file_path)
+        try:
+            for page_num in range(len(pdf_document)):
+                page = pdf_document.load_page(page_num)
+                page_texts.append(page.get_text())
+                for block in page.get_text("blocks"):
+                    # (x0, y0, x1, y1, text, block_no, block_type); type 0 is text
+                    block_text = block[4].strip()
+                    if block[6] != 0 or len(block_text) < MIN_PARAGRAPH_LENGTH:
+                        continue
+                    first_line = block_text.split('\n')[0].strip()
+                    paragraphs.append({
+                        'page': page_num + 1,
+                        'section_title': first_line if len(first_line) <= 100 else "Related Content",
+                        'content': block_text
+                    })
+            return page_texts, paragraphs
+        finally:
+            pdf_document.close()
+
+    def _extract_outline(self, file_path: str, file_hash: str) -> Tuple[Dict[str, Any], str]:
+        """
+        Part 1A title and heading outline (shared with /part1a/extract through the outline cache)
+        and the cache status; "error" means extraction failed and nothing was cached
+        """
+        return outline_cache.extract_file(file_path, file_hash)
+
+    def _extract_sections(self, page_texts: List[str], file_path: str) -> List[Dict]:
+        """Part 1B sections, using the same header heuristics as DocumentProcessor.batch_process_pdfs"""
+        processor = self._get_section_processor()
+        sections = []
+        for page_num, raw_text in enumerate(page_texts):
+            if raw_text.strip():
+                cleaned_text = processor.clean_text(raw_text)
+                sections.extend(processor.extract_sections(cleaned_text, page_num + 1, file_path))
+        return sections
+
+    def _embed_sections(self, sections: List[Dict]) -> Optional[np.ndarray]:
+        """Normalized float32 embeddings of section/paragraph content (same text window as RelevanceAnalyzer)"""
+        if not sections:
+            return None
+        try:
+            model = model_registry.get_sentence_transformer(self.embedding_model)
+            embeddings = model.encode(
+                [section.get('content', '')[:512] for section in sections],
+                batch_size=self.encode_batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+            return np.asarray(embeddings, dtype=np.float32)
+        except Exception as e:
+            print(f"⚠️ Ingestion: embeddings unavailable, storing sections without vectors: {e}")
+            return None
+
+    # Ingestion
+
+    def _resolve_file_hash(self, document: PDFDocument) -> str:
+        if document.file_hash:
+            return document.file_hash
+        from app.services.pdf_service import PDFDocumentService
+        return PDFDocumentService.calculate_file_hash(document.file_path)
+
+    def ingest_document(self, document_id: int, force: bool = False) -> Dict[str, Any]:
+        """
+        Parse, section and embed a document unless its file hash was already ingested
+        with the current pipeline version
+
+        Args:
+            document_id: PDFDocument id
+            force: Rebuild the artifacts even if they are up to date
+
+        Returns:
+            Ingestion status summary
+        """
+        db = SessionLocal()
+        try:
+            document = db.query(PDFDocument).filter(PDFDocument.id == document_id).first()
+            if not document:
+                return {"document_id": document_id, "status": "not_found"}
+            file_hash = self._resolve_file_hash(document)
+            file_path = document.file_path
+            filename = document.original_filename
+        finally:
+            db.close()
+
+        with self._get_hash_lock(file_hash):
+            if not force:
+                existing = self.get_ingestion(file_hash=file_hash)
+                if existing and existing["status"] == "completed" and existing["pipeline_version"] == INGESTION_PIPELINE_VERSION:
+                    return existing
+
+            if not file_path or not os.path.exists(file_path):
+                print(f"⚠️ Ingestion: file not found for {filename}: {file_path}")
+                return self._record_failure(document_id, file_hash, "File not found on disk")
+
+            print(f"📥 Ingesting {filename}...")
+            start_time = time.time()
+            try:
+                page_texts, paragraphs = self._extract_pages(file_path)
+                structure, outline_status = self._extract_outline(file_path, file_hash)
+                if outline_status == "error":
+                    # Not stored as completed, so ensure_ingested tries again on the next use
+                    raise RuntimeError("Part 1A outline extraction failed")
+                sections = self._extract_sections(page_texts, file_path)
+                embeddings = self._embed_sections(sections + paragraphs)
+            except Exception as e:
+                print(f"❌ Ingestion failed for {filename}: {e}")
+                return self._record_failure(document_id, file_hash, str(e))
+
+            processing_time = time.time() - start_time
+            self._store_artifacts(
+                document_id, file_hash, page_texts, structure, sections, paragraphs, embeddings, processing_time
+            )
+            section_index.add_document(document_id)
+            print(f"✅ Ingested {filename}: {len(page_texts)} pages, {len(sections)} sections, "
+                  f"{len(paragraphs)} paragraphs in {processing_time:.2f}s")
+            return self.get_ingestion(file_hash=file_hash)
+
+    def _store_artifacts(
+        self,
+        document_id: int,
+        file_hash: str,
+        page_texts: List[str],
+        structure: Dict[str, Any],
+        sections: List[Dict],
+        paragraphs: List[Dict],
+        embeddings: Optional[np.ndarray],
+        processing_time: float
+    ) -> None:
+        """Replace the stored artifacts of a document in one transaction"""
+        db = SessionLocal()
+        try:
+            db.query(DocumentSnippet).filter(DocumentSnippet.document_id == document_id).delete()
+            db.query(DocumentSection).filter(DocumentSection.document_id == document_id).delete()
+
+            for page_index, page_text in enumerate(page_texts):
+                if page_text.strip():
+                    db.add(DocumentSnippet(
+                        document_id=document_id,
+                        page_number=page_index + 1,
+                        content=page_text,
+                        chunk_index=page_index
+                    ))
+
+            # Embedding rows follow the sections + paragraphs order used in _embed_sections
+            entries = [("section", section) for section in sections] + [("paragraph", paragraph) for paragraph in paragraphs]
+            for entry_index, (kind, entry) in enumerate(entries):
+                db.add(DocumentSection(
+                    document_id=document_id,
+                    kind=kind,
+                    page_number=entry.get('page'),
+                    section_index=entry_index,
+                    section_title=entry.get('section_title'),
+                    content=entry.get('content', ''),
+                    embedding=embeddings[entry_index].tobytes() if embeddings is not None else None
+                ))
+
+            ingestion = db.query(DocumentIngestion).filter(DocumentIngestion.file_hash == file_hash).first()
+            if not ingestion:
+                ingestion = DocumentIngestion(file_hash=file_hash, document_id=document_id)
+                db.add(ingestion)
+            ingestion.document_id = document_id
+            ingestion.status = "completed"
+            ingestion.pipeline_version = INGESTION_PIPELINE_VERSION
+            ingestion.title = structure.get("title", "")
+            ingestion.outline = json.dumps(structure.get("outline", []))
+            ingestion.page_count = len(page_texts)
+            ingestion.section_count = len(sections)
+            ingestion.embedding_model = self.embedding_model if embeddings is not None else None
+            ingestion.processing_time = round(processing_time, 3)
+            ingestion.error = None
+            ingestion.ingested_at = datetime.utcnow()
+
+            # Full-text rows commit together with the artifacts they index
+            lexical_index.index_document(db, document_id)
+
+            # Fill in document metadata the upload could not know
+            document = db.query(PDFDocument).filter(PDFDocument.id == document_id).first()
+            if document:
+                document.pages = len(page_texts)
+                if not document.content_preview:
+                    first_text = next((text for text in page_texts if text.strip()), "")
+                    document.content_preview = first_text.strip()[:500] or None
+
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def _record_failure(self, document_id: int, file_hash: str, error: str) -> Dict[str, Any]:
+        db = SessionLocal()
+        try:
+            ingestion = db.query(DocumentIngestion).filter(DocumentIngestion.file_hash == file_hash).first()
+            if not ingestion:
+                ingestion = DocumentIngestion(file_hash=file_hash, document_id=document_id)
+                db.add(ingestion)
+            ingestion.status = "failed"
+            ingestion.error = error
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Ingestion: could not record failure: {e}")
+        finally:
+            db.close()
+        return {"document_id": document_id, "file_hash": file_hash, "status": "failed", "error": error}
+
+    def ensure_ingested(self, document_id: int) -> bool:
+        """Ingest on first use for documents uploaded before the ingestion stage existed"""
+        ingestion = self.get_ingestion(document_id=document_id)
+        if ingestion and ingestion["status"] == "completed" and ingestion["pipeline_version"] == INGESTION_PIPELINE_VERSION:
+            return True
+        return self.ingest_document(document_id).get("status") == "completed"
+
+    def backfill_corpus(self) -> None:
+        """Ingest every active document that predates the ingestion stage (once per process)"""
+        if self._corpus_backfilled:
+            return
+        db = SessionLocal()
+        try:
+            document_ids = [row[0] for row in db.query(PDFDocument.id).filter(PDFDocument.is_active == True).all()]
+        finally:
+            db.close()
+        for document_id in document_ids:
+            self.ensure_ingested(document_id)
+        self._corpus_backfilled = True
+
+    # Query-time access
+
+    def get_ingestion(self, document_id: int = None, file_hash: str = None) -> Optional[Dict[str, Any]]:
+        """Ingestion record for a document id or file hash"""
+        db = SessionLocal()
+        try:
+            query = db.query(DocumentIngestion)
+            if file_hash:
+                query = query.filter(DocumentIngestion.file_hash == file_hash)
+            else:
+                query = query.filter(DocumentIngestion.document_id == document_id)
+            ingestion = query.first()
+            if not ingestion:
+                return None
+            return {
+                "document_id": ingestion.document_id,
+                "file_hash": ingestion.file_hash,
+                "status": ingestion.status,
+                "pipeline_version": ingestion.pipeline_version,
+                "page_count": ingestion.page_count,
+                "section_count": ingestion.section_count,
+                "embedding_model": ingestion.embedding_model,
+                "processing_time": ingestion.processing_time,
+                "error": ingestion.error,
+                "ingested_at": ingestion.ingested_at.isoformat() if ingestion.ingested_at else None
+            }
+        finally:
+            db.close()
+
+    def get_page_texts(self, document_id: int, ensure: bool = True) -> Dict[int, str]:
+        """Stored page text keyed by 1-based page number"""
+        if ensure:
+            self.ensure_ingested(document_id)
+        db = SessionLocal()
+        try:
+            snippets = (
+                db.query(DocumentSnippet)
+                .filter(DocumentSnippet.document_id == document_id)
+                .order_by(DocumentSnippet.page_number)
+                .all()
+            )
+            return {snippet.page_number: snippet.content for snippet in snippets}
+        finally:
+            db.close()
+
+    def get_full_text(self, document_id: int, ensure: bool = True) -> str:
+        """Whole-document text with page markers"""
+        return join_page_texts(self.get_page_texts(document_id, ensure=ensure))
+
+    def get_outline(self, document_id: int, ensure: bool = True) -> Dict[str, Any]:
+        """
+        Part 1A result: {"title": ..., "outline": [...]}
+        Served from the outline cache; re-extracted (and stored again) when the extractor
+        version changed since ingestion
+        """
+        if ensure:
+            self.ensure_ingested(document_id)
+        db = SessionLocal()
+        try:
+            ingestion = db.query(DocumentIngestion).filter(DocumentIngestion.document_id == document_id).first()
+            if not ingestion:
+                return {"title": "", "outline": []}
+
+            structure, _ = outline_cache.get(ingestion.file_hash)
+            if structure is not None:
+                return structure
+
+            document = db.query(PDFDocument).filter(PDFDocument.id == document_id).first()
+            if document and document.file_path and os.path.exists(document.file_path):
+                structure, status = outline_cache.extract_file(document.file_path, ingestion.file_hash)
+                # A failed extraction must not overwrite the stored outline
+                if status != "error":
+                    ingestion.title = structure.get("title", "")
+                    ingestion.outline = json.dumps(structure.get("outline", []))
+                    db.commit()
+                    return structure
+
+            if not ingestion.outline:
+                return {"title": "", "outline": []}
+            return {"title": ingestion.title or "", "outline": json.loads(ingestion.outline)}
+        finally:
+            db.close()
+
+    def get_sections(
+        self,
+        document_id: int,
+        with_embeddings: bool = False,
+        ensure: bool = True,
+        kind: str = "section"
+    ) -> List[Dict[str, Any]]:
+        """Stored Part 1B sections (or page paragraphs) in document order, optionally with their embedding vectors"""
+        if ensure:
+            self.ensure_ingested(document_id)
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(DocumentSection)
+                .filter(DocumentSection.document_id == document_id)
+                .filter(DocumentSection.kind == kind)
+                .order_by(DocumentSection.section_index)
+                .all()
+            )
+            sections = []
+            for row in rows:
+                section = {
+                    'document_id': row.document_id,
+                    'page': row.page_number,
+                    'section_title': row.section_title or "",
+                    'content': row.content
+                }
+                if with_embeddings:
+                    section['embedding'] = np.frombuffer(row.embedding, dtype=np.float32) if row.embedding else None
+                sections.append(section)
+            return sections
+        finally:
+            db.close()
+
+    def describe(self) -> Dict[str, Any]:
+        """Ingestion counts by status"""
+        db = SessionLocal()
+        try:
+            counts: Dict[str, int] = {}
+            for (status,) in db.query(DocumentIngestion.status).all():
+                counts[status] = counts.get(status, 0) + 1
+            return {
+                "pipeline_version": INGESTION_PIPELINE_VERSION,
+                "embedding_model": self.embedding_model,
+                "documents_by_status": counts,
+                "vector_index": section_index.describe(),
+                "outline_cache": outline_cache.describe()
+            }
+        finally:
+            db.close()
+
+
+# Global ingestion service instance
+ingestion_service = DocumentIngestionService()
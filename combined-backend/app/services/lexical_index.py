@@ -0,0 +1,191 @@
+"""
+Lexical Index
+SQLite FTS5 full-text index over the text stored at ingestion time (Part 1B sections,
+page paragraphs and whole pages) in pdf_collections.db, ranked with BM25
+Rows are written in the same transaction as the ingestion artifacts and filtered to active
+documents at query time, so soft deletes need no index maintenance
+"""
+
+import re
+import time
+from typing import Any, Dict, List, Optional, Sequence
+
+from sqlalchemy import text
+
+from app.database.database import engine, SessionLocal
+from app.database.models import create_ingestion_tables
+
+FTS_TABLE = "document_text_fts"
+
+# Cap on OR-ed query terms; long selections add little recall past this
+MAX_QUERY_TERMS = 32
+
+
+class LexicalIndex:
+    """BM25 search over document_sections and document_snippets"""
+
+    def __init__(self):
+        self.available = self._create_table()
+        self._stats = {"queries": 0, "total_query_ms": 0.0}
+
+    def _create_table(self) -> bool:
+        """Create the FTS5 table (and fill it from existing rows) if it does not exist"""
+        try:
+            create_ingestion_tables(engine)
+            with engine.begin() as connection:
+                exists = connection.execute(
+                    text("SELECT name FROM sqlite_master WHERE type = 'table' AND name = :name"),
+                    {"name": FTS_TABLE}
+                ).first()
+                if not exists:
+                    connection.execute(text(f"""
+                        CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                            section_title,
+                            content,
+                            source UNINDEXED,
+                            source_id UNINDEXED,
+                            document_id UNINDEXED,
+                            page_number UNINDEXED,
+                            tokenize = 'porter unicode61'
+                        )
+                    """))
+                    self._insert_rows(connection)
+                    print(f"✅ Created {FTS_TABLE} full-text index")
+            return True
+        except Exception as e:
+            print(f"⚠️ SQLite FTS5 unavailable, lexical search disabled: {e}")
+            return False
+
+    @staticmethod
+    def _insert_rows(connection, document_id: int = None) -> None:
+        """Copy section/paragraph and page text into the FTS table (all documents or one)"""
+        section_filter = "WHERE document_id = :document_id" if document_id is not None else ""
+        params = {"document_id": document_id} if document_id is not None else {}
+        connection.execute(text(f"""
+            INSERT INTO {FTS_TABLE} (section_title, content, source, source_id, document_id, page_number)
+            SELECT COALESCE(section_title, ''), content, COALESCE(kind, 'section'), id, document_id, page_number
+            FROM document_sections {section_filter}
+        """), params)
+        connection.execute(text(f"""
+            INSERT INTO {FTS_TABLE} (section_title, content, source, source_id, document_id, page_number)
+            SELECT '', content, 'page', id, document_id, page_number
+            FROM document_snippets {section_filter}
+        """), params)
+
+    def index_document(self, db, document_id: int) -> None:
+        """
+        Replace a document's rows; runs inside the caller's session so it commits
+        together with the ingestion artifacts
+        """
+        if not self.available:
+            return
+        db.flush()
+        connection = db.connection()
+        connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE document_id = :document_id"), {"document_id": document_id})
+        self._insert_rows(connection, document_id)
+
+    def remove_document(self, db, document_id: int) -> None:
+        """Drop a document's rows (permanent delete)"""
+        if not self.available:
+            return
+        db.connection().execute(text(f"DELETE FROM {FTS_TABLE} WHERE document_id = :document_id"), {"document_id": document_id})
+
+    @staticmethod
+    def build_match_expression(query: str) -> Optional[str]:
+        """Turn free text into an FTS5 OR-query of quoted terms (no user-controlled syntax)"""
+        terms = []
+        for term in re.findall(r"\w+", query.lower()):
+            if len(term) > 1 and term not in terms:
+                terms.append(term)
+            if len(terms) >= MAX_QUERY_TERMS:
+                break
+        if not terms:
+            return None
+        return " OR ".join(f'"{term}"' for term in terms)
+
+    def search(
+        self,
+        query: str,
+        limit: int = 50,
+        sources: Sequence[str] = None,
+        exclude_document_id: int = None,
+        active_only: bool = True
+    ) -> List[Dict[str, Any]]:
+        """
+        BM25-ranked matches, best first
+
+        Args:
+            query: Free text
+            limit: Maximum number of rows
+            sources: Restrict to "section", "paragraph" and/or "page" rows
+            exclude_document_id: Skip this document (e.g. the one the text was selected in)
+            active_only: Skip soft-deleted documents
+
+        Returns:
+            List of {"source", "source_id", "document_id", "page", "section_title", "content", "bm25"}
+            (lower bm25 is better, as in SQLite)
+        """
+        match_expression = self.build_match_expression(query) if self.available else None
+        if not match_expression:
+            return []
+
+        conditions = [f"{FTS_TABLE} MATCH :match"]
+        params: Dict[str, Any] = {"match": match_expression, "limit": limit}
+        if active_only:
+            conditions.append("d.is_active = 1")
+        if exclude_document_id is not None:
+            conditions.append("f.document_id != :exclude_document_id")
+            params["exclude_document_id"] = exclude_document_id
+        if sources:
+            placeholders = []
+            for i, source in enumerate(sources):
+                placeholders.append(f":source_{i}")
+                params[f"source_{i}"] = source
+            conditions.append(f"f.source IN ({', '.join(placeholders)})")
+
+        start_time = time.perf_counter()
+        db = SessionLocal()
+        try:
+            rows = db.execute(text(f"""
+                SELECT f.source, f.source_id, f.document_id, f.page_number, f.section_title, f.content,
+                       bm25({FTS_TABLE}, 2.0, 1.0) AS score
+                FROM {FTS_TABLE} AS f
+                JOIN pdf_documents AS d ON d.id = f.document_id
+                WHERE {' AND '.join(conditions)}
+                ORDER BY score
+                LIMIT :limit
+            """), params).fetchall()
+        except Exception as e:
+            print(f"⚠️ Lexical search failed: {e}")
+            return []
+        finally:
+            db.close()
+
+        self._stats["queries"] += 1
+        self._stats["total_query_ms"] += (time.perf_counter() - start_time) * 1000
+
+        return [
+            {
+                "source": row[0],
+                "source_id": int(row[1]),
+                "document_id": int(row[2]),
+                "page": row[3],
+                "section_title": row[4] or "",
+                "content": row[5],
+                "bm25": float(row[6])
+            }
+            for row in rows
+        ]
+
+    def describe(self) -> Dict[str, Any]:
+        queries = self._stats["queries"]
+        return {
+            "available": self.available,
+            "table": FTS_TABLE,
+            "queries": queries,
+            "avg_query_ms": round(self._stats["total_query_ms"] / queries, 3) if queries else None
+        }
+
+
+# Global lexical index instance
+lexical_index = LexicalIndex()
@@ -0,0 +1,282 @@
+"""
+LLM Dispatcher
+Concurrent, rate-limited fan-out for LLM prompts built on chat_with_llm.get_llm_response
+- Bounded concurrency (shared worker pool)
+- Token-bucket rate limiting per provider: routed calls take a token from the provider the
+  router actually sends them to (see llm_router); a custom llm_fn uses the dispatcher's own
+  bucket for the `provider` it is called with
+- Retry with jittered exponential backoff
+- Ordered result collection (results come back in submission order)
+- Calls go through the provider router (failover, circuit breaker, hedging) by default
+- Optional absolute deadline per call: no retry or backoff past it, and the caller gets
+  TimeoutError as soon as it passes (call_async cancels the provider request itself)
+- stream(): token streaming through the router, with the time to the first chunk (rate-limit
+  wait and failover included) kept as the time_to_first_token metric
+
+To exercise it against a local stub server, point the Ollama provider at the stub:
+LLM_PROVIDER=ollama OLLAMA_BASE_URL=http://127.0.0.1:<port> (stub must answer POST /api/generate)
+python -m app.llm.check_dispatcher checks concurrency, rate limiting, retries and result order
+against in-process stubs
+"""
+
+import asyncio
+import os
+import random
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FuturesTimeout
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Add project root to path to import chat_with_llm
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+try:
+    from chat_with_llm import get_llm_response
+except ImportError:
+    print("Warning: chat_with_llm module not found. LLM dispatcher will return empty results.")
+    get_llm_response = None
+
+from .llm_router import llm_router, LLMProviderRouter, NoProviderAvailable, TokenBucket
+from .deadline import remaining
+
+
+class LLMDispatcher:
+    """Bounded, rate-limited, retrying executor for LLM calls"""
+
+    def __init__(
+        self,
+        max_concurrency: int = None,
+        requests_per_second: float = None,
+        burst: int = None,
+        max_retries: int = None,
+        backoff_base: float = None,
+        backoff_max: float = None,
+        llm_fn: Callable[[List[Dict[str, str]]], Optional[str]] = None
+    ):
+        self.max_concurrency = max_concurrency or int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+        self.default_rps = requests_per_second or float(os.getenv("LLM_RATE_LIMIT_RPS", "2"))
+        self.default_burst = burst or int(os.getenv("LLM_RATE_LIMIT_BURST", "4"))
+        self.max_retries = max_retries if max_retries is not None else int(os.getenv("LLM_MAX_RETRIES", "2"))
+        self.backoff_base = backoff_base or float(os.getenv("LLM_BACKOFF_BASE_SECONDS", "0.5"))
+        self.backoff_max = backoff_max or float(os.getenv("LLM_BACKOFF_MAX_SECONDS", "8"))
+        self.llm_fn = llm_fn or (llm_router.complete if get_llm_response else None)
+
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="llm-dispatch")
+        self._buckets: Dict[str, TokenBucket] = {}
+        self._async_slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+        self._lock = threading.Lock()
+        self._stats = {
+            "submitted": 0,
+            "succeeded": 0,
+            "failed": 0,
+            "retries": 0,
+            "streams": 0,
+            "rate_limit_wait_seconds": 0.0
+        }
+        self._first_chunk_latencies: deque = deque(maxlen=1000)
+
+    def _current_provider(self) -> str:
+        return os.getenv("LLM_PROVIDER", "gemini").lower()
+
+    def _get_bucket(self, provider: str) -> TokenBucket:
+        """Per-provider bucket for custom llm_fn calls; LLM_RATE_LIMIT_<PROVIDER> overrides the default rate"""
+        with self._lock:
+            if provider not in self._buckets:
+                rate = float(os.getenv(f"LLM_RATE_LIMIT_{provider.upper()}", self.default_rps))
+                self._buckets[provider] = TokenBucket(rate, self.default_burst)
+            return self._buckets[provider]
+
+    def _record(self, key: str, amount: float = 1) -> None:
+        with self._lock:
+            self._stats[key] += amount
+
+    def _backoff_delay(self, attempt: int) -> float:
+        """Exponential backoff with jitter (between 50% and 150% of the nominal delay)"""
+        delay = min(self.backoff_max, self.backoff_base * (2 ** attempt))
+        return delay * random.uniform(0.5, 1.5)
+
+    def _retry_delay(self, attempt: int, deadline: Optional[float]) -> Optional[float]:
+        """Backoff before the next attempt, or None when there is no attempt (or time) left"""
+        if attempt >= self.max_retries:
+            return None
+        delay = self._backoff_delay(attempt)
+        left = remaining(deadline)
+        if left is not None and left <= delay:
+            return None
+        self._record("retries")
+        return delay
+
+    def _call_with_retry(self, messages: Any, llm_fn: Callable, provider: str, deadline: float = None) -> Optional[str]:
+        """Runs on a worker thread: rate limit, call, retry on empty response or error"""
+        routed = isinstance(getattr(llm_fn, "__self__", None), LLMProviderRouter)
+        # The router rate-limits each provider it calls; only a custom llm_fn needs a bucket here
+        bucket = None if routed else self._get_bucket(provider)
+        for attempt in range(self.max_retries + 1):
+            waited = bucket.acquire() if bucket else 0.0
+            if waited:
+                self._record("rate_limit_wait_seconds", waited)
+            try:
+                response = llm_fn(messages, deadline=deadline) if routed else llm_fn(messages)
+                if response:
+                    self._record("succeeded")
+                    return response
+                print(f"⚠️ LLM dispatcher: empty response from {provider} (attempt {attempt + 1})")
+            except NoProviderAvailable as e:
+                # Every circuit is open: retrying now would only add backoff delay
+                print(f"⚠️ LLM dispatcher: {e}")
+                break
+            except TimeoutError:
+                self._record("failed")
+                raise
+            except Exception as e:
+                print(f"⚠️ LLM dispatcher: {provider} call failed (attempt {attempt + 1}): {e}")
+
+            delay = self._retry_delay(attempt, deadline)
+            if delay is None:
+                break
+            time.sleep(delay)
+
+        self._record("failed")
+        return None
+
+    def _submit(self, messages: Any, llm_fn: Callable = None, provider: str = None, deadline: float = None):
+        llm_fn = llm_fn or self.llm_fn
+        if llm_fn is None:
+            raise RuntimeError("No LLM function available for dispatch")
+        self._record("submitted")
+        return self._executor.submit(
+            self._call_with_retry, messages, llm_fn, provider or self._current_provider(), deadline
+        )
+
+    def call_sync(self, messages: Any, llm_fn: Callable = None, provider: str = None,
+                  deadline: float = None) -> Optional[str]:
+        """
+        Blocking single call through the dispatcher
+
+        Raises:
+            TimeoutError: as soon as the absolute time.monotonic() deadline passes
+        """
+        future = self._submit(messages, llm_fn, provider, deadline)
+        try:
+            return future.result(timeout=remaining(deadline))
+        except FuturesTimeout:
+            raise TimeoutError("LLM request timed out")
+
+    def _slots(self) -> asyncio.Semaphore:
+        """Concurrency limit for call_async, created per event loop"""
+        loop = asyncio.get_running_loop()
+        if self._async_slots is None or self._async_slots[0] is not loop:
+            self._async_slots = (loop, asyncio.Semaphore(self.max_concurrency))
+        return self._async_slots[1]
+
+    async def call_async(self, messages: Any, provider: str = None, deadline: float = None) -> Optional[str]:
+        """
+        asyncio-native single call through the provider router: the router's rate-limit waits and
+        the backoff are asyncio sleeps, and the deadline (or cancelling the caller) cancels the
+        provider request; provider only names the bucket of a custom llm_fn
+
+        Raises:
+            TimeoutError: the absolute time.monotonic() deadline passed
+        """
+        if self.llm_fn is None:
+            raise RuntimeError("No LLM function available for dispatch")
+        if self.llm_fn != llm_router.complete:
+            # Custom sync LLM function: worker thread, but still bounded by the deadline
+            return await asyncio.wait_for(self.submit(messages, provider=provider), timeout=remaining(deadline))
+
+        provider = provider or self._current_provider()
+        self._record("submitted")
+        async with self._slots():
+            for attempt in range(self.max_retries + 1):
+                try:
+                    response = await asyncio.wait_for(llm_router.acomplete(messages, deadline), timeout=remaining(deadline))
+                    if response:
+                        self._record("succeeded")
+                        return response
+                    print(f"⚠️ LLM dispatcher: empty response from {provider} (attempt {attempt + 1})")
+                except NoProviderAvailable as e:
+                    print(f"⚠️ LLM dispatcher: {e}")
+                    break
+                except (TimeoutError, asyncio.TimeoutError):
+                    self._record("failed")
+                    raise TimeoutError("LLM request timed out")
+
+                delay = self._retry_delay(attempt, deadline)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+
+        self._record("failed")
+        return None
+
+    async def stream(self, messages: Any, provider: str = None, deadline: float = None) -> AsyncIterator[str]:
+        """
+        Streamed single call through the provider router: rate limited per provider by the
+        router, and the stream holds a concurrency slot until it ends. Not retried; the router
+        fails over until text starts
+
+        Raises:
+            NoProviderAvailable, TimeoutError, or the provider's error (see LLMProviderRouter.astream)
+        """
+        self._record("submitted")
+        self._record("streams")
+        start_time = time.perf_counter()
+        async with self._slots():
+            chunks = llm_router.astream(messages, deadline)
+            first = True
+            try:
+                async for chunk in chunks:
+                    if first:
+                        first = False
+                        with self._lock:
+                            self._first_chunk_latencies.append(time.perf_counter() - start_time)
+                    yield chunk
+            except (asyncio.CancelledError, GeneratorExit):
+                raise
+            except Exception:
+                self._record("failed")
+                raise
+            finally:
+                await chunks.aclose()
+        self._record("succeeded")
+
+    def map_sync(self, batch: List[Any], llm_fn: Callable = None, provider: str = None) -> List[Optional[str]]:
+        """Blocking fan-out: all prompts run concurrently, results are returned in input order"""
+        futures = [self._submit(messages, llm_fn, provider) for messages in batch]
+        return [future.result() for future in futures]
+
+    async def submit(self, messages: Any, llm_fn: Callable = None, provider: str = None) -> Optional[str]:
+        """Async single call; does not block the event loop"""
+        return await asyncio.wrap_future(self._submit(messages, llm_fn, provider))
+
+    async def map(self, batch: List[Any], llm_fn: Callable = None, provider: str = None) -> List[Optional[str]]:
+        """Async fan-out: wall-clock time is set by the slowest call, results keep input order"""
+        return await asyncio.gather(*(self.submit(messages, llm_fn, provider) for messages in batch))
+
+    def describe(self) -> Dict[str, Any]:
+        """Dispatcher configuration and counters"""
+        with self._lock:
+            stats = dict(self._stats)
+            buckets = {name: {"rate_per_second": b.rate, "burst": b.capacity} for name, b in self._buckets.items()}
+            first_chunk = np.asarray(self._first_chunk_latencies) if self._first_chunk_latencies else None
+        stats["rate_limit_wait_seconds"] = round(stats["rate_limit_wait_seconds"], 3)
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_retries": self.max_retries,
+            "providers": buckets,
+            "stats": stats,
+            # Streams only: seconds from stream() to the first chunk
+            "time_to_first_token": {
+                "samples": len(first_chunk),
+                "p50_seconds": round(float(np.percentile(first_chunk, 50)), 3),
+                "p95_seconds": round(float(np.percentile(first_chunk, 95)), 3)
+            } if first_chunk is not None else None
+        }
+
+
+# Global dispatcher instance
+llm_dispatcher = LLMDispatcher()
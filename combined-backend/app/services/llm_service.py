@@ -5,8 +5,9 @@ Integrates with existing insights system and supports multiple LLM providers
 
 import os
 import sys
+import asyncio
 import hashlib
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, AsyncIterator, Optional
 from datetime import datetime
 
 # Add project root to path to import chat_with_llm
@@ -18,8 +19,25 @@ except ImportError:
     print("Warning: chat_with_llm module not found. LLM functionality may be limited.")
     get_llm_response = None
 
-# Global cache for LLM responses to avoid repeated calls
-llm_insights_cache = {}  # {content_hash: response}
+# All LLM calls go through the shared dispatcher (bounded concurrency, rate limiting, retries)
+from .context_packer import context_packer
+from .deadline import call_deadline
+from .execution import execution_layer
+from .llm_dispatcher import llm_dispatcher
+from .response_cache import ResponseCache
+from .semantic_cache import semantic_llm_cache, document_fingerprint
+
+# Cross-document insight strings per content hash; fallback/timeout answers are negative entries
+llm_insights_cache = ResponseCache("llm_insights")
+
+# Token budget of the document context in the comprehensive (Insights Bulb) prompt
+COMPREHENSIVE_CONTEXT_TOKENS = int(os.getenv("COMPREHENSIVE_CONTEXT_TOKENS", "3500"))
+
+
+def related_insights_key(selected_text: str, related_sections: List[Dict[str, Any]]) -> str:
+    """llm_insights_cache key of generate_related_content_insights"""
+    cache_content = f"{selected_text}|{str(related_sections)}"
+    return hashlib.md5(cache_content.encode()).hexdigest()[:16]
 
 class UnifiedLLMService:
     """
@@ -86,7 +104,7 @@ class UnifiedLLMService:
             ]
             
             if get_llm_response:
-                response = get_llm_response(messages)
+                response = llm_dispatcher.call_sync(messages)
                 return self._parse_insights_response(response)
             else:
                 return self._fallback_insights(text_data)
@@ -108,13 +126,24 @@ class UnifiedLLMService:
         """
         try:
             # Generate cache key based on content
-            cache_content = f"{selected_text}|{str(related_sections)}"
-            cache_key = hashlib.md5(cache_content.encode()).hexdigest()[:16]
+            cache_key = related_insights_key(selected_text, related_sections)
             
             # Check if insights are already cached
-            if cache_key in llm_insights_cache:
-                print(f"💾 LLM Service: Using cached insights for key: {cache_key}")
-                return llm_insights_cache[cache_key]
+            cached, negative = llm_insights_cache.lookup(cache_key)
+            if negative is not None:
+                print(f"💾 LLM Service: Using cached {'fallback ' if negative else ''}insights for key: {cache_key}")
+                return cached
+            
+            # Near-duplicate selection over the same (unchanged) documents
+            referenced = related_sections[:3]
+            fingerprint = document_fingerprint(
+                [section.get('document_id') for section in referenced],
+                [section.get('content', section.get('text', '')) for section in referenced if section.get('document_id') is None]
+            )
+            cached, query_vector = semantic_llm_cache.lookup("related_insights", selected_text, fingerprint)
+            if cached is not None:
+                print(f"💾 LLM Service: Using semantically cached insights for key: {cache_key}")
+                return cached
             
             print(f"🧠 LLM Service: Generating insights for text of length {len(selected_text)}")
             print(f"🧠 LLM Service: Found {len(related_sections)} related sections")
@@ -167,57 +196,44 @@ class UnifiedLLMService:
             print(f"🧠 LLM Service: Sending enhanced cross-document request to {self.provider}")
             
             if get_llm_response:
-                # Cross-platform timeout handling using concurrent.futures
-                import concurrent.futures
-                import threading
-                
-                def run_with_timeout(func, args, timeout_seconds=45):  # Increased timeout for more complex analysis
-                    """Run function with timeout that works on Windows and Unix"""
-                    try:
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(func, *args)
-                            return future.result(timeout=timeout_seconds)
-                    except concurrent.futures.TimeoutError:
-                        raise TimeoutError("LLM request timed out")
-                
                 try:
-                    response = run_with_timeout(get_llm_response, (messages,), 45)
+                    # Longer timeout for the more complex analysis, never past the request's deadline
+                    response = llm_dispatcher.call_sync(messages, deadline=call_deadline(45))
                     
                     if response:
                         print(f"✅ LLM Service: Generated {len(response)} characters of cross-document insights")
                         # Cache the successful response
-                        llm_insights_cache[cache_key] = response
+                        llm_insights_cache.set(cache_key, response)
+                        semantic_llm_cache.store("related_insights", selected_text, fingerprint, response, query_vector)
                         print(f"💾 LLM Service: Cached insights for key: {cache_key}")
                         return response
                     else:
                         print("⚠️ LLM Service: Empty response received")
                         fallback_response = "Unable to generate insights at this time."
-                        llm_insights_cache[cache_key] = fallback_response
+                        llm_insights_cache.set(cache_key, fallback_response, negative=True)
                         return fallback_response
                         
                 except TimeoutError:
                     print("⏰ LLM Service: Request timed out")
                     timeout_response = "Insight generation timed out. Please try again with shorter text."
-                    llm_insights_cache[cache_key] = timeout_response
+                    llm_insights_cache.set(cache_key, timeout_response, negative=True)
                     return timeout_response
                 except Exception as llm_error:
                     print(f"❌ LLM Service: LLM call failed: {llm_error}")
                     fallback_response = self._fallback_related_insights(selected_text, related_sections)
-                    llm_insights_cache[cache_key] = fallback_response
+                    llm_insights_cache.set(cache_key, fallback_response, negative=True)
                     return fallback_response
             else:
                 print("⚠️ LLM Service: No LLM response function available")
                 fallback_response = self._fallback_related_insights(selected_text, related_sections)
-                llm_insights_cache[cache_key] = fallback_response
+                llm_insights_cache.set(cache_key, fallback_response, negative=True)
                 return fallback_response
                 
         except Exception as e:
             print(f"❌ LLM Service: Error generating related content insights: {e}")
             error_response = f"Insight analysis completed. Found {len(related_sections)} related sections for the selected text."
-            # Even cache error responses to avoid repeated failures
-            cache_content = f"{selected_text}|{str(related_sections)}"
-            cache_key = hashlib.md5(cache_content.encode()).hexdigest()[:16]
-            llm_insights_cache[cache_key] = error_response
+            # Cache error responses briefly to avoid hammering a failing provider
+            llm_insights_cache.set(related_insights_key(selected_text, related_sections), error_response, negative=True)
             return error_response
     
     def generate_comprehensive_insights(self, selected_text: str, all_documents: List[Dict[str, Any]], related_sections: List[Dict[str, Any]] = None) -> str:
@@ -234,109 +250,205 @@ class UnifiedLLMService:
             String containing comprehensive cross-document insights
         """
         try:
-            print(f"🧠 LLM Service: Generating comprehensive insights across {len(all_documents)} documents")
-            print(f"🧠 LLM Service: Selected text length: {len(selected_text)}")
-            
-            # Build comprehensive document context
-            documents_context = ""
-            if all_documents:
-                documents_context = "\n\nALL UPLOADED DOCUMENTS FOR ANALYSIS:\n"
-                for i, doc in enumerate(all_documents[:10], 1):  # Limit to top 10 to avoid token limits
-                    content = doc.get('content', '')[:1500]  # Limit content per document
-                    doc_name = doc.get('document_name', f'Document {i}')
-                    documents_context += f"\n--- Document {i}: {doc_name} ---\n{content}\n"
-            
-            # Adobe Hackathon specific prompt for comprehensive analysis
-            prompt = f"""
-            ADOBE HACKATHON - COMPREHENSIVE CROSS-DOCUMENT INSIGHTS ANALYSIS
-            
-            Analyze the selected text against ALL uploaded documents to provide specific, actionable insights.
-            
-            SELECTED TEXT TO ANALYZE:
-            "{selected_text}"
-            {documents_context}
-            
-            Please provide insights in EXACTLY this format with clear headers:
-            
-            KEY TAKEAWAYS:
-            - [Specific takeaway from cross-document analysis]
-            - [Main concept connecting multiple documents]
-            - [Actionable insight grounded in the document collection]
-            
-            DID YOU KNOW:
-            - [Surprising connection between selected text and other documents]
-            - [Interesting pattern discovered across documents]
-            - [Unique fact that emerges from cross-referencing]
-            
-            CONTRADICTIONS / COUNTERPOINTS:
-            - [Specific conflicting viewpoint found in another document]
-            - [Alternative approach mentioned in different source]
-            - [Opposing evidence or methodology from the collection]
-            
-            EXAMPLES:
-            - [Specific example from another document that supports the selected text]
-            - [Real-world case study mentioned in the collection]
-            - [Practical application found in different documents]
-            
-            CROSS-DOCUMENT INSPIRATIONS:
-            - [Creative connection between ideas from different sources]
-            - [Novel insight that emerges from combining multiple documents]
-            - [Innovative application discovered through cross-analysis]
-            
-            REQUIREMENTS:
-            1. Be specific about which documents provide evidence
-            2. Focus on contradictions, connections, and inspirations
-            3. Ground ALL insights in the actual uploaded documents
-            4. Use bullet points for each section
-            5. Provide actionable, specific insights - not generic statements
-            
-            If you find conflicts between documents, highlight them clearly in the CONTRADICTIONS section.
-            If you find inspiring connections, detail them in the INSPIRATIONS section.
-            """
-            
-            messages = [
-                {"role": "system", "content": "You are an expert document analyst for the Adobe Hackathon specializing in comprehensive cross-document insights. Your goal is to find contradictory findings, inspirations, examples, and connections across ALL uploaded documents. Never use generic web knowledge - only analyze the provided documents."},
-                {"role": "user", "content": prompt}
-            ]
-            
-            print(f"🧠 LLM Service: Sending comprehensive cross-document analysis request to {self.provider}")
-            
-            if get_llm_response:
-                import concurrent.futures
-                
-                def run_with_timeout(func, args, timeout_seconds=60):  # Longer timeout for comprehensive analysis
-                    """Run function with timeout that works on Windows and Unix"""
-                    try:
-                        with concurrent.futures.ThreadPoolExecutor() as executor:
-                            future = executor.submit(func, *args)
-                            return future.result(timeout=timeout_seconds)
-                    except concurrent.futures.TimeoutError:
-                        raise TimeoutError("Comprehensive LLM analysis timed out")
-                
-                try:
-                    response = run_with_timeout(get_llm_response, (messages,), 60)
-                    
-                    if response:
-                        print(f"✅ LLM Service: Generated {len(response)} characters of comprehensive cross-document insights")
-                        return response
-                    else:
-                        print("⚠️ LLM Service: Empty response from LLM")
-                        return self._fallback_comprehensive_insights(selected_text, all_documents)
-                        
-                except TimeoutError:
-                    print("⏰ LLM Service: Comprehensive analysis timed out")
-                    return f"Comprehensive cross-document analysis initiated across {len(all_documents)} documents. Analysis taking longer than expected - please try again."
-                except Exception as llm_error:
-                    print(f"❌ LLM Service: Comprehensive LLM call failed: {llm_error}")
-                    return self._fallback_comprehensive_insights(selected_text, all_documents)
-            else:
-                print("⚠️ LLM Service: No LLM response function available")
-                return self._fallback_comprehensive_insights(selected_text, all_documents)
-                
+            prepared = self._prepare_comprehensive_insights(selected_text, all_documents)
+            if isinstance(prepared, str):
+                return prepared
+            messages, fingerprint, query_vector = prepared
+            try:
+                # Longer timeout for comprehensive analysis, never past the request's deadline
+                response = llm_dispatcher.call_sync(messages, deadline=call_deadline(60))
+            except Exception as llm_error:
+                return self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, error=llm_error)
+            return self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, response)
+
         except Exception as e:
             print(f"❌ LLM Service: Error generating comprehensive insights: {e}")
             return f"Comprehensive cross-document analysis attempted across {len(all_documents)} documents. Analysis encountered an error - please try again."
-    
+
+    async def agenerate_comprehensive_insights(self, selected_text: str, all_documents: List[Dict[str, Any]], related_sections: List[Dict[str, Any]] = None) -> str:
+        """
+        asyncio-native generate_comprehensive_insights: the LLM call is awaited on the event loop,
+        so cancelling the caller or reaching the deadline cancels the provider request itself
+        """
+        try:
+            # Fingerprint + embedding lookup are blocking: keep them off the event loop
+            prepared = await execution_layer.run_io(self._prepare_comprehensive_insights, selected_text, all_documents)
+            if isinstance(prepared, str):
+                return prepared
+            messages, fingerprint, query_vector = prepared
+            try:
+                response = await llm_dispatcher.call_async(messages, deadline=call_deadline(60))
+            except Exception as llm_error:
+                return self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, error=llm_error)
+            return self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, response)
+
+        except Exception as e:
+            print(f"❌ LLM Service: Error generating comprehensive insights: {e}")
+            return f"Comprehensive cross-document analysis attempted across {len(all_documents)} documents. Analysis encountered an error - please try again."
+
+    async def astream_comprehensive_insights(self, selected_text: str, all_documents: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """
+        Streamed agenerate_comprehensive_insights: text chunks as the provider produces them
+        Cached and fallback answers arrive as a single chunk. A failure before any text yields the
+        usual fallback answer; a failure after some text ends the stream with the error
+        """
+        prepared = await execution_layer.run_io(self._prepare_comprehensive_insights, selected_text, all_documents)
+        if isinstance(prepared, str):
+            yield prepared
+            return
+        messages, fingerprint, query_vector = prepared
+        
+        parts = []
+        chunks = llm_dispatcher.stream(messages, deadline=call_deadline(60))
+        try:
+            async for chunk in chunks:
+                parts.append(chunk)
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as llm_error:
+            if parts:
+                raise
+            yield self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, error=llm_error)
+            return
+        finally:
+            await chunks.aclose()
+        # Complete answer: cached like a non-streamed one
+        self._comprehensive_insights_result(selected_text, all_documents, fingerprint, query_vector, "".join(parts))
+
+    def _prepare_comprehensive_insights(self, selected_text: str, all_documents: List[Dict[str, Any]]):
+        """
+        Semantic cache lookup and prompt for comprehensive insights
+
+        Returns:
+            The final answer (cached, or fallback when no LLM is available), or
+            (messages, document fingerprint, query vector) for the LLM call
+        """
+        print(f"🧠 LLM Service: Generating comprehensive insights across {len(all_documents)} documents")
+        print(f"🧠 LLM Service: Selected text length: {len(selected_text)}")
+
+        # Near-duplicate selection over the same (unchanged) document collection
+        fingerprint = document_fingerprint(doc.get('document_id') for doc in all_documents)
+        cached, query_vector = semantic_llm_cache.lookup("comprehensive_insights", selected_text, fingerprint)
+        if cached is not None:
+            print(f"💾 LLM Service: Using semantically cached comprehensive insights")
+            return cached
+
+        if not get_llm_response:
+            print("⚠️ LLM Service: No LLM response function available")
+            return self._fallback_comprehensive_insights(selected_text, all_documents)
+
+        # Build comprehensive document context
+        documents_context = ""
+        if all_documents:
+            documents_context = "\n\nALL UPLOADED DOCUMENTS FOR ANALYSIS:\n" + self._pack_documents_context(
+                selected_text, all_documents,
+                query_vector if semantic_llm_cache.model_name == context_packer.model_name else None
+            )
+        
+        # Adobe Hackathon specific prompt for comprehensive analysis
+        prompt = f"""
+        ADOBE HACKATHON - COMPREHENSIVE CROSS-DOCUMENT INSIGHTS ANALYSIS
+        
+        Analyze the selected text against ALL uploaded documents to provide specific, actionable insights.
+        
+        SELECTED TEXT TO ANALYZE:
+        "{selected_text}"
+        {documents_context}
+        
+        Please provide insights in EXACTLY this format with clear headers:
+        
+        KEY TAKEAWAYS:
+        - [Specific takeaway from cross-document analysis]
+        - [Main concept connecting multiple documents]
+        - [Actionable insight grounded in the document collection]
+        
+        DID YOU KNOW:
+        - [Surprising connection between selected text and other documents]
+        - [Interesting pattern discovered across documents]
+        - [Unique fact that emerges from cross-referencing]
+        
+        CONTRADICTIONS / COUNTERPOINTS:
+        - [Specific conflicting viewpoint found in another document]
+        - [Alternative approach mentioned in different source]
+        - [Opposing evidence or methodology from the collection]
+        
+        EXAMPLES:
+        - [Specific example from another document that supports the selected text]
+        - [Real-world case study mentioned in the collection]
+        - [Practical application found in different documents]
+        
+        CROSS-DOCUMENT INSPIRATIONS:
+        - [Creative connection between ideas from different sources]
+        - [Novel insight that emerges from combining multiple documents]
+        - [Innovative application discovered through cross-analysis]
+        
+        REQUIREMENTS:
+        1. Be specific about which documents provide evidence
+        2. Focus on contradictions, connections, and inspirations
+        3. Ground ALL insights in the actual uploaded documents
+        4. Use bullet points for each section
+        5. Provide actionable, specific insights - not generic statements
+        
+        If you find conflicts between documents, highlight them clearly in the CONTRADICTIONS section.
+        If you find inspiring connections, detail them in the INSPIRATIONS section.
+        """
+        
+        messages = [
+            {"role": "system", "content": "You are an expert document analyst for the Adobe Hackathon specializing in comprehensive cross-document insights. Your goal is to find contradictory findings, inspirations, examples, and connections across ALL uploaded documents. Never use generic web knowledge - only analyze the provided documents."},
+            {"role": "user", "content": prompt}
+        ]
+        
+        print(f"🧠 LLM Service: Sending comprehensive cross-document analysis request to {self.provider}")
+        return messages, fingerprint, query_vector
+
+    def _pack_documents_context(self, selected_text: str, all_documents: List[Dict[str, Any]], query_vector=None) -> str:
+        """
+        The passages of all documents most relevant to the selected text, within
+        COMPREHENSIVE_CONTEXT_TOKENS; documents are listed by their best passage
+        """
+        candidates = []
+        for i, doc in enumerate(all_documents, 1):
+            pages = doc.get('pages') or {None: doc.get('content', '')}
+            candidates.extend({"source": i, "page": page, "text": text} for page, text in pages.items())
+        packed = context_packer.pack(
+            selected_text, candidates, COMPREHENSIVE_CONTEXT_TOKENS, query_vector=query_vector,
+            # No single document takes more than half of the budget
+            max_chunks_per_source=max(2, COMPREHENSIVE_CONTEXT_TOKENS // context_packer.chunk_tokens // 2)
+        )
+        print(f"📦 LLM Service: Packed {len(packed['chunks'])} of {packed['candidates']} chunks from "
+              f"{len(all_documents)} documents ({packed['tokens_used']}/{packed['budget_tokens']} tokens)")
+
+        by_document: Dict[int, List[Dict[str, Any]]] = {}
+        for chunk in packed["chunks"]:
+            by_document.setdefault(chunk["source"], []).append(chunk)
+        documents_context = ""
+        for i, chunks in by_document.items():
+            doc_name = all_documents[i - 1].get('document_name', f'Document {i}')
+            passages = "\n".join(
+                f"[Page {chunk['page']}] {chunk['text']}" if chunk['page'] is not None else chunk['text']
+                for chunk in sorted(chunks, key=lambda chunk: chunk['page'] or 0)
+            )
+            documents_context += f"\n--- Document {i}: {doc_name} ---\n{passages}\n"
+        return documents_context
+
+    def _comprehensive_insights_result(self, selected_text: str, all_documents: List[Dict[str, Any]], fingerprint: str,
+                                       query_vector, response: Optional[str] = None, error: Exception = None) -> str:
+        """Answer for a finished comprehensive LLM call: cache real answers, fall back otherwise"""
+        if isinstance(error, TimeoutError):
+            print("⏰ LLM Service: Comprehensive analysis timed out")
+            return f"Comprehensive cross-document analysis initiated across {len(all_documents)} documents. Analysis taking longer than expected - please try again."
+        if error is not None:
+            print(f"❌ LLM Service: Comprehensive LLM call failed: {error}")
+            return self._fallback_comprehensive_insights(selected_text, all_documents)
+        if not response:
+            print("⚠️ LLM Service: Empty response from LLM")
+            return self._fallback_comprehensive_insights(selected_text, all_documents)
+
+        print(f"✅ LLM Service: Generated {len(response)} characters of comprehensive cross-document insights")
+        semantic_llm_cache.store("comprehensive_insights", selected_text, fingerprint, response, query_vector)
+        return response
+
     def _fallback_comprehensive_insights(self, selected_text: str, all_documents: List[Dict[str, Any]]) -> str:
         """Fallback for comprehensive insights when LLM is unavailable"""
         doc_names = [doc.get('document_name', 'Unknown') for doc in all_documents]
@@ -380,7 +492,45 @@ class UnifiedLLMService:
             Podcast script with speaker labels
         """
         try:
-            prompt = f"""
+            messages = self._podcast_script_messages(content, speakers)
+            
+            if get_llm_response:
+                response = llm_dispatcher.call_sync(messages)
+                return response if response else "Unable to generate podcast script."
+            else:
+                return self._fallback_podcast_script(content)
+                
+        except Exception as e:
+            print(f"Error generating podcast script: {e}")
+            return f"Error generating script: {str(e)}"
+    
+    async def astream_podcast_script(self, content: str, speakers: int = 2) -> AsyncIterator[str]:
+        """
+        Streamed generate_podcast_script: script text as the provider produces it
+        A failure before any text yields the fallback script; after some text it ends the stream
+        """
+        if not get_llm_response:
+            yield self._fallback_podcast_script(content)
+            return
+        
+        started = False
+        chunks = llm_dispatcher.stream(self._podcast_script_messages(content, speakers), deadline=call_deadline(60))
+        try:
+            async for chunk in chunks:
+                started = True
+                yield chunk
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            if started:
+                raise
+            print(f"Error streaming podcast script: {e}")
+            yield self._fallback_podcast_script(content)
+        finally:
+            await chunks.aclose()
+    
+    def _podcast_script_messages(self, content: str, speakers: int) -> List[Dict[str, str]]:
+        prompt = f"""
             Create an engaging podcast script based on the following content. 
             Use {speakers} speakers having a natural conversation about the key points.
             Format as:
@@ -393,21 +543,11 @@ class UnifiedLLMService:
             Content:
             {content[:3000]}...
             """
-            
-            messages = [
-                {"role": "system", "content": "You are an expert podcast script writer. Create engaging, natural conversations between speakers."},
-                {"role": "user", "content": prompt}
-            ]
-            
-            if get_llm_response:
-                response = get_llm_response(messages)
-                return response if response else "Unable to generate podcast script."
-            else:
-                return self._fallback_podcast_script(content)
-                
-        except Exception as e:
-            print(f"Error generating podcast script: {e}")
-            return f"Error generating script: {str(e)}"
+        
+        return [
+            {"role": "system", "content": "You are an expert podcast script writer. Create engaging, natural conversations between speakers."},
+            {"role": "user", "content": prompt}
+        ]
     
     def _build_insights_prompt(self, text_data: List[Dict[str, Any]], context: Optional[str] = None) -> str:
         """Build prompt for insight generation"""
@@ -0,0 +1,152 @@
+"""
+Model Registry
+Process-wide store for heavy ML models (sentence transformers, DistilGPT-2, LLM clients)
+Each model is loaded lazily on first use and shared by every request afterwards
+Sentence transformers and DistilGPT-2 are built for the configured inference backend
+(see inference_backend.py)
+"""
+
+import os
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Tuple
+
+# Reduce warnings
+os.environ['HF_HUB_DISABLE_SYMLINKS_WARNING'] = '1'
+
+DEFAULT_SENTENCE_MODEL = 'all-MiniLM-L6-v2'
+DEFAULT_GPT2_MODEL = 'distilgpt2'
+
+
+class ModelRegistry:
+    """
+    Thread-safe, lazily initialized model registry
+    Guarantees that each model key is loaded at most once per process, even under concurrent requests
+    """
+
+    def __init__(self):
+        self._models: Dict[str, Any] = {}
+        self._stats: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._backends: Dict[str, str] = {}  # key -> inference backend actually loaded
+
+    def _get_key_lock(self, key: str) -> threading.Lock:
+        """Get the lock that serializes loading of a single model key"""
+        with self._lock:
+            if key not in self._key_locks:
+                self._key_locks[key] = threading.Lock()
+            return self._key_locks[key]
+
+    def get(self, key: str, loader: Callable[[], Any]) -> Any:
+        """
+        Return the model stored under `key`, loading it with `loader` on first use
+
+        Args:
+            key: Unique model identifier (e.g. "sentence_transformer:all-MiniLM-L6-v2")
+            loader: Zero-argument callable that builds the model
+
+        Returns:
+            The shared model instance
+        """
+        # Fast path: model already loaded
+        with self._lock:
+            if key in self._models:
+                self._stats[key]['hits'] += 1
+                return self._models[key]
+
+        # Slow path: only one thread loads a given key, the others wait for it
+        with self._get_key_lock(key):
+            with self._lock:
+                if key in self._models:
+                    self._stats[key]['hits'] += 1
+                    return self._models[key]
+
+            print(f"📦 Model registry: loading {key}...")
+            start_time = time.time()
+            model = loader()
+            load_time = time.time() - start_time
+
+            with self._lock:
+                self._models[key] = model
+                self._stats[key] = {
+                    "loaded_at": datetime.now().isoformat(),
+                    "load_time_seconds": round(load_time, 3),
+                    "hits": 0,
+                    "type": type(model).__name__
+                }
+            print(f"✅ Model registry: {key} loaded in {load_time:.2f}s")
+            return model
+
+    def get_sentence_transformer(self, model_name: str = DEFAULT_SENTENCE_MODEL, backend: str = None):
+        """
+        Get the shared SentenceTransformer for `model_name`
+        backend: "torch", "int8" or "onnx" (default: EMBEDDING_BACKEND / INFERENCE_BACKEND)
+        """
+        from app.services.inference_backend import configured_backend, load_sentence_transformer
+        backend = backend or configured_backend("embedding")
+
+        def load():
+            from app.services.embedding_cache import CachedSentenceEncoder, embedding_cache
+            model, used = load_sentence_transformer(model_name, backend)
+            self._backends[key] = used
+            if embedding_cache.enabled:
+                # Cache entries are keyed on the backend that actually produced the vectors
+                model_id = self._backend_key(f"sentence_transformer:{model_name}", used)
+                model = CachedSentenceEncoder(model, model_id, embedding_cache)
+            return model
+
+        key = self._backend_key(f"sentence_transformer:{model_name}", backend)
+        return self.get(key, load)
+
+    def get_gpt2(self, model_name: str = DEFAULT_GPT2_MODEL, backend: str = None) -> Tuple[Any, Any]:
+        """
+        Get the shared (tokenizer, model) pair for a GPT-2 family model
+        backend: "torch", "int8" or "onnx" (default: GPT2_BACKEND / INFERENCE_BACKEND)
+        """
+        from app.services.inference_backend import configured_backend, load_gpt2
+        backend = backend or configured_backend("gpt2")
+
+        def load():
+            tokenizer, model, used = load_gpt2(model_name, backend)
+            self._backends[key] = used
+            return tokenizer, model
+
+        key = self._backend_key(f"gpt2:{model_name}", backend)
+        return self.get(key, load)
+
+    @staticmethod
+    def _backend_key(key: str, backend: str) -> str:
+        # fp32 torch keeps the original key
+        return key if backend == "torch" else f"{key}@{backend}"
+
+    def is_loaded(self, key: str) -> bool:
+        """Check whether a model key has already been loaded"""
+        with self._lock:
+            return key in self._models
+
+    def unload(self, key: str) -> bool:
+        """Drop a model from the registry so the next request reloads it"""
+        with self._lock:
+            if key not in self._models:
+                return False
+            del self._models[key]
+            del self._stats[key]
+            self._backends.pop(key, None)
+            return True
+
+    def describe(self) -> Dict[str, Any]:
+        """Report loaded models and their load statistics"""
+        with self._lock:
+            return {
+                "loaded_models": len(self._models),
+                "models": {
+                    key: {**stats, "backend": self._backends.get(key, "torch")}
+                    for key, stats in self._stats.items()
+                }
+            }
+
+
+# Global registry instance
+model_registry = ModelRegistry()
@@ -0,0 +1,209 @@
+"""
+Outline Cache
+Content-addressed cache of Part 1A results (title + outline), keyed on the PDF's SHA-256
+and the extractor version
+- In-memory LRU in front of the outline_cache table in pdf_collections.db
+- The extractor version combines EXTRACTOR_VERSION with a hash of the extractor source, so
+  editing the heuristics invalidates every cached outline without a manual bump
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from app.database.database import SessionLocal, engine
+from app.database.models import OutlineCacheEntry
+
+
+def compute_extractor_version() -> str:
+    """EXTRACTOR_VERSION plus a fingerprint of pdf_structure_extractor.py"""
+    from app.part1a import pdf_structure_extractor
+    with open(pdf_structure_extractor.__file__, "rb") as f:
+        source_hash = hashlib.sha256(f.read()).hexdigest()[:12]
+    return f"{pdf_structure_extractor.EXTRACTOR_VERSION}-{source_hash}"
+
+
+def hash_bytes(content: bytes) -> str:
+    """SHA-256 of in-memory PDF bytes (same digest as PDFDocumentService.calculate_file_hash)"""
+    return hashlib.sha256(content).hexdigest()
+
+
+class OutlineCache:
+    """Thread-safe two-tier (memory, SQLite) cache of Part 1A outlines"""
+
+    def __init__(self, max_entries: int = None):
+        self.max_entries = max_entries or int(os.getenv("OUTLINE_CACHE_MEMORY_ENTRIES", "256"))
+        self.extractor_version = compute_extractor_version()
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "extraction_seconds": 0.0}
+        self._disk_available = self._create_table()
+
+    def _create_table(self) -> bool:
+        """Create the cache table and drop entries written by other extractor versions"""
+        try:
+            OutlineCacheEntry.__table__.create(bind=engine, checkfirst=True)
+            db = SessionLocal()
+            try:
+                stale = (
+                    db.query(OutlineCacheEntry)
+                    .filter(OutlineCacheEntry.extractor_version != self.extractor_version)
+                    .delete(synchronize_session=False)
+                )
+                db.commit()
+                if stale:
+                    print(f"🧹 Outline cache: dropped {stale} entries from older extractor versions")
+            finally:
+                db.close()
+            return True
+        except Exception as e:
+            print(f"⚠️ Outline cache: SQLite tier unavailable, using memory only: {e}")
+            return False
+
+    # Memory tier
+
+    def _remember(self, file_hash: str, result: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[file_hash] = result
+            self._memory.move_to_end(file_hash)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    # Lookup / store
+
+    def get(self, file_hash: str) -> Tuple[Optional[Dict[str, Any]], str]:
+        """
+        Cached result for a file hash
+
+        Returns:
+            (result or None, "memory" | "disk" | "miss")
+        """
+        with self._lock:
+            result = self._memory.get(file_hash)
+            if result is not None:
+                self._memory.move_to_end(file_hash)
+                self._stats["memory_hits"] += 1
+                return _copy(result), "memory"
+
+        if self._disk_available:
+            db = SessionLocal()
+            try:
+                entry = (
+                    db.query(OutlineCacheEntry)
+                    .filter(OutlineCacheEntry.file_hash == file_hash)
+                    .filter(OutlineCacheEntry.extractor_version == self.extractor_version)
+                    .first()
+                )
+                if entry:
+                    result = {"title": entry.title or "", "outline": json.loads(entry.outline)}
+                    self._remember(file_hash, result)
+                    with self._lock:
+                        self._stats["disk_hits"] += 1
+                    return _copy(result), "disk"
+            except Exception as e:
+                print(f"⚠️ Outline cache lookup failed: {e}")
+            finally:
+                db.close()
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None, "miss"
+
+    def put(self, file_hash: str, result: Dict[str, Any], extraction_time: float = None) -> None:
+        """Store a result in both tiers"""
+        result = {"title": result.get("title", ""), "outline": result.get("outline", [])}
+        self._remember(file_hash, result)
+        if not self._disk_available:
+            return
+        db = SessionLocal()
+        try:
+            entry = (
+                db.query(OutlineCacheEntry)
+                .filter(OutlineCacheEntry.file_hash == file_hash)
+                .filter(OutlineCacheEntry.extractor_version == self.extractor_version)
+                .first()
+            )
+            if not entry:
+                entry = OutlineCacheEntry(file_hash=file_hash, extractor_version=self.extractor_version)
+                db.add(entry)
+            entry.title = result["title"]
+            entry.outline = json.dumps(result["outline"])
+            entry.extraction_time = extraction_time
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Outline cache store failed: {e}")
+        finally:
+            db.close()
+
+    def get_or_extract(
+        self,
+        file_hash: str,
+        extract: Callable[[], Dict[str, Any]]
+    ) -> Tuple[Dict[str, Any], str]:
+        """
+        Cached result, or run extract() and cache what it returns
+
+        Args:
+            extract: Returns the result, or raises when the PDF could not be processed; a
+                failure is not cached (it may be transient), the next call extracts again
+
+        Returns:
+            (result, "memory" | "disk" | "miss" | "error"); an empty outline on "error"
+        """
+        result, source = self.get(file_hash)
+        if result is not None:
+            return result, source
+
+        start_time = time.time()
+        try:
+            result = extract()
+        except Exception as e:
+            print(f"⚠️ Outline extraction failed for {file_hash[:12]}, not cached: {e}")
+            return {"title": "", "outline": []}, "error"
+        extraction_time = time.time() - start_time
+        with self._lock:
+            self._stats["extraction_seconds"] += extraction_time
+        self.put(file_hash, result, extraction_time)
+        return result, "miss"
+
+    def extract_file(self, file_path: str, file_hash: str = None) -> Tuple[Dict[str, Any], str]:
+        """Part 1A structure of a PDF on disk, through the cache"""
+        if file_hash is None:
+            from app.services.pdf_service import PDFDocumentService
+            file_hash = PDFDocumentService.calculate_file_hash(file_path)
+
+        def extract() -> Dict[str, Any]:
+            from app.part1a.pdf_structure_extractor import MultilingualPDFExtractor
+            return MultilingualPDFExtractor().extract_structure(file_path, raise_errors=True)
+
+        return self.get_or_extract(file_hash, extract)
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._stats["memory_hits"] + self._stats["disk_hits"] + self._stats["misses"]
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            return {
+                "extractor_version": self.extractor_version,
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_entries,
+                "disk_tier": self._disk_available,
+                "memory_hits": self._stats["memory_hits"],
+                "disk_hits": self._stats["disk_hits"],
+                "misses": self._stats["misses"],
+                "hit_rate": round(hits / lookups, 3) if lookups else None,
+                "extraction_seconds": round(self._stats["extraction_seconds"], 3)
+            }
+
+
+def _copy(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Callers add metadata to results; keep the cached copy clean"""
+    return {"title": result["title"], "outline": [dict(item) for item in result["outline"]]}
+
+
+# Global outline cache
+outline_cache = OutlineCache()
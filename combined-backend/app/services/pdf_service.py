@@ -9,8 +9,11 @@ from typing import List, Optional
 from sqlalchemy.orm import Session
 from sqlalchemy import desc
 
-from app.database.models import PDFDocument
+from app.database.models import PDFDocument, DocumentIngestion, DocumentSection
 from app.database.database import SessionLocal
+from app.services.vector_index import section_index
+from app.services.lexical_index import lexical_index
+from app.services.hybrid_retrieval import hybrid_retriever, reciprocal_rank_fusion
 
 class PDFDocumentService:
     
@@ -116,12 +119,19 @@ class PDFDocumentService:
             if not document:
                 return None
             
+            was_active = document.is_active
             for key, value in updates.items():
                 if hasattr(document, key):
                     setattr(document, key, value)
             
             db.commit()
             db.refresh(document)
+            
+            # Keep the vector index in step with soft delete / reactivation
+            if was_active and not document.is_active:
+                section_index.remove_document(document_id)
+            elif not was_active and document.is_active:
+                section_index.add_document(document_id)
             return document
             
         except Exception as e:
@@ -143,9 +153,14 @@ class PDFDocumentService:
                 document.is_active = False
                 db.commit()
             else:
+                # Snippets cascade through the relationship; ingestion artifacts are removed explicitly
+                db.query(DocumentSection).filter(DocumentSection.document_id == document_id).delete()
+                db.query(DocumentIngestion).filter(DocumentIngestion.document_id == document_id).delete()
+                lexical_index.remove_document(db, document_id)
                 db.delete(document)
                 db.commit()
             
+            section_index.remove_document(document_id)
             return True
             
         except Exception as e:
@@ -156,7 +171,10 @@ class PDFDocumentService:
     
     @staticmethod
     def search_documents(query: str, active_only: bool = True) -> List[PDFDocument]:
-        """Search documents by filename or title"""
+        """
+        Search documents by filename/title and by content
+        Metadata matches and hybrid (BM25 + dense) content matches are merged with reciprocal rank fusion
+        """
         db = PDFDocumentService.get_db_session()
         try:
             search_query = db.query(PDFDocument)
@@ -164,12 +182,30 @@ class PDFDocumentService:
             if active_only:
                 search_query = search_query.filter(PDFDocument.is_active == True)
             
-            search_query = search_query.filter(
+            metadata_query = search_query.filter(
                 (PDFDocument.filename.ilike(f"%{query}%")) |
                 (PDFDocument.original_filename.ilike(f"%{query}%")) |
                 (PDFDocument.title.ilike(f"%{query}%"))
             )
+            metadata_matches = metadata_query.order_by(desc(PDFDocument.upload_timestamp)).all()
+            
+            try:
+                content_ranking = [document_id for document_id, _ in hybrid_retriever.rank_documents(query)]
+            except Exception as e:
+                print(f"⚠️ Content search unavailable, using metadata matches only: {e}")
+                content_ranking = []
+            
+            fused = reciprocal_rank_fusion([[doc.id for doc in metadata_matches], content_ranking])
+            if not fused:
+                return []
+            
+            documents = {doc.id: doc for doc in metadata_matches}
+            missing_ids = [document_id for document_id in fused if document_id not in documents]
+            if missing_ids:
+                for doc in search_query.filter(PDFDocument.id.in_(missing_ids)).all():
+                    documents[doc.id] = doc
             
-            return search_query.order_by(desc(PDFDocument.upload_timestamp)).all()
+            ranked_ids = sorted((document_id for document_id in fused if document_id in documents), key=lambda document_id: -fused[document_id])
+            return [documents[document_id] for document_id in ranked_ids]
         finally:
             db.close()
@@ -0,0 +1,297 @@
+"""
+Response Cache
+Bounded, TTL-aware cache for generated results (LLM insights, podcast insights, audio file paths)
+- Memory: LRU per namespace bounded by entry count and a byte budget (JSON size of the values)
+- Every entry expires; fallback/error results are stored as negative entries with a much
+  shorter TTL, so a timeout is retried soon instead of being served as the answer for a day
+- Disk: the response_cache table in pdf_collections.db, shared by every uvicorn worker;
+  expired rows are purged and each namespace is trimmed to its disk entry limit as writes go on
+Settings come from <NAMESPACE>_CACHE_<SETTING>, falling back to RESPONSE_CACHE_<SETTING>
+"""
+
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from app.database.database import SessionLocal, engine
+from app.database.models import ResponseCacheEntry
+
+# Per-entry bookkeeping on top of the serialized value (key, OrderedDict node, expiry tuple)
+ENTRY_OVERHEAD_BYTES = 200
+# Expired/overflow rows are purged from the disk tier every this many writes
+PURGE_EVERY_WRITES = 100
+
+
+def _setting(namespace: str, name: str, default: str) -> str:
+    return os.getenv(f"{namespace.upper()}_CACHE_{name}") or os.getenv(f"RESPONSE_CACHE_{name}", default)
+
+
+class ResponseCache:
+    """Thread-safe memory LRU + optional SQLite tier for one namespace of JSON-serializable values"""
+
+    def __init__(self, namespace: str, ttl: float = 86400, negative_ttl: float = 60,
+                 max_entries: int = 1024, memory_mb: float = 16):
+        self.namespace = namespace
+        self.enabled = _setting(namespace, "ENABLED", "true").lower() == "true"
+        self.ttl = float(_setting(namespace, "TTL", str(ttl)))
+        self.negative_ttl = float(_setting(namespace, "NEGATIVE_TTL", str(negative_ttl)))
+        self.max_entries = int(_setting(namespace, "MAX_ENTRIES", str(max_entries)))
+        self.max_memory_bytes = int(float(_setting(namespace, "MEMORY_MB", str(memory_mb))) * 1024 * 1024)
+        self.max_disk_entries = int(_setting(namespace, "DISK_MAX_ENTRIES", str(self.max_entries * 10)))
+
+        # key -> (value, expires_at, negative, size)
+        self._memory: "OrderedDict[str, Tuple[Any, float, bool, int]]" = OrderedDict()
+        self._memory_bytes = 0
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._stats = {
+            "memory_hits": 0, "disk_hits": 0, "negative_hits": 0, "misses": 0,
+            "expired": 0, "evictions": 0, "sets": 0, "negative_sets": 0
+        }
+        self._disk_available = False
+        if self.enabled and _setting(namespace, "DISK", "true").lower() == "true":
+            self._disk_available = self._create_table()
+        _caches[namespace] = self
+
+    def _create_table(self) -> bool:
+        try:
+            ResponseCacheEntry.__table__.create(bind=engine, checkfirst=True)
+            return True
+        except Exception as e:
+            print(f"⚠️ Response cache '{self.namespace}': SQLite tier unavailable, using memory only: {e}")
+            return False
+
+    # Memory tier (caller holds the lock)
+
+    def _remember(self, key: str, value: Any, expires_at: float, negative: bool, size: int) -> None:
+        if key in self._memory:
+            self._drop(key)
+        if size + ENTRY_OVERHEAD_BYTES > self.max_memory_bytes:
+            return  # Larger than the whole budget: disk tier only
+        self._memory[key] = (value, expires_at, negative, size)
+        self._memory_bytes += size + ENTRY_OVERHEAD_BYTES
+        while self._memory and (len(self._memory) > self.max_entries or self._memory_bytes > self.max_memory_bytes):
+            _, (_, _, _, evicted_size) = self._memory.popitem(last=False)
+            self._memory_bytes -= evicted_size + ENTRY_OVERHEAD_BYTES
+            self._stats["evictions"] += 1
+
+    def _drop(self, key: str) -> None:
+        entry = self._memory.pop(key, None)
+        if entry is not None:
+            self._memory_bytes -= entry[3] + ENTRY_OVERHEAD_BYTES
+
+    # Disk tier
+
+    def _load(self, key: str) -> Optional[Tuple[str, float, bool]]:
+        db = SessionLocal()
+        try:
+            row = (
+                db.query(ResponseCacheEntry.value, ResponseCacheEntry.expires_at, ResponseCacheEntry.negative)
+                .filter(ResponseCacheEntry.namespace == self.namespace)
+                .filter(ResponseCacheEntry.key == key)
+                .first()
+            )
+            return (row[0], row[1], bool(row[2])) if row else None
+        except Exception as e:
+            print(f"⚠️ Response cache '{self.namespace}' lookup failed: {e}")
+            return None
+        finally:
+            db.close()
+
+    def _store(self, key: str, serialized: str, expires_at: float, negative: bool) -> None:
+        db = SessionLocal()
+        try:
+            row = {"namespace": self.namespace, "key": key, "value": serialized,
+                   "negative": negative, "expires_at": expires_at}
+            statement = sqlite_insert(ResponseCacheEntry.__table__).values(**row).on_conflict_do_update(
+                index_elements=["namespace", "key"],
+                set_={"value": serialized, "negative": negative, "expires_at": expires_at}
+            )
+            db.execute(statement)
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Response cache '{self.namespace}' store failed: {e}")
+        finally:
+            db.close()
+
+    def _delete(self, key: str) -> None:
+        db = SessionLocal()
+        try:
+            (db.query(ResponseCacheEntry)
+             .filter(ResponseCacheEntry.namespace == self.namespace)
+             .filter(ResponseCacheEntry.key == key)
+             .delete(synchronize_session=False))
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Response cache '{self.namespace}' delete failed: {e}")
+        finally:
+            db.close()
+
+    def purge(self) -> int:
+        """Delete expired rows of this namespace and trim it to the disk entry limit (oldest expiry first)"""
+        if not self._disk_available:
+            return 0
+        db = SessionLocal()
+        try:
+            in_namespace = ResponseCacheEntry.namespace == self.namespace
+            removed = (
+                db.query(ResponseCacheEntry)
+                .filter(in_namespace)
+                .filter(ResponseCacheEntry.expires_at <= time.time())
+                .delete(synchronize_session=False)
+            )
+            overflow = db.query(ResponseCacheEntry).filter(in_namespace).count() - self.max_disk_entries
+            if overflow > 0:
+                oldest = (
+                    db.query(ResponseCacheEntry.id).filter(in_namespace)
+                    .order_by(ResponseCacheEntry.expires_at).limit(overflow).subquery()
+                )
+                removed += (
+                    db.query(ResponseCacheEntry)
+                    .filter(ResponseCacheEntry.id.in_(oldest.select()))
+                    .delete(synchronize_session=False)
+                )
+            db.commit()
+            return removed
+        except Exception as e:
+            db.rollback()
+            print(f"⚠️ Response cache '{self.namespace}' purge failed: {e}")
+            return 0
+        finally:
+            db.close()
+
+    # Lookup / store
+
+    def lookup(self, key: str) -> Tuple[Any, Optional[bool]]:
+        """
+        Cached value and whether it is a negative entry
+
+        Returns:
+            (value, negative) or (None, None) on a miss
+        """
+        if not self.enabled:
+            return None, None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, expires_at, negative, _ = entry
+                if expires_at > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    self._stats["negative_hits"] += int(negative)
+                    return value, negative
+                self._drop(key)
+                self._stats["expired"] += 1
+
+        if self._disk_available:
+            row = self._load(key)
+            if row is not None:
+                serialized, expires_at, negative = row
+                if expires_at > now:
+                    value = json.loads(serialized)
+                    with self._lock:
+                        self._remember(key, value, expires_at, negative, len(serialized))
+                        self._stats["disk_hits"] += 1
+                        self._stats["negative_hits"] += int(negative)
+                    return value, negative
+                with self._lock:
+                    self._stats["expired"] += 1
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None, None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value, negative = self.lookup(key)
+        return default if negative is None else value
+
+    def is_negative(self, key: str) -> bool:
+        """Whether key currently holds a negative entry (no stats, no LRU update)"""
+        if not self.enabled:
+            return False
+        with self._lock:
+            entry = self._memory.get(key)
+        if entry is None and self._disk_available:
+            row = self._load(key)
+            entry = (None, row[1], row[2], 0) if row else None
+        return bool(entry and entry[1] > time.time() and entry[2])
+
+    def set(self, key: str, value: Any, ttl: float = None, negative: bool = False) -> None:
+        """Store a value in both tiers; negative results default to the negative TTL"""
+        if not self.enabled:
+            return
+        serialized = json.dumps(value)
+        expires_at = time.time() + (ttl if ttl is not None else self.negative_ttl if negative else self.ttl)
+        with self._lock:
+            self._remember(key, value, expires_at, negative, len(serialized))
+            self._stats["sets"] += 1
+            self._stats["negative_sets"] += int(negative)
+            self._writes += 1
+            purge = self._writes % PURGE_EVERY_WRITES == 0
+        if self._disk_available:
+            self._store(key, serialized, expires_at, negative)
+            if purge:
+                self.purge()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._drop(key)
+        if self._disk_available:
+            self._delete(key)
+
+    def get_or_set(self, key: str, compute: Callable[[], Tuple[Any, bool]]) -> Any:
+        """Cached value, or run compute() -> (value, negative) and cache the result"""
+        value, negative = self.lookup(key)
+        if negative is not None:
+            return value
+        value, negative = compute()
+        self.set(key, value, negative=negative)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+            self._memory_bytes = 0
+        if self._disk_available:
+            db = SessionLocal()
+            try:
+                db.query(ResponseCacheEntry).filter(ResponseCacheEntry.namespace == self.namespace).delete(synchronize_session=False)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                print(f"⚠️ Response cache '{self.namespace}' clear failed: {e}")
+            finally:
+                db.close()
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            hits = self._stats["memory_hits"] + self._stats["disk_hits"]
+            lookups = hits + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "disk_tier": self._disk_available,
+                "ttl_seconds": self.ttl,
+                "negative_ttl_seconds": self.negative_ttl,
+                "memory_entries": len(self._memory),
+                "max_memory_entries": self.max_entries,
+                "memory_bytes": self._memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                **self._stats,
+                "hit_rate": round(hits / lookups, 3) if lookups else None
+            }
+
+
+# Every ResponseCache registers itself here so health endpoints can report all of them
+_caches: Dict[str, ResponseCache] = {}
+
+
+def describe_response_caches() -> Dict[str, Any]:
+    return {namespace: cache.describe() for namespace, cache in sorted(_caches.items())}
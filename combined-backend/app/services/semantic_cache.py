@@ -0,0 +1,207 @@
+"""
+Semantic LLM Cache
+Serves an LLM answer generated for a near-duplicate request (e.g. a slightly different span
+of the same paragraph) instead of making another long LLM call
+- The request's key content (the selected text) is embedded with the shared sentence transformer
+- A cached answer is reused when its cosine similarity is >= SEMANTIC_CACHE_THRESHOLD and the
+  fingerprint of the referenced documents (ids + file hashes) is unchanged
+- Only real LLM answers are stored; fallback/timeout answers never are
+- Metrics: hits, misses, near-hits (misses within SEMANTIC_CACHE_NEAR_MARGIN of the threshold)
+  and the cosine distance of the best match for hits and misses
+Entries live in process memory, bounded by SEMANTIC_CACHE_MAX_ENTRIES and SEMANTIC_CACHE_TTL
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from app.database.database import SessionLocal
+from app.database.models import PDFDocument
+from app.services.model_registry import model_registry
+
+# Best-match distances kept per outcome for the percentile metrics
+DISTANCE_WINDOW = 1000
+
+
+def document_fingerprint(document_ids: Iterable[Any], texts: Iterable[str] = ()) -> str:
+    """
+    Version of the documents a prompt references: sha256 over (id, file hash, active) of each
+    document, plus the text of any referenced content that carries no document id
+    """
+    ids = sorted({int(document_id) for document_id in document_ids if document_id is not None})
+    versions = []
+    if ids:
+        db = SessionLocal()
+        try:
+            rows = (
+                db.query(PDFDocument.id, PDFDocument.file_hash, PDFDocument.is_active)
+                .filter(PDFDocument.id.in_(ids))
+                .all()
+            )
+            found = {row[0]: f"{row[0]}:{row[1]}:{int(bool(row[2]))}" for row in rows}
+            versions = [found.get(document_id, f"{document_id}:missing") for document_id in ids]
+        except Exception as e:
+            print(f"⚠️ Semantic cache: document lookup failed: {e}")
+            versions = [f"{document_id}:?" for document_id in ids]
+        finally:
+            db.close()
+    digest = hashlib.sha256("|".join(versions).encode("utf-8"))
+    for text in texts:
+        digest.update(b"\0" + " ".join(text.split()).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class SemanticLLMCache:
+    """Thread-safe nearest-neighbour cache of LLM answers per (operation, document fingerprint)"""
+
+    def __init__(self, model_name: str = None):
+        self.enabled = os.getenv("SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+        self.model_name = model_name or os.getenv("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2")
+        self.threshold = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+        self.near_margin = float(os.getenv("SEMANTIC_CACHE_NEAR_MARGIN", "0.05"))
+        self.ttl = float(os.getenv("SEMANTIC_CACHE_TTL", "86400"))
+        self.max_entries = int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "512"))
+
+        # entry id -> (scope, vector, response, expires_at); scope = (operation, fingerprint)
+        self._entries: "OrderedDict[int, Tuple[Tuple[str, str], np.ndarray, str, float]]" = OrderedDict()
+        self._scopes: Dict[Tuple[str, str], List[int]] = {}
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self._encoder_error: Optional[str] = None
+        self._stats = {"hits": 0, "misses": 0, "near_hits": 0, "stores": 0, "evictions": 0, "expired": 0}
+        self._hit_distances: deque = deque(maxlen=DISTANCE_WINDOW)
+        self._miss_distances: deque = deque(maxlen=DISTANCE_WINDOW)
+
+    def _encode(self, text: str) -> Optional[np.ndarray]:
+        if self._encoder_error:
+            return None
+        try:
+            model = model_registry.get_sentence_transformer(self.model_name)
+            return np.asarray(model.encode(
+                [" ".join(text.split())[:1000]],
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )[0], dtype=np.float32)
+        except Exception as e:
+            # Do not retry a missing model on every request
+            self._encoder_error = str(e)
+            print(f"⚠️ Semantic cache: encoder unavailable, semantic lookups disabled: {e}")
+            return None
+
+    # Memory (caller holds the lock)
+
+    def _drop(self, entry_id: int) -> None:
+        scope = self._entries.pop(entry_id)[0]
+        ids = self._scopes.get(scope)
+        if ids is not None:
+            ids.remove(entry_id)
+            if not ids:
+                del self._scopes[scope]
+
+    def _best_match(self, scope: Tuple[str, str], vector: np.ndarray) -> Tuple[Optional[int], float]:
+        now = time.time()
+        for entry_id in [i for i in self._scopes.get(scope, []) if self._entries[i][3] <= now]:
+            self._drop(entry_id)
+            self._stats["expired"] += 1
+        ids = self._scopes.get(scope)
+        if not ids:
+            return None, -1.0
+        similarities = np.stack([self._entries[i][1] for i in ids]) @ vector
+        best = int(np.argmax(similarities))
+        return ids[best], float(similarities[best])
+
+    # Lookup / store
+
+    def lookup(self, operation: str, key_text: str, fingerprint: str) -> Tuple[Optional[str], Optional[np.ndarray]]:
+        """
+        Cached answer for a near-duplicate request
+
+        Returns:
+            (answer or None, query vector to pass to store() on a miss)
+        """
+        if not self.enabled or not key_text:
+            return None, None
+        vector = self._encode(key_text)
+        if vector is None:
+            return None, None
+
+        with self._lock:
+            entry_id, similarity = self._best_match((operation, fingerprint), vector)
+            if entry_id is not None and similarity >= self.threshold:
+                self._entries.move_to_end(entry_id)
+                self._stats["hits"] += 1
+                self._hit_distances.append(1.0 - similarity)
+                return self._entries[entry_id][2], vector
+            self._stats["misses"] += 1
+            if entry_id is not None:
+                self._miss_distances.append(1.0 - similarity)
+                if similarity >= self.threshold - self.near_margin:
+                    self._stats["near_hits"] += 1
+        return None, vector
+
+    def store(self, operation: str, key_text: str, fingerprint: str, response: str,
+              vector: Optional[np.ndarray] = None) -> None:
+        """Remember a real LLM answer (never a fallback) for later near-duplicate requests"""
+        if not self.enabled or not key_text or not response:
+            return
+        if vector is None:
+            vector = self._encode(key_text)
+            if vector is None:
+                return
+        scope = (operation, fingerprint)
+        with self._lock:
+            entry_id, similarity = self._best_match(scope, vector)
+            if entry_id is not None and similarity >= 0.9999:
+                self._drop(entry_id)  # Same request again: replace rather than duplicate
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (scope, vector, response, time.time() + self.ttl)
+            self._scopes.setdefault(scope, []).append(entry_id)
+            self._stats["stores"] += 1
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+
+    def describe(self) -> Dict[str, Any]:
+        def distances(values: deque) -> Optional[Dict[str, float]]:
+            if not values:
+                return None
+            data = np.asarray(values)
+            return {
+                "min": round(float(data.min()), 4),
+                "p50": round(float(np.percentile(data, 50)), 4),
+                "p90": round(float(np.percentile(data, 90)), 4),
+                "max": round(float(data.max()), 4)
+            }
+
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {
+                "enabled": self.enabled,
+                "model": self.model_name,
+                "encoder_error": self._encoder_error,
+                "threshold": self.threshold,
+                "near_margin": self.near_margin,
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                **self._stats,
+                "hit_rate": round(self._stats["hits"] / lookups, 3) if lookups else None,
+                # Cosine distance (1 - similarity) to the best cached request
+                "hit_distance": distances(self._hit_distances),
+                "miss_distance": distances(self._miss_distances)
+            }
+
+
+# Global semantic LLM cache
+semantic_llm_cache = SemanticLLMCache()
@@ -0,0 +1,125 @@
+"""
+Single-Flight Request Coalescing
+Concurrent identical requests (double clicks, several tabs sending the same selection) share
+one computation instead of each paying for its own LLM, TTS or retrieval work
+- Requests are keyed on a namespace plus their normalized content (whitespace collapsed,
+  JSON with sorted keys)
+- The first request starts the work as an asyncio task; later identical requests await the
+  same task while it is in flight. Completed work is not remembered (that is the caches' job)
+- Each waiter watches its own client connection; a disconnected waiter leaves, and when the
+  last one leaves the shared task is cancelled. Work already handed to an executor thread
+  runs to completion, but nothing after it (e.g. TTS after the script) is started; awaited
+  async LLM calls (the Insights Bulb) are cancelled with the task
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from fastapi import HTTPException, Request
+
+
+class ClientDisconnected(HTTPException):
+    """Raised to a waiter whose client went away; the response is never delivered"""
+
+    def __init__(self):
+        super().__init__(status_code=499, detail="Client closed request")
+
+
+def _normalize(value: Any) -> Any:
+    if isinstance(value, str):
+        return " ".join(value.split())
+    if isinstance(value, dict):
+        return {str(k): _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def request_key(namespace: str, payload: Any) -> str:
+    """Single-flight key of a request: namespace + sha256 of its normalized content"""
+    content = json.dumps(_normalize(payload), sort_keys=True, default=str)
+    return f"{namespace}:{hashlib.sha256(content.encode('utf-8')).hexdigest()}"
+
+
+class _Flight:
+    def __init__(self, task: "asyncio.Task"):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """In-flight task registry for one event loop (one per uvicorn worker)"""
+
+    def __init__(self, disconnect_poll: float = None):
+        self.disconnect_poll = disconnect_poll or float(os.getenv("SINGLE_FLIGHT_DISCONNECT_POLL", "0.5"))
+        self._flights: Dict[str, _Flight] = {}
+        self._stats = {"leaders": 0, "coalesced": 0, "disconnected_waiters": 0, "cancelled": 0}
+
+    async def run(
+        self,
+        key: str,
+        factory: Callable[[], Awaitable[Any]],
+        request: Optional[Request] = None
+    ) -> Any:
+        """
+        Result of factory() for this key, shared with every concurrent caller of the same key
+
+        Args:
+            key: From request_key()
+            factory: Starts the work; only called by the first caller
+            request: The caller's HTTP request, watched for disconnects
+
+        Raises:
+            Whatever the shared work raised; ClientDisconnected if this caller's client left
+        """
+        flight = self._flights.get(key)
+        if flight is None or flight.task.done():
+            flight = _Flight(asyncio.ensure_future(factory()))
+            self._flights[key] = flight
+            flight.task.add_done_callback(lambda _task, key=key, flight=flight: self._finish(key, flight))
+            self._stats["leaders"] += 1
+        else:
+            self._stats["coalesced"] += 1
+
+        flight.waiters += 1
+        try:
+            return await self._wait(flight.task, request)
+        finally:
+            flight.waiters -= 1
+            if flight.waiters == 0 and not flight.task.done():
+                # Nobody is left to receive the result. Unregister first: cancel() only requests
+                # cancellation, and a request arriving before the task finishes must not join it
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+                flight.task.cancel()
+                self._stats["cancelled"] += 1
+
+    async def _wait(self, task: "asyncio.Task", request: Optional[Request]) -> Any:
+        # asyncio.wait never cancels the shared task, even if this waiter is cancelled
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=self.disconnect_poll if request is not None else None)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                self._stats["disconnected_waiters"] += 1
+                raise ClientDisconnected()
+
+    def _finish(self, key: str, flight: _Flight) -> None:
+        if self._flights.get(key) is flight:
+            del self._flights[key]
+        if not flight.task.cancelled():
+            flight.task.exception()  # Mark retrieved; waiters already got it
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._flights),
+            "waiters": sum(flight.waiters for flight in self._flights.values()),
+            **self._stats
+        }
+
+
+# Global single-flight registry
+single_flight = SingleFlight()
@@ -0,0 +1,316 @@
+"""
+Vector Index
+Corpus-wide k-NN index over the section and paragraph embeddings stored at ingestion time
+- Brute-force NumPy matrix for small corpora (exact, one matrix-vector product per query)
+- HNSW approximate index (hnswlib) once the corpus passes VECTOR_INDEX_ANN_THRESHOLD vectors
+- Incremental add/remove when documents are ingested, soft-deleted or reactivated
+The vectors themselves live in document_sections, so the brute-force index is rebuilt from
+SQLite on first use; the HNSW graph is also saved under data/vector_index/ to skip rebuilding it
+"""
+
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from app.database.database import SessionLocal, DB_DIR
+from app.database.models import PDFDocument, DocumentIngestion, DocumentSection
+from app.services.model_registry import DEFAULT_SENTENCE_MODEL
+
+try:
+    import hnswlib
+    HNSWLIB_AVAILABLE = True
+except ImportError:
+    HNSWLIB_AVAILABLE = False
+
+INDEX_DIR = DB_DIR / "vector_index"
+
+
+class VectorIndex:
+    """Thread-safe k-NN index keyed by DocumentSection id"""
+
+    def __init__(self, model_name: str, ann_threshold: int = None):
+        self.model_name = model_name
+        self.ann_threshold = ann_threshold or int(os.getenv("VECTOR_INDEX_ANN_THRESHOLD", "20000"))
+        self.hnsw_m = int(os.getenv("VECTOR_INDEX_HNSW_M", "16"))
+        self.hnsw_ef_construction = int(os.getenv("VECTOR_INDEX_HNSW_EF_CONSTRUCTION", "200"))
+        self.hnsw_ef_search = int(os.getenv("VECTOR_INDEX_HNSW_EF_SEARCH", "64"))
+
+        self._lock = threading.RLock()
+        self._built = False
+        self._dim: Optional[int] = None
+
+        # Entry metadata, shared by both backends
+        self._entry_document: Dict[int, int] = {}  # section id -> document id
+        self._document_entries: Dict[int, List[int]] = {}  # document id -> section ids
+
+        # Brute-force backend
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._matrix = np.zeros((0, 0), dtype=np.float32)
+
+        # HNSW backend
+        self._hnsw = None
+
+    @property
+    def backend(self) -> str:
+        return "hnsw" if self._hnsw is not None else "brute_force"
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entry_document)
+
+    # Loading
+
+    def _load_rows(self, document_id: int = None) -> List[tuple]:
+        """(section id, document id, embedding bytes) for active documents embedded with this model"""
+        db = SessionLocal()
+        try:
+            query = (
+                db.query(DocumentSection.id, DocumentSection.document_id, DocumentSection.embedding)
+                .join(PDFDocument, PDFDocument.id == DocumentSection.document_id)
+                .join(DocumentIngestion, DocumentIngestion.document_id == DocumentSection.document_id)
+                .filter(PDFDocument.is_active == True)
+                .filter(DocumentIngestion.embedding_model == self.model_name)
+                .filter(DocumentSection.embedding.isnot(None))
+            )
+            if document_id is not None:
+                query = query.filter(DocumentSection.document_id == document_id)
+            return query.order_by(DocumentSection.id).all()
+        finally:
+            db.close()
+
+    @staticmethod
+    def _rows_to_arrays(rows: List[tuple]):
+        ids = np.array([row[0] for row in rows], dtype=np.int64)
+        document_ids = [row[1] for row in rows]
+        vectors = np.vstack([np.frombuffer(row[2], dtype=np.float32) for row in rows]) if rows else None
+        return ids, document_ids, vectors
+
+    def _register(self, ids: np.ndarray, document_ids: List[int]) -> None:
+        for section_id, document_id in zip(ids.tolist(), document_ids):
+            self._entry_document[section_id] = document_id
+            self._document_entries.setdefault(document_id, []).append(section_id)
+
+    def ensure_built(self) -> None:
+        """Build the index from the stored embeddings on first use"""
+        if self._built:
+            return
+        with self._lock:
+            if self._built:
+                return
+            ids, document_ids, vectors = self._rows_to_arrays(self._load_rows())
+            self._register(ids, document_ids)
+            if vectors is not None:
+                self._dim = vectors.shape[1]
+                if len(ids) >= self.ann_threshold and HNSWLIB_AVAILABLE:
+                    if not self._load_hnsw(ids):
+                        self._build_hnsw(ids, vectors)
+                else:
+                    self._ids, self._matrix = ids, vectors
+            self._built = True
+            print(f"🧭 Vector index ready: {len(ids)} vectors ({self.backend})")
+
+    # HNSW backend
+
+    def _hnsw_paths(self):
+        safe_name = self.model_name.replace('/', '_')
+        return INDEX_DIR / f"{safe_name}.hnsw", INDEX_DIR / f"{safe_name}.json"
+
+    def _build_hnsw(self, ids: np.ndarray, vectors: np.ndarray) -> None:
+        index = hnswlib.Index(space='ip', dim=vectors.shape[1])
+        index.init_index(max_elements=max(len(ids) * 2, 1024), ef_construction=self.hnsw_ef_construction, M=self.hnsw_m)
+        index.add_items(vectors, ids)
+        index.set_ef(self.hnsw_ef_search)
+        self._hnsw = index
+        self._ids, self._matrix = np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+        self._save_hnsw()
+
+    def _load_hnsw(self, ids: np.ndarray) -> bool:
+        """Reuse the saved graph if it covers exactly the current corpus"""
+        index_path, meta_path = self._hnsw_paths()
+        if not index_path.exists() or not meta_path.exists():
+            return False
+        try:
+            with open(meta_path) as f:
+                meta = json.load(f)
+            if meta.get("ids") != ids.tolist():
+                return False
+            index = hnswlib.Index(space='ip', dim=self._dim)
+            index.load_index(str(index_path), max_elements=max(len(ids) * 2, 1024))
+            index.set_ef(self.hnsw_ef_search)
+            self._hnsw = index
+            return True
+        except Exception as e:
+            print(f"⚠️ Vector index: could not load saved HNSW graph, rebuilding: {e}")
+            return False
+
+    def _save_hnsw(self) -> None:
+        index_path, meta_path = self._hnsw_paths()
+        try:
+            INDEX_DIR.mkdir(exist_ok=True)
+            self._hnsw.save_index(str(index_path))
+            with open(meta_path, "w") as f:
+                json.dump({"model": self.model_name, "ids": sorted(self._entry_document)}, f)
+        except Exception as e:
+            print(f"⚠️ Vector index: could not save HNSW graph: {e}")
+
+    def _switch_to_hnsw(self) -> None:
+        """Brute force -> HNSW once the corpus grows past the threshold"""
+        print(f"🧭 Vector index: {len(self._ids)} vectors, switching to HNSW")
+        self._build_hnsw(self._ids, self._matrix)
+
+    # Incremental updates
+
+    def add_document(self, document_id: int) -> int:
+        """Index (or re-index) the stored vectors of one document; returns the number added"""
+        with self._lock:
+            if not self._built:
+                # Picked up by the first build
+                return 0
+            self._remove_entries(document_id)
+            ids, document_ids, vectors = self._rows_to_arrays(self._load_rows(document_id))
+            if vectors is None:
+                return 0
+            self._dim = self._dim or vectors.shape[1]
+            self._register(ids, document_ids)
+            if self._hnsw is not None:
+                needed = self._hnsw.get_current_count() + len(ids)
+                if needed > self._hnsw.get_max_elements():
+                    self._hnsw.resize_index(needed * 2)
+                self._hnsw.add_items(vectors, ids, replace_deleted=False)
+                self._save_hnsw()
+            else:
+                self._ids = np.concatenate([self._ids, ids])
+                self._matrix = vectors if self._matrix.size == 0 else np.vstack([self._matrix, vectors])
+                if len(self._ids) >= self.ann_threshold and HNSWLIB_AVAILABLE:
+                    self._switch_to_hnsw()
+            return len(ids)
+
+    def remove_document(self, document_id: int) -> int:
+        """Drop a document's vectors (soft delete); returns the number removed"""
+        with self._lock:
+            if not self._built:
+                return 0
+            removed = self._remove_entries(document_id)
+            if removed and self._hnsw is not None:
+                self._save_hnsw()
+            return removed
+
+    def _remove_entries(self, document_id: int) -> int:
+        section_ids = self._document_entries.pop(document_id, [])
+        if not section_ids:
+            return 0
+        for section_id in section_ids:
+            self._entry_document.pop(section_id, None)
+        if self._hnsw is not None:
+            for section_id in section_ids:
+                try:
+                    self._hnsw.mark_deleted(section_id)
+                except RuntimeError:
+                    pass
+        else:
+            keep = ~np.isin(self._ids, section_ids)
+            self._ids = self._ids[keep]
+            self._matrix = self._matrix[keep]
+        return len(section_ids)
+
+    # Search
+
+    def search(self, query_vector: np.ndarray, k: int = 10, exclude_document_id: int = None) -> List[Dict[str, Any]]:
+        """
+        k nearest entries by cosine similarity (vectors are L2-normalized)
+
+        Returns:
+            List of {"section_id", "document_id", "score"}, best first
+        """
+        self.ensure_built()
+        query_vector = np.asarray(query_vector, dtype=np.float32).reshape(-1)
+
+        with self._lock:
+            if not self._entry_document or k <= 0:
+                return []
+
+            if self._hnsw is not None:
+                available = len(self._entry_document)
+                if exclude_document_id is not None:
+                    available -= len(self._document_entries.get(exclude_document_id, []))
+                k = min(k, available)
+                if k <= 0:
+                    return []
+                entry_document = self._entry_document
+                while True:
+                    try:
+                        labels, distances = self._hnsw.knn_query(
+                            query_vector,
+                            k=k,
+                            filter=lambda label: entry_document.get(label) not in (None, exclude_document_id)
+                        )
+                        break
+                    except RuntimeError:
+                        # Too few reachable candidates for k (heavy filtering); ask for fewer
+                        if k == 1:
+                            return []
+                        k = max(1, k // 2)
+                # hnswlib 'ip' distance is 1 - dot product
+                return [
+                    {"section_id": int(label), "document_id": entry_document[int(label)], "score": float(1.0 - distance)}
+                    for label, distance in zip(labels[0], distances[0])
+                ]
+
+            scores = self._matrix @ query_vector
+            candidates = np.arange(len(self._ids))
+            if exclude_document_id is not None:
+                excluded = np.isin(self._ids, self._document_entries.get(exclude_document_id, []))
+                candidates = candidates[~excluded]
+            if len(candidates) == 0:
+                return []
+            k = min(k, len(candidates))
+            top = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+            top = top[np.argsort(-scores[top], kind="stable")]
+            return [
+                {"section_id": int(self._ids[i]), "document_id": self._entry_document[int(self._ids[i])], "score": float(scores[i])}
+                for i in top
+            ]
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "built": self._built,
+                "backend": self.backend,
+                "vectors": len(self._entry_document),
+                "documents": len(self._document_entries),
+                "dimension": self._dim,
+                "model": self.model_name,
+                "ann_threshold": self.ann_threshold,
+                "hnswlib_available": HNSWLIB_AVAILABLE
+            }
+
+
+def get_section_entries(section_ids: List[int], with_embeddings: bool = False) -> Dict[int, Dict[str, Any]]:
+    """Stored text and location (optionally the vector) of index hits"""
+    if not section_ids:
+        return {}
+    db = SessionLocal()
+    try:
+        rows = db.query(DocumentSection).filter(DocumentSection.id.in_(section_ids)).all()
+        entries = {}
+        for row in rows:
+            entry = {
+                "document_id": row.document_id,
+                "kind": row.kind or "section",
+                "page": row.page_number,
+                "section_title": row.section_title or "",
+                "content": row.content
+            }
+            if with_embeddings:
+                entry["embedding"] = np.frombuffer(row.embedding, dtype=np.float32) if row.embedding else None
+            entries[row.id] = entry
+        return entries
+    finally:
+        db.close()
+
+
+# Global index over the ingestion embedding model
+section_index = VectorIndex(os.getenv("INGESTION_EMBEDDING_MODEL", DEFAULT_SENTENCE_MODEL))
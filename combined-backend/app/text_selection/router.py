@@ -4,10 +4,15 @@ Core feature: Text selection -> Cross-document insights
 Adobe Hackathon Finale requirement
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from .service import text_selection_service
+from ..services.hybrid_retrieval import hybrid_retriever
+from ..services.embedding_cache import embedding_cache
+from ..services.embedding_client import embedding_client
+from ..services.execution import execution_layer
+from ..services.single_flight import single_flight, request_key
 
 router = APIRouter(prefix="/text-selection", tags=["text-selection"])
 
@@ -40,7 +45,7 @@ class SnippetNavigationRequest(BaseModel):
     snippet_id: str
 
 @router.post("/find-related", response_model=TextSelectionResponse)
-async def find_related_sections(request: TextSelectionRequest):
+async def find_related_sections(request: TextSelectionRequest, http_request: Request):
     """
     Core Feature: Find related sections across PDFs based on selected text
     
@@ -59,12 +64,23 @@ async def find_related_sections(request: TextSelectionRequest):
                 detail="Selected text must be at least 5 characters long"
             )
         
-        # Find related sections using semantic search
-        related_sections = text_selection_service.find_related_sections(
-            selected_text=request.selected_text,
-            document_id=request.document_id,
-            min_similarity=request.min_similarity,
-            max_results=request.max_results
+        # Find related sections using semantic search (identical selections in flight share one search)
+        key = request_key("find_related", {
+            "selected_text": request.selected_text,
+            "document_id": request.document_id,
+            "min_similarity": request.min_similarity,
+            "max_results": request.max_results
+        })
+        related_sections = await single_flight.run(
+            key,
+            lambda: execution_layer.run_cpu(
+                text_selection_service.find_related_sections,
+                selected_text=request.selected_text,
+                document_id=request.document_id,
+                min_similarity=request.min_similarity,
+                max_results=request.max_results
+            ),
+            http_request
         )
         
         processing_time = int((time.time() - start_time) * 1000)
@@ -153,6 +169,10 @@ async def health_check():
         "status": "healthy",
         "service": "Text Selection Service",
         "model_loaded": text_selection_service.model is not None,
+        "retrieval": hybrid_retriever.describe(),
+        "embedding_cache": embedding_cache.describe(),
+        "embedding_provider": embedding_client.describe(),
+        "single_flight": single_flight.describe(),
         "features": [
             "Cross-document semantic search",
             "Snippet extraction",
@@ -7,20 +7,23 @@ Core feature for Adobe Hackathon Finale
 import os
 import json
 import numpy as np
-import requests
 from typing import List, Dict, Any, Optional, Tuple
-from sentence_transformers import SentenceTransformer
 import sqlite3
 from datetime import datetime
 import pdfplumber
 
+from ..services.model_registry import model_registry
+from ..services.ingestion_service import ingestion_service
+from ..services.hybrid_retrieval import hybrid_retriever
+from ..services.embedding_client import embedding_client
+
 class TextSelectionService:
     def __init__(self):
         # Configuration for embedding model
         self.use_api_model = os.getenv('USE_API_EMBEDDINGS', 'true').lower() == 'true'
         self.api_type = os.getenv('EMBEDDING_API_TYPE', 'ollama')  # ollama, openai, cohere
-        self.api_base_url = os.getenv('OLLAMA_BASE_URL', 'http://localhost:11434')
-        self.api_key = os.getenv('OPENAI_API_KEY', '')  # For OpenAI/Cohere
+        # Pooled, batched provider client shared by the whole process
+        self.embedding_client = embedding_client
         
         # Initialize models
         if self.use_api_model:
@@ -32,37 +35,31 @@ class TextSelectionService:
     def _initialize_sentence_transformer(self):
         """Initialize the fallback sentence transformer model"""
         try:
-            self.model = SentenceTransformer('all-MiniLM-L6-v2')
+            # Same instance as Part 1B's RelevanceAnalyzer
+            self.model = model_registry.get_sentence_transformer('all-MiniLM-L6-v2')
             print("✅ Loaded SentenceTransformer fallback model")
         except Exception as e:
             print(f"⚠️ Failed to load SentenceTransformer: {e}")
             self.model = None
     
     def _initialize_api_model(self):
-        """Initialize API-based model connection"""
+        """Check the API provider (health is cached by the client) and load the fallback if it is down"""
         self.model = None  # Not needed for API
-        if self.api_type == 'ollama':
-            try:
-                # Test Ollama connection
-                response = requests.get(f"{self.api_base_url}/api/tags", timeout=5)
-                if response.status_code == 200:
-                    print("✅ Ollama API connection established")
-                else:
-                    print("⚠️ Ollama not available, falling back to SentenceTransformer")
-                    self.use_api_model = False
-                    self._initialize_sentence_transformer()
-            except Exception as e:
-                print(f"⚠️ Ollama connection failed: {e}")
-                print("📉 Falling back to SentenceTransformer")
-                self.use_api_model = False
-                self._initialize_sentence_transformer()
-        elif self.api_type in ['openai', 'cohere']:
-            if not self.api_key:
-                print(f"⚠️ No API key found for {self.api_type}, falling back to SentenceTransformer")
-                self.use_api_model = False
-                self._initialize_sentence_transformer()
-            else:
-                print(f"✅ {self.api_type} API configured")
+        if self.embedding_client.is_available():
+            print(f"✅ {self.api_type} embedding API available")
+        else:
+            print(f"⚠️ {self.api_type} embeddings not available, falling back to SentenceTransformer")
+            self._initialize_sentence_transformer()
+    
+    def _api_ready(self) -> bool:
+        """Use API embeddings while the provider is healthy (re-checked every EMBEDDING_HEALTH_TTL seconds)"""
+        if not self.use_api_model:
+            return False
+        if self.embedding_client.is_available():
+            return True
+        if self.model is None:
+            self._initialize_sentence_transformer()
+        return False
     
     def extract_snippets_from_text(self, text: str, max_snippets: int = 10) -> List[Dict[str, Any]]:
         """
@@ -105,166 +102,110 @@ class TextSelectionService:
         """
         if not text1 or not text2:
             return 0.0
+        return self.calculate_similarities(text1, [text2])[0]
+    
+    def calculate_similarities(self, text: str, candidates: List[str]) -> List[float]:
+        """
+        Cosine similarity of `text` to each candidate, embedding everything in one batch
+        (one or a few API round trips instead of one per pair)
+        """
+        if not text or not candidates:
+            return [0.0] * len(candidates)
         
         try:
-            if self.use_api_model:
-                return self._calculate_api_similarity(text1, text2)
+            if self._api_ready():
+                embeddings = self.embedding_client.embed([text] + list(candidates))
+            elif self.model:
+                embeddings = list(self.model.encode([text] + list(candidates), show_progress_bar=False))
             else:
-                return self._calculate_transformer_similarity(text1, text2)
+                return [0.0] * len(candidates)
         except Exception as e:
             print(f"Error calculating similarity: {e}")
-            return 0.0
-    
-    def _calculate_api_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity using API-based embeddings"""
-        try:
-            # Get embeddings from API
-            embedding1 = self._get_api_embedding(text1)
-            embedding2 = self._get_api_embedding(text2)
-            
-            if embedding1 is None or embedding2 is None:
-                return 0.0
-            
-            # Calculate cosine similarity
-            embedding1 = np.array(embedding1)
-            embedding2 = np.array(embedding2)
-            
-            similarity = np.dot(embedding1, embedding2) / (
-                np.linalg.norm(embedding1) * np.linalg.norm(embedding2)
-            )
-            
-            return float(similarity)
-        except Exception as e:
-            print(f"API similarity calculation failed: {e}")
-            return 0.0
-    
-    def _calculate_transformer_similarity(self, text1: str, text2: str) -> float:
-        """Calculate similarity using SentenceTransformer (fallback)"""
-        if not self.model:
-            return 0.0
+            return [0.0] * len(candidates)
         
-        try:
-            # Generate embeddings
-            embeddings = self.model.encode([text1, text2])
-            
-            # Calculate cosine similarity
-            similarity = np.dot(embeddings[0], embeddings[1]) / (
-                np.linalg.norm(embeddings[0]) * np.linalg.norm(embeddings[1])
-            )
-            
-            return float(similarity)
-        except Exception as e:
-            print(f"Transformer similarity calculation failed: {e}")
-            return 0.0
+        if embeddings[0] is None:
+            return [0.0] * len(candidates)
+        query = np.asarray(embeddings[0], dtype=np.float32)
+        query_norm = np.linalg.norm(query)
+        similarities = []
+        for embedding, candidate in zip(embeddings[1:], candidates):
+            if embedding is None or not candidate or query_norm == 0:
+                similarities.append(0.0)
+                continue
+            embedding = np.asarray(embedding, dtype=np.float32)
+            norm = np.linalg.norm(embedding)
+            similarities.append(float(np.dot(query, embedding) / (query_norm * norm)) if norm else 0.0)
+        return similarities
     
     def _get_api_embedding(self, text: str) -> Optional[List[float]]:
-        """Get embedding from API based on configured provider"""
-        if self.api_type == 'ollama':
-            return self._get_ollama_embedding(text)
-        elif self.api_type == 'openai':
-            return self._get_openai_embedding(text)
-        elif self.api_type == 'cohere':
-            return self._get_cohere_embedding(text)
-        return None
+        """Get embedding from the configured API provider (cached, pooled connection)"""
+        return self.embedding_client.embed([text])[0]
     
-    def _get_ollama_embedding(self, text: str) -> Optional[List[float]]:
-        """Get embedding from Ollama API - Contest optimized"""
-        try:
-            # Try different Ollama models based on availability
-            models_to_try = [
-                "nomic-embed-text",  # Recommended for contest (1.5GB)
-                "mxbai-embed-large",  # Alternative high-quality option
-                "all-minilm"  # Fallback option
-            ]
-            
-            for model in models_to_try:
-                try:
-                    response = requests.post(
-                        f"{self.api_base_url}/api/embeddings",
-                        json={
-                            "model": model,
-                            "prompt": text
-                        },
-                        timeout=30
-                    )
-                    
-                    if response.status_code == 200:
-                        data = response.json()
-                        embedding = data.get('embedding')
-                        if embedding:
-                            print(f"✅ Using Ollama model: {model}")
-                            return embedding
-                    elif response.status_code == 404:
-                        print(f"📋 Model {model} not found, trying next...")
-                        continue
-                    else:
-                        print(f"⚠️ Ollama API error {response.status_code} for {model}")
-                        
-                except requests.exceptions.RequestException as e:
-                    print(f"⚠️ Request failed for {model}: {e}")
-                    continue
-            
-            print("❌ No Ollama embedding models available")
-            return None
-                
-        except Exception as e:
-            print(f"❌ Ollama embedding error: {e}")
+    def find_related_sections_indexed(
+        self,
+        selected_text: str,
+        document_id: Optional[int] = None,
+        min_similarity: float = 0.3,
+        max_results: int = 5
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Hybrid retrieval over the ingested corpus: BM25 (FTS5) and k-NN (vector index)
+        candidates fused with reciprocal rank fusion
+        Returns None when neither index can serve the query
+        """
+        ingestion_service.backfill_corpus()
+        if not hybrid_retriever.available:
             return None
-    
-    def _get_openai_embedding(self, text: str) -> Optional[List[float]]:
-        """Get embedding from OpenAI API"""
-        try:
-            response = requests.post(
-                "https://api.openai.com/v1/embeddings",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "text-embedding-3-large",  # Best quality model
-                    "input": text
-                },
-                timeout=30
-            )
+        
+        # Over-fetch: sections and paragraphs of the same passage can both match
+        hits = hybrid_retriever.search(selected_text, limit=max_results * 4, exclude_document_id=document_id)
+        # Cosine from the stored vectors; BM25-only hits are scored with the configured model in one batch
+        unscored = [hit for hit in hits if hit["dense_score"] is None]
+        for hit, similarity in zip(unscored, self.calculate_similarities(selected_text, [hit["content"] for hit in unscored])):
+            hit["dense_score"] = similarity
+        hits = [hit for hit in hits if hit["dense_score"] >= min_similarity]
+        
+        db_path = os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'pdf_collections.db')
+        hit_document_ids = sorted({hit["document_id"] for hit in hits})
+        documents = {}
+        if hit_document_ids:
+            with sqlite3.connect(db_path) as conn:
+                placeholders = ",".join("?" * len(hit_document_ids))
+                for doc_id, filename, title in conn.execute(
+                    f"SELECT id, original_filename, title FROM pdf_documents WHERE is_active = 1 AND id IN ({placeholders})",
+                    hit_document_ids
+                ):
+                    documents[doc_id] = (filename, title)
+        
+        related_sections = []
+        seen_passages = set()
+        for hit in hits:
+            if hit["document_id"] not in documents:
+                continue
             
-            if response.status_code == 200:
-                data = response.json()
-                return data['data'][0]['embedding']
-            else:
-                print(f"OpenAI API error: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            print(f"OpenAI embedding error: {e}")
-            return None
-    
-    def _get_cohere_embedding(self, text: str) -> Optional[List[float]]:
-        """Get embedding from Cohere API"""
-        try:
-            response = requests.post(
-                "https://api.cohere.ai/v1/embed",
-                headers={
-                    "Authorization": f"Bearer {self.api_key}",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "embed-english-v3.0",
-                    "texts": [text],
-                    "input_type": "search_document"
-                },
-                timeout=30
-            )
+            content = hit["content"].strip()
+            passage_key = (hit["document_id"], hit["page"], " ".join(content.split())[:80].lower())
+            if passage_key in seen_passages:
+                continue
+            seen_passages.add(passage_key)
             
-            if response.status_code == 200:
-                data = response.json()
-                return data['embeddings'][0]
-            else:
-                print(f"Cohere API error: {response.status_code}")
-                return None
-                
-        except Exception as e:
-            print(f"Cohere embedding error: {e}")
-            return None
+            filename, title = documents[hit["document_id"]]
+            page_number = hit["page"] or 1
+            related_sections.append({
+                "document_id": hit["document_id"],
+                "document_title": title or filename,
+                "document_filename": filename,
+                "snippet_text": content[:500] + ("..." if len(content) > 500 else ""),
+                "similarity_score": hit["dense_score"],
+                "section_title": hit["section_title"] or "Related Content",
+                "page_number": page_number,
+                "context": f"Page {page_number}",
+                "snippet_id": f"snippet_{hit['document_id']}_{page_number}"
+            })
+            if len(related_sections) >= max_results:
+                break
+        
+        return related_sections
     
     def find_related_sections(
         self, 
@@ -280,6 +221,16 @@ class TextSelectionService:
         if not selected_text or len(selected_text.strip()) < 10:
             return []
         
+        # Fast path: hybrid BM25 + k-NN retrieval over the precomputed sections/paragraphs
+        try:
+            indexed_sections = self.find_related_sections_indexed(
+                selected_text, document_id, min_similarity, max_results
+            )
+            if indexed_sections is not None:
+                return indexed_sections
+        except Exception as e:
+            print(f"⚠️ Hybrid retrieval failed, falling back to pairwise similarity: {e}")
+        
         related_sections = []
         
         try:
@@ -299,32 +250,29 @@ class TextSelectionService:
             cursor.execute(query, params)
             documents = cursor.fetchall()
             
-            # Extract content from actual PDF files
+            # Match against the page text stored at ingestion time (the PDF is not re-opened);
+            # candidates from every document are scored together in one embedding batch
+            candidates = []
             for doc_id, filename, title, file_path in documents:
                 try:
-                    if not file_path or not os.path.exists(file_path):
-                        print(f"File not found: {file_path}")
+                    page_texts = ingestion_service.get_page_texts(doc_id)
+                    if not page_texts:
+                        print(f"No ingested text for: {filename}")
                         continue
                     
-                    # Extract real content from PDF
-                    real_sections = self.extract_real_sections_from_pdf(file_path, selected_text)
+                    real_sections = self.extract_real_sections_from_pages(page_texts, selected_text)
                     
                     for section in real_sections:
-                        # Calculate similarity score
-                        similarity = self.calculate_similarity(selected_text, section["text"])
-                        
-                        if similarity >= min_similarity:
-                            related_sections.append({
-                                "document_id": doc_id,
-                                "document_title": title or filename,
-                                "document_filename": filename,
-                                "snippet_text": section["text"],
-                                "similarity_score": similarity,
-                                "section_title": section.get("section_title", "Related Content"),
-                                "page_number": section.get("page_number", 1),  # Real page number from PDF
-                                "context": section.get("context", ""),
-                                "snippet_id": f"snippet_{doc_id}_{section.get('page_number', 1)}"
-                            })
+                        candidates.append({
+                            "document_id": doc_id,
+                            "document_title": title or filename,
+                            "document_filename": filename,
+                            "snippet_text": section["text"],
+                            "section_title": section.get("section_title", "Related Content"),
+                            "page_number": section.get("page_number", 1),  # Real page number from PDF
+                            "context": section.get("context", ""),
+                            "snippet_id": f"snippet_{doc_id}_{section.get('page_number', 1)}"
+                        })
                             
                 except Exception as e:
                     print(f"Error processing document {filename}: {e}")
@@ -334,19 +282,23 @@ class TextSelectionService:
                     )
                     
                     for snippet in synthetic_snippets:
-                        similarity = self.calculate_similarity(selected_text, snippet["text"])
-                        if similarity >= min_similarity:
-                            related_sections.append({
-                                "document_id": doc_id,
-                                "document_title": title or filename,
-                                "document_filename": filename,
-                                "snippet_text": snippet["text"],
-                                "similarity_score": similarity,
-                                "section_title": snippet.get("section_title", "Related Content"),
-                                "page_number": snippet.get("page", 1),
-                                "context": snippet.get("context", ""),
-                                "snippet_id": f"snippet_{doc_id}_{len(related_sections)}"
-                            })
+                        candidates.append({
+                            "document_id": doc_id,
+                            "document_title": title or filename,
+                            "document_filename": filename,
+                            "snippet_text": snippet["text"],
+                            "section_title": snippet.get("section_title", "Related Content"),
+                            "page_number": snippet.get("page", 1),
+                            "context": snippet.get("context", ""),
+                            "snippet_id": None
+                        })
+            
+            similarities = self.calculate_similarities(selected_text, [c["snippet_text"] for c in candidates])
+            for candidate, similarity in zip(candidates, similarities):
+                if similarity >= min_similarity:
+                    if candidate["snippet_id"] is None:
+                        candidate["snippet_id"] = f"snippet_{candidate['document_id']}_{len(related_sections)}"
+                    related_sections.append({**candidate, "similarity_score": similarity})
             
             conn.close()
             
@@ -362,64 +314,67 @@ class TextSelectionService:
         """
         Extract real sections from PDF file with actual page numbers
         """
+        try:
+            with pdfplumber.open(pdf_path) as pdf:
+                page_texts = {page_num + 1: page.extract_text() for page_num, page in enumerate(pdf.pages)}
+            return self.extract_real_sections_from_pages(page_texts, selected_text)
+        except Exception as e:
+            print(f"Error extracting sections from PDF {pdf_path}: {e}")
+            return []
+
+    def extract_real_sections_from_pages(self, page_texts: Dict[int, str], selected_text: str) -> List[Dict[str, Any]]:
+        """
+        Extract real sections from page text (keyed by 1-based page number)
+        """
         sections = []
         
-        try:
-            # Keywords from selected text for better matching
-            selected_keywords = set(word.lower().strip('.,!?;:()[]{}') 
-                                  for word in selected_text.lower().split() 
-                                  if len(word) > 3)
+        # Keywords from selected text for better matching
+        selected_keywords = set(word.lower().strip('.,!?;:()[]{}') 
+                              for word in selected_text.lower().split() 
+                              if len(word) > 3)
+        
+        # Process each page
+        for page_number, page_text in sorted(page_texts.items()):
+            if not page_text or not page_text.strip():
+                continue
             
-            # Open the PDF with pdfplumber
-            with pdfplumber.open(pdf_path) as pdf:
-                # Process each page
-                for page_num, page in enumerate(pdf.pages):
-                    page_text = page.extract_text()
-                    
-                    if not page_text or not page_text.strip():
-                        continue
+            # Split into paragraphs
+            paragraphs = [p.strip() for p in page_text.split('\n\n') if p.strip()]
+            
+            for paragraph in paragraphs:
+                # Skip very short paragraphs
+                if len(paragraph) < 100:
+                    continue
+                
+                # Check if this paragraph contains keywords from selected text
+                paragraph_words = set(word.lower().strip('.,!?;:()[]{}') 
+                                    for word in paragraph.lower().split() 
+                                    if len(word) > 3)
+                
+                # Calculate keyword overlap
+                common_keywords = selected_keywords.intersection(paragraph_words)
+                if len(common_keywords) > 0:  # At least one keyword match
                     
-                    # Split into paragraphs
-                    paragraphs = [p.strip() for p in page_text.split('\n\n') if p.strip()]
+                    # Try to find a section title (look at the beginning of the paragraph)
+                    lines = paragraph.split('\n')
+                    potential_title = lines[0].strip() if lines else "Related Content"
                     
-                    for paragraph in paragraphs:
-                        # Skip very short paragraphs
-                        if len(paragraph) < 100:
-                            continue
-                        
-                        # Check if this paragraph contains keywords from selected text
-                        paragraph_words = set(word.lower().strip('.,!?;:()[]{}') 
-                                            for word in paragraph.lower().split() 
-                                            if len(word) > 3)
-                        
-                        # Calculate keyword overlap
-                        common_keywords = selected_keywords.intersection(paragraph_words)
-                        if len(common_keywords) > 0:  # At least one keyword match
-                            
-                            # Try to find a section title (look at the beginning of the paragraph)
-                            lines = paragraph.split('\n')
-                            potential_title = lines[0].strip() if lines else "Related Content"
-                            
-                            # Clean up title if it's too long
-                            if len(potential_title) > 100:
-                                potential_title = "Related Content"
-                            
-                            sections.append({
-                                "text": paragraph[:500] + ("..." if len(paragraph) > 500 else ""),  # Truncate for snippet
-                                "section_title": potential_title,
-                                "page_number": page_num + 1,  # Convert to 1-based page numbering
-                                "context": f"Page {page_num + 1}"
-                            })
+                    # Clean up title if it's too long
+                    if len(potential_title) > 100:
+                        potential_title = "Related Content"
                     
-                    # Limit sections per document to avoid too many results
-                    if len(sections) >= 3:
-                        break
-            
-            return sections
+                    sections.append({
+                        "text": paragraph[:500] + ("..." if len(paragraph) > 500 else ""),  # Truncate for snippet
+                        "section_title": potential_title,
+                        "page_number": page_number,
+                        "context": f"Page {page_number}"
+                    })
             
-        except Exception as e:
-            print(f"Error extracting sections from PDF {pdf_path}: {e}")
-            return []
+            # Limit sections per document to avoid too many results
+            if len(sections) >= 3:
+                break
+        
+        return sections
 
     def generate_synthetic_related_snippets(self, selected_text: str, filename: str, title: str) -> List[Dict[str, Any]]:
         """
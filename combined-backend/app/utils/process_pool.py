@@ -0,0 +1,123 @@
+"""
+Process Pool Utility
+Runs CPU-bound per-file work (fitz parsing, heading/section extraction) across cores
+- One long-lived pool per process, created on first use (worker start-up is paid once)
+- Results come back in input order; a failing file yields an error entry instead of
+  aborting the batch
+- Falls back to running inline for single items or a worker count of 1
+"""
+
+import multiprocessing
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, CancelledError, Future, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_workers = 0
+_pool_lock = threading.Lock()
+
+
+def default_worker_count() -> int:
+    """EXTRACTION_WORKERS, or the number of cores"""
+    configured = os.getenv("EXTRACTION_WORKERS", "").strip()
+    if configured:
+        return max(1, int(configured))
+    return os.cpu_count() or 1
+
+
+def get_process_pool(workers: int = None) -> ProcessPoolExecutor:
+    """
+    Shared pool, (re)created when more workers are requested or a worker died; never larger
+    than default_worker_count()
+    """
+    global _pool, _pool_workers
+    workers = min(workers or default_worker_count(), default_worker_count())
+    with _pool_lock:
+        if _pool is None or workers > _pool_workers or getattr(_pool, "_broken", False):
+            if _pool is not None:
+                # Work already queued on the old pool still completes
+                _pool.shutdown(wait=False)
+            # spawn: forking a server process that holds threads and model weights is unsafe
+            context = multiprocessing.get_context(os.getenv("EXTRACTION_START_METHOD", "spawn"))
+            _pool_workers = max(workers, _pool_workers if _pool is not None else 0)
+            _pool = ProcessPoolExecutor(max_workers=_pool_workers, mp_context=context)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Stop the shared pool's workers"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True)
+            _pool = None
+
+
+def parallel_map(
+    func: Callable[..., Any],
+    items: Sequence[Any],
+    *args: Any,
+    workers: int = None,
+    on_result: Callable[[int, Any, Optional[str]], None] = None
+) -> List[Tuple[Any, Optional[str]]]:
+    """
+    Apply a picklable module-level function to each item in worker processes
+
+    Args:
+        func: Called as func(item, *args) in a worker
+        items: Inputs (e.g. PDF paths)
+        workers: Worker processes (default: EXTRACTION_WORKERS or the core count)
+        on_result: Called as on_result(index, result, error) as each item finishes
+            (completion order, in the calling thread)
+
+    Returns:
+        One (result, error) pair per item, in input order; error is None on success
+    """
+    workers = min(workers or default_worker_count(), default_worker_count())
+    results: List[Tuple[Any, Optional[str]]] = [(None, None)] * len(items)
+
+    if workers <= 1 or len(items) <= 1:
+        for index, item in enumerate(items):
+            try:
+                results[index] = (func(item, *args), None)
+            except Exception as e:
+                results[index] = (None, str(e) or type(e).__name__)
+            if on_result:
+                on_result(index, *results[index])
+        return results
+
+    pool = get_process_pool(workers)
+    indexes: Dict[Future, int] = {}
+    pending = set()
+    remaining = iter(range(len(items)))
+
+    def submit_next() -> None:
+        index = next(remaining, None)
+        if index is not None:
+            future = pool.submit(func, items[index], *args)
+            indexes[future] = index
+            pending.add(future)
+
+    # The pool may be larger than this call asked for; keep at most `workers` items in flight
+    for _ in range(workers):
+        submit_next()
+    while pending:
+        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            pending.discard(future)
+            index = indexes[future]
+            try:
+                results[index] = (future.result(), None)
+            except BrokenProcessPool:
+                results[index] = (None, "Worker process crashed")
+            except CancelledError:
+                # str(CancelledError()) is empty, which would read as success
+                results[index] = (None, "Extraction cancelled")
+            except Exception as e:
+                results[index] = (None, str(e) or type(e).__name__)
+            if on_result:
+                on_result(index, *results[index])
+            submit_next()
+    return results
@@ -2,35 +2,164 @@
 LLM Chat Interface for Adobe Contest
 Supports multiple LLM providers: Gemini, OpenAI, Azure OpenAI, Ollama
 Environment-based configuration as per contest requirements
+Provider clients are created once and reused (keep-alive connections, no per-call setup);
+a changed API key, endpoint or model in the environment builds a fresh client
 """
 
 import os
 import json
 import time
-from typing import List, Dict, Any, Optional
+import asyncio
+import threading
+from typing import List, Dict, Any, AsyncIterator, Callable, Iterator, Optional, Tuple
 
-def get_llm_response(messages: List[Dict[str, str]], stream: bool = False) -> str:
+# Keep-alive connections per Ollama / OpenAI HTTP client
+HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))
+
+
+class _ClientPool:
+    """
+    Lazily created provider clients, shared by every thread
+    - One client per provider slot; the slot's settings (API key, endpoint, model) are
+      compared on every call and a change builds a new client. A replaced client is dropped,
+      not closed, since another thread may still be mid-request on it
+    - Async clients are bound to the event loop they were created on, so their slots are
+      per loop; slots of closed loops are pruned
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[str, Any], Tuple[Tuple, Any]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "reused": 0, "reconfigured": 0}
+
+    def get(self, slot: str, settings: Tuple, factory: Callable[[], Any], loop: Any = None) -> Any:
+        key = (slot, loop)
+        with self._lock:
+            entry = self._clients.get(key)
+            if entry is not None and entry[0] == settings:
+                self._stats["reused"] += 1
+                return entry[1]
+            for stale in [k for k in self._clients if k[1] is not None and k[1].is_closed()]:
+                del self._clients[stale]
+            client = factory()
+            self._clients[key] = (settings, client)
+            self._stats["created"] += 1
+            self._stats["reconfigured"] += int(entry is not None)
+            return client
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+
+    def describe(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"clients": sorted({slot for slot, _ in self._clients}), **self._stats}
+
+
+_client_pool = _ClientPool()
+
+
+def describe_llm_clients() -> Dict[str, Any]:
+    return _client_pool.describe()
+
+
+def _gemini_model():
+    """Configured Gemini model, or None without an API key (genai.configure is process-global)"""
+    import google.generativeai as genai
+    
+    api_key = os.getenv("GOOGLE_API_KEY") or os.getenv("GEMINI_API_KEY")
+    if not api_key:
+        print("❌ Gemini API key not found in environment variables")
+        return None
+    model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    
+    def create():
+        genai.configure(api_key=api_key)
+        return genai.GenerativeModel(model_name)
+    
+    return _client_pool.get("gemini", (api_key, model_name), create)
+
+
+def _openai_client(azure: bool = False, asynchronous: bool = False):
+    """Pooled (Async)OpenAI / (Async)AzureOpenAI client, or None without credentials"""
+    import openai
+    
+    if azure:
+        api_key = os.getenv("AZURE_OPENAI_KEY")
+        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
+        api_version = os.getenv("AZURE_API_VERSION", "2024-02-15-preview")
+        if not api_key or not endpoint:
+            print("❌ Azure OpenAI credentials not found")
+            return None
+        settings = (api_key, endpoint, api_version)
+        cls = openai.AsyncAzureOpenAI if asynchronous else openai.AzureOpenAI
+        create = lambda: cls(api_key=api_key, api_version=api_version, azure_endpoint=endpoint)
+    else:
+        api_key = os.getenv("OPENAI_API_KEY")
+        if not api_key:
+            print("❌ OpenAI API key not found")
+            return None
+        settings = (api_key,)
+        cls = openai.AsyncOpenAI if asynchronous else openai.OpenAI
+        create = lambda: cls(api_key=api_key)
+    
+    slot = ("azure" if azure else "openai") + ("_async" if asynchronous else "")
+    return _client_pool.get(slot, settings, create, asyncio.get_running_loop() if asynchronous else None)
+
+
+def _ollama_session():
+    """Keep-alive requests.Session shared by every Ollama server (the router may use several)"""
+    import requests
+    from requests.adapters import HTTPAdapter
+    
+    def create():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=HTTP_POOL_SIZE, pool_maxsize=HTTP_POOL_SIZE)
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+    
+    return _client_pool.get("ollama", (), create)
+
+
+def _ollama_async_client():
+    import httpx
+    
+    return _client_pool.get("ollama_async", (), lambda: httpx.AsyncClient(
+        timeout=60,
+        limits=httpx.Limits(max_connections=HTTP_POOL_SIZE, max_keepalive_connections=HTTP_POOL_SIZE)
+    ), asyncio.get_running_loop())
+
+def get_llm_response(messages: List[Dict[str, str]], stream: bool = False, provider: str = None, base_url: str = None,
+                     timeout: float = None) -> str:
     """
     Get response from configured LLM provider
     
     Args:
         messages: List of message dictionaries with 'role' and 'content'
-        stream: Whether to stream the response (not used for contest)
+        stream: Return an iterator of text chunks as the provider produces them
+            (see stream_llm_response; errors are raised instead of returning None)
+        provider: Provider to use instead of LLM_PROVIDER (used by the provider router)
+        base_url: Ollama server to use instead of OLLAMA_BASE_URL
+        timeout: Client-side timeout of the provider request in seconds (the provider router
+            passes its attempt window, so an abandoned call does not keep a thread for long)
     
     Returns:
         String response from the LLM
     """
-    provider = os.getenv("LLM_PROVIDER", "gemini").lower()
+    provider = (provider or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    if stream:
+        return stream_llm_response(messages, provider, base_url)
     
     try:
         if provider == "gemini":
-            return _get_gemini_response(messages)
+            return _get_gemini_response(messages, timeout)
         elif provider == "openai":
-            return _get_openai_response(messages)
+            return _get_openai_response(messages, timeout)
         elif provider == "azure":
-            return _get_azure_response(messages)
+            return _get_azure_response(messages, timeout)
         elif provider == "ollama":
-            return _get_ollama_response(messages)
+            return _get_ollama_response(messages, base_url, timeout)
         else:
             print(f"❌ Unsupported LLM provider: {provider}")
             return None
@@ -39,40 +168,31 @@ def get_llm_response(messages: List[Dict[str, str]], stream: bool = False) -> st
         print(f"❌ LLM Error: {e}")
         return None
 
-def _get_gemini_response(messages: List[Dict[str, str]]) -> str:
+def _messages_to_prompt(messages: List[Dict[str, str]]) -> str:
+    """Single prompt text for providers without a chat format (Gemini, Ollama /api/generate)"""
+    prompt = ""
+    for message in messages:
+        if message["role"] == "system":
+            prompt += f"System: {message['content']}\n\n"
+        elif message["role"] == "user":
+            prompt += f"User: {message['content']}\n\n"
+        elif message["role"] == "assistant":
+            prompt += f"Assistant: {message['content']}\n\n"
+    return prompt
+
+def _get_gemini_response(messages: List[Dict[str, str]], timeout: float = None) -> str:
     """Get response from Google Gemini"""
     try:
-        import google.generativeai as genai
-        
-        # Get API key from environment
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
-            # Try alternative environment variable names
-            api_key = os.getenv("GEMINI_API_KEY")
-            
-        if not api_key:
-            print("❌ Gemini API key not found in environment variables")
+        model = _gemini_model()
+        if model is None:
             return None
-            
-        genai.configure(api_key=api_key)
-        
-        # Get model name
-        model_name = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
-        model = genai.GenerativeModel(model_name)
         
         # Convert messages to Gemini format
         # Combine system and user messages for Gemini
-        full_prompt = ""
-        for message in messages:
-            if message["role"] == "system":
-                full_prompt += f"System: {message['content']}\n\n"
-            elif message["role"] == "user":
-                full_prompt += f"User: {message['content']}\n\n"
-            elif message["role"] == "assistant":
-                full_prompt += f"Assistant: {message['content']}\n\n"
+        full_prompt = _messages_to_prompt(messages)
         
         # Generate response
-        response = model.generate_content(full_prompt)
+        response = model.generate_content(full_prompt, request_options={"timeout": timeout} if timeout else None)
         
         if response and response.text:
             return response.text.strip()
@@ -87,18 +207,12 @@ def _get_gemini_response(messages: List[Dict[str, str]]) -> str:
         print(f"❌ Gemini API Error: {e}")
         return None
 
-def _get_openai_response(messages: List[Dict[str, str]]) -> str:
+def _get_openai_response(messages: List[Dict[str, str]], timeout: float = None) -> str:
     """Get response from OpenAI"""
     try:
-        import openai
-        
-        # Get API key
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("❌ OpenAI API key not found")
+        client = _openai_client()
+        if client is None:
             return None
-            
-        client = openai.OpenAI(api_key=api_key)
         
         model_name = os.getenv("OPENAI_MODEL", "gpt-4o")
         
@@ -106,7 +220,8 @@ def _get_openai_response(messages: List[Dict[str, str]]) -> str:
             model=model_name,
             messages=messages,
             max_tokens=2000,
-            temperature=0.7
+            temperature=0.7,
+            **({"timeout": timeout} if timeout else {})
         )
         
         if response.choices and response.choices[0].message:
@@ -122,32 +237,20 @@ def _get_openai_response(messages: List[Dict[str, str]]) -> str:
         print(f"❌ OpenAI API Error: {e}")
         return None
 
-def _get_azure_response(messages: List[Dict[str, str]]) -> str:
+def _get_azure_response(messages: List[Dict[str, str]], timeout: float = None) -> str:
     """Get response from Azure OpenAI"""
     try:
-        import openai
-        
-        # Get Azure credentials
-        api_key = os.getenv("AZURE_OPENAI_KEY")
-        endpoint = os.getenv("AZURE_OPENAI_ENDPOINT")
-        deployment_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o")
-        api_version = os.getenv("AZURE_API_VERSION", "2024-02-15-preview")
-        
-        if not api_key or not endpoint:
-            print("❌ Azure OpenAI credentials not found")
+        client = _openai_client(azure=True)
+        if client is None:
             return None
-            
-        client = openai.AzureOpenAI(
-            api_key=api_key,
-            api_version=api_version,
-            azure_endpoint=endpoint
-        )
+        deployment_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o")
         
         response = client.chat.completions.create(
             model=deployment_name,
             messages=messages,
             max_tokens=2000,
-            temperature=0.7
+            temperature=0.7,
+            **({"timeout": timeout} if timeout else {})
         )
         
         if response.choices and response.choices[0].message:
@@ -163,35 +266,26 @@ def _get_azure_response(messages: List[Dict[str, str]]) -> str:
         print(f"❌ Azure OpenAI Error: {e}")
         return None
 
-def _get_ollama_response(messages: List[Dict[str, str]]) -> str:
+def _get_ollama_response(messages: List[Dict[str, str]], base_url: str = None, timeout: float = None) -> str:
     """Get response from Ollama (local LLM)"""
     try:
-        import requests
+        session = _ollama_session()
         
-        base_url = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
         model_name = os.getenv("OLLAMA_MODEL", "llama3")
         
         # Convert messages to a single prompt for Ollama
-        prompt = ""
-        for message in messages:
-            if message["role"] == "system":
-                prompt += f"System: {message['content']}\n\n"
-            elif message["role"] == "user":
-                prompt += f"User: {message['content']}\n\n"
-            elif message["role"] == "assistant":
-                prompt += f"Assistant: {message['content']}\n\n"
-        
-        prompt += "Assistant: "
+        prompt = _messages_to_prompt(messages) + "Assistant: "
         
         # Make request to Ollama
-        response = requests.post(
+        response = session.post(
             f"{base_url}/api/generate",
             json={
                 "model": model_name,
                 "prompt": prompt,
                 "stream": False
             },
-            timeout=60
+            timeout=timeout or 60
         )
         
         if response.status_code == 200:
@@ -208,6 +302,174 @@ def _get_ollama_response(messages: List[Dict[str, str]]) -> str:
         print(f"❌ Ollama Error: {e}")
         return None
 
+async def get_llm_response_async(messages: List[Dict[str, str]], provider: str = None, base_url: str = None) -> str:
+    """
+    asyncio counterpart of get_llm_response
+    Every provider is called through its async client (httpx for Ollama, AsyncOpenAI /
+    AsyncAzureOpenAI, Gemini's generate_content_async), so cancelling the awaiting task
+    (e.g. asyncio.wait_for on a deadline) really aborts the request
+    
+    Returns:
+        String response from the LLM, or None on error
+    """
+    provider = (provider or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    
+    try:
+        if provider == "gemini":
+            return await _get_gemini_response_async(messages)
+        elif provider in ("openai", "azure"):
+            return await _get_openai_response_async(messages, azure=provider == "azure")
+        elif provider == "ollama":
+            return await _get_ollama_response_async(messages, base_url)
+        else:
+            print(f"❌ Unsupported LLM provider: {provider}")
+            return None
+            
+    except Exception as e:
+        print(f"❌ LLM Error: {e}")
+        return None
+
+async def _get_gemini_response_async(messages: List[Dict[str, str]]) -> str:
+    """Async Google Gemini call"""
+    try:
+        model = _gemini_model()
+    except ImportError:
+        print("❌ Google Generative AI library not installed. Install with: pip install google-generativeai")
+        return None
+    if model is None:
+        return None
+    
+    response = await model.generate_content_async(_messages_to_prompt(messages))
+    if response and response.text:
+        return response.text.strip()
+    print("❌ Empty response from Gemini")
+    return None
+
+async def _get_openai_response_async(messages: List[Dict[str, str]], azure: bool = False) -> str:
+    """Async OpenAI / Azure OpenAI call"""
+    try:
+        client = _openai_client(azure=azure, asynchronous=True)
+    except ImportError:
+        print("❌ OpenAI library not installed. Install with: pip install openai")
+        return None
+    if client is None:
+        return None
+    
+    model_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o") if azure else os.getenv("OPENAI_MODEL", "gpt-4o")
+    response = await client.chat.completions.create(
+        model=model_name,
+        messages=messages,
+        max_tokens=2000,
+        temperature=0.7
+    )
+    if response.choices and response.choices[0].message:
+        return response.choices[0].message.content.strip()
+    print("❌ Empty response from OpenAI")
+    return None
+
+async def _get_ollama_response_async(messages: List[Dict[str, str]], base_url: str = None) -> str:
+    """Async Ollama call over the pooled httpx client"""
+    base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+    response = await _ollama_async_client().post(
+        f"{base_url}/api/generate",
+        json={
+            "model": os.getenv("OLLAMA_MODEL", "llama3"),
+            "prompt": _messages_to_prompt(messages) + "Assistant: ",
+            "stream": False
+        }
+    )
+    if response.status_code == 200:
+        return response.json().get("response", "").strip()
+    print(f"❌ Ollama API Error: {response.status_code}")
+    return None
+
+def _require(client, name: str):
+    """Streaming has no None result: a missing key or credential is an error"""
+    if client is None:
+        raise RuntimeError(f"{name} is not configured")
+    return client
+
+def _ollama_stream_body(messages: List[Dict[str, str]]) -> Dict[str, Any]:
+    return {
+        "model": os.getenv("OLLAMA_MODEL", "llama3"),
+        "prompt": _messages_to_prompt(messages) + "Assistant: ",
+        "stream": True
+    }
+
+def stream_llm_response(messages: List[Dict[str, str]], provider: str = None, base_url: str = None) -> Iterator[str]:
+    """
+    Text chunks of the response, as the provider streams them
+    
+    Raises:
+        Whatever the provider raised (unsupported provider, missing credentials, HTTP errors)
+    """
+    provider = (provider or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    
+    if provider == "gemini":
+        model = _require(_gemini_model(), "Gemini")
+        for chunk in model.generate_content(_messages_to_prompt(messages), stream=True):
+            if chunk.text:
+                yield chunk.text
+    elif provider in ("openai", "azure"):
+        client = _require(_openai_client(azure=provider == "azure"), "OpenAI")
+        model_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o") if provider == "azure" else os.getenv("OPENAI_MODEL", "gpt-4o")
+        for event in client.chat.completions.create(
+            model=model_name, messages=messages, max_tokens=2000, temperature=0.7, stream=True
+        ):
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+    elif provider == "ollama":
+        base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        with _ollama_session().post(f"{base_url}/api/generate", json=_ollama_stream_body(messages), stream=True, timeout=60) as response:
+            response.raise_for_status()
+            for line in response.iter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
+async def stream_llm_response_async(messages: List[Dict[str, str]], provider: str = None, base_url: str = None) -> AsyncIterator[str]:
+    """
+    asyncio counterpart of stream_llm_response; closing the generator (or cancelling the task
+    iterating it) closes the provider connection
+    """
+    provider = (provider or os.getenv("LLM_PROVIDER", "gemini")).lower()
+    
+    if provider == "gemini":
+        model = _require(_gemini_model(), "Gemini")
+        response = await model.generate_content_async(_messages_to_prompt(messages), stream=True)
+        async for chunk in response:
+            if chunk.text:
+                yield chunk.text
+    elif provider in ("openai", "azure"):
+        client = _require(_openai_client(azure=provider == "azure", asynchronous=True), "OpenAI")
+        model_name = os.getenv("AZURE_DEPLOYMENT_NAME", "gpt-4o") if provider == "azure" else os.getenv("OPENAI_MODEL", "gpt-4o")
+        stream = await client.chat.completions.create(
+            model=model_name, messages=messages, max_tokens=2000, temperature=0.7, stream=True
+        )
+        async for event in stream:
+            if event.choices and event.choices[0].delta.content:
+                yield event.choices[0].delta.content
+    elif provider == "ollama":
+        base_url = base_url or os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+        async with _ollama_async_client().stream("POST", f"{base_url}/api/generate", json=_ollama_stream_body(messages)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                if data.get("response"):
+                    yield data["response"]
+                if data.get("done"):
+                    break
+    else:
+        raise ValueError(f"Unsupported LLM provider: {provider}")
+
 # Test function
 def test_llm_connection():
     """Test the LLM connection"""
@@ -25,6 +25,7 @@ from app.documents.router import router as documents_router
 from app.insights.router import router as insights_router
 from app.text_selection.router import router as text_selection_router
 from app.collections.router import router as collections_router
+from app.services.deadline import request_deadline_middleware
 
 # Create FastAPI application
 app = FastAPI(
@@ -44,6 +45,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Per-request deadline (X-Request-Timeout) for the LLM calls a request makes
+app.middleware("http")(request_deadline_middleware)
+
 # Mount static files for frontend (contest requirement)
 frontend_build_path = None
 if os.path.exists("/app/frontend"):